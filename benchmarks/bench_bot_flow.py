@@ -0,0 +1,79 @@
+"""Benchmark: /start -> inbox -> view message through the real handlers.
+
+Runs the bot in-process against the fake Telegram and Gmail servers, with
+every simulated user owning one Gmail account, and reports flows/s plus
+p50/p99 latency per step.
+
+Run from the project root:
+    python benchmarks/bench_bot_flow.py --users 20 --rounds 5 --gmail-latency-ms 20
+"""
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+
+from harness import BotHarness, UserSimulator, percentile
+
+
+async def run(args) -> dict:
+    async with BotHarness(users=args.users, gmail_latency_ms=args.gmail_latency_ms,
+                          telegram_latency_ms=args.telegram_latency_ms, rate_429=args.rate_429) as harness:
+        users = harness.users
+
+        # Warm-up (client builds, credential loads)
+        await asyncio.gather(*(user.inbox_flow() for user in users))
+        for user in users:
+            user.latencies.clear()
+
+        flows = []
+
+        async def timed_flow(user: UserSimulator):
+            started = time.perf_counter()
+            if await user.inbox_flow():
+                flows.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            await asyncio.gather(*(timed_flow(user) for user in users))
+        elapsed = time.perf_counter() - started
+
+    steps = {}
+    for user in users:
+        for name, samples in user.latencies.items():
+            steps.setdefault(name, []).extend(samples)
+    return {
+        'flows': len(flows),
+        'flows_per_sec': len(flows) / elapsed,
+        'flow_p50_ms': statistics.median(flows) * 1000 if flows else None,
+        'flow_p99_ms': percentile(flows, 0.99) * 1000 if flows else None,
+        'steps': {
+            name: {'p50_ms': statistics.median(samples) * 1000, 'p99_ms': percentile(samples, 0.99) * 1000}
+            for name, samples in steps.items()
+        },
+        'throttled': harness.telegram.throttled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--gmail-latency-ms', type=float, default=20)
+    parser.add_argument('--telegram-latency-ms', type=float, default=5)
+    parser.add_argument('--rate-429', type=float, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    result = asyncio.run(run(args))
+
+    print(f"flows: {result['flows']}  flows/sec: {result['flows_per_sec']:.1f}  "
+          f"p50: {result['flow_p50_ms']:.1f} ms  p99: {result['flow_p99_ms']:.1f} ms  "
+          f"429s: {result['throttled']}")
+    print(f"{'step':<14}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, step in result['steps'].items():
+        print(f"{name:<14}{step['p50_ms']:>10.1f}{step['p99_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
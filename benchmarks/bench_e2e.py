@@ -0,0 +1,256 @@
+"""End-to-end benchmark suite for the bot's hot paths.
+
+Runs the real application in-process against the fake Telegram and Gmail
+servers (see harness.py) and measures throughput and latency percentiles
+per scenario:
+
+    push      N accounts x M new messages through handle_push_notification
+              (latency: push received -> notification sent to Telegram)
+    inbox     inbox_with_time (time-range list of the inbox)
+    search    perform_search (query -> results)
+    full      view_full_email, every page of the first message
+    compose   compose/send conversation, start to "sent"
+
+Results are printed as JSON. With --baseline, each scenario is compared to
+a stored run and the process exits 1 if throughput dropped or p99 grew by
+more than --tolerance.
+
+Run from the project root:
+    python benchmarks/bench_e2e.py --output results.json
+    python benchmarks/bench_e2e.py --baseline results.json --scenarios inbox,search
+"""
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import logging
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import aiohttp
+
+from harness import BotHarness, PUSH_PORT, summarize
+from database import db
+
+SEARCH_QUERIES = ['verification', 'from:github', 'is:unread', 'subject:invoice', 'newsletter']
+
+
+def has_keyboard(message: Dict[str, Any]) -> bool:
+    return bool(message.get('reply_markup'))
+
+
+async def scenario_push(harness: BotHarness, args) -> List[float]:
+    """Deliver M messages to every mailbox and push-notify each account once."""
+    for user in harness.users:
+        user_id = user.user['id']
+        await db.init_history_id(harness.accounts[user_id], harness.mailbox(user_id).history_id)
+
+    samples = []
+    async with aiohttp.ClientSession() as session:
+        async def one_account(user):
+            user_id = user.user['id']
+            box = harness.mailbox(user_id)
+            for _ in range(args.messages):
+                box.deliver()
+            data = json.dumps({'emailAddress': harness.email(user_id), 'historyId': box.history_id})
+            body = {'message': {'data': base64.b64encode(data.encode()).decode(), 'messageId': str(box.history_id)}}
+
+            while not user.inbox.empty():
+                user.inbox.get_nowait()
+            arrivals = asyncio.create_task(user.receive(args.messages))
+            pushed = time.perf_counter()
+            async with session.post(f'http://127.0.0.1:{PUSH_PORT}/webhook/push', json=body) as response:
+                response.raise_for_status()
+            samples.extend(arrived - pushed for arrived in await arrivals)
+
+        await asyncio.gather(*(one_account(user) for user in harness.users))
+    return samples
+
+
+async def scenario_inbox(harness: BotHarness, args) -> List[float]:
+    async def one_user(user):
+        if user.screen is None:
+            await user.send('/start')
+        await user.press(f'inbox_time:{args.time_range}', name='inbox_time')
+
+    await asyncio.gather(*(one_user(user) for user in harness.users))
+    return [sample for user in harness.users for sample in user.latencies.pop('inbox_time', [])]
+
+
+async def scenario_search(harness: BotHarness, args) -> List[float]:
+    async def one_user(index, user):
+        if user.screen is None:
+            await user.send('/start')
+        await user.press('search', name='search_start')
+        query = SEARCH_QUERIES[index % len(SEARCH_QUERIES)]
+        await user.send(query, name='search', until=has_keyboard)
+
+    await asyncio.gather(*(one_user(index, user) for index, user in enumerate(harness.users)))
+    return [sample for user in harness.users for sample in user.latencies.pop('search', [])]
+
+
+async def scenario_full(harness: BotHarness, args) -> List[float]:
+    async def one_user(user):
+        if user.screen is None:
+            await user.send('/start')
+        user_id = user.user['id']
+        account_id = harness.accounts[user_id]
+        message_id = harness.mailbox(user_id).order[0]
+
+        prefix = f'email:full:{account_id}:{message_id}'
+        page = 1
+        while True:
+            await user.press(f'{prefix}:{page}', name='full')
+            page += 1
+            if f'{prefix}:{page}' not in user.buttons(prefix):
+                break
+
+    await asyncio.gather(*(one_user(user) for user in harness.users))
+    return [sample for user in harness.users for sample in user.latencies.pop('full', [])]
+
+
+async def scenario_compose(harness: BotHarness, args) -> List[float]:
+    samples = []
+
+    async def one_user(user):
+        if user.screen is None:
+            await user.send('/start')
+        started = time.perf_counter()
+        await user.press('compose')
+        await user.send('bob@example.com', name='compose_to')
+        await user.send('Quarterly report', name='compose_subject')
+        await user.send('Hi Bob,\n\nThe numbers are attached.\n\nThanks', name='compose_body',
+                        until=has_keyboard)
+        await user.press('compose_send')
+        samples.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one_user(user) for user in harness.users))
+    return samples
+
+
+SCENARIOS: Dict[str, Callable] = {
+    'push': scenario_push,
+    'inbox': scenario_inbox,
+    'search': scenario_search,
+    'full': scenario_full,
+    'compose': scenario_compose,
+}
+
+
+async def run(args) -> Dict[str, Any]:
+    results = {}
+    async with BotHarness(users=args.users, messages=args.mailbox_size,
+                          gmail_latency_ms=args.gmail_latency_ms,
+                          telegram_latency_ms=args.telegram_latency_ms,
+                          rate_429=args.rate_429, push='push' in args.scenarios) as harness:
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            # Warm-up round (client builds, credential loads, caches)
+            await scenario(harness, args)
+
+            samples = []
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                samples.extend(await scenario(harness, args))
+            results[name] = summarize(samples, time.perf_counter() - started)
+            print(f"{name:<10}{results[name]['ops_per_sec']:>10.1f} ops/s"
+                  f"{results[name].get('p99_ms', 0):>10.1f} ms p99", file=sys.stderr)
+        throttled = harness.telegram.throttled
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'params': {
+                'users': args.users, 'rounds': args.rounds, 'messages': args.messages,
+                'mailbox_size': args.mailbox_size, 'gmail_latency_ms': args.gmail_latency_ms,
+                'telegram_latency_ms': args.telegram_latency_ms, 'rate_429': args.rate_429,
+            },
+            'telegram_429s': throttled,
+        },
+        'scenarios': results,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of current against baseline.
+
+    Returns:
+        One line per scenario whose ops/s fell or p99 rose by more than tolerance
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base or not base.get('ops'):
+            continue
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops_per_sec']:.1f} ops/s "
+                               f"(baseline {base['ops_per_sec']:.1f})")
+        if result.get('p99_ms', 0) > base['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {result['p99_ms']:.1f} ms "
+                               f"(baseline {base['p99_ms']:.1f} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--users', type=int, default=10, help='simulated users (one account each)')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--messages', type=int, default=5, help='new messages per account (push)')
+    parser.add_argument('--mailbox-size', type=int, default=50)
+    parser.add_argument('--time-range', default='24h', help='inbox time range')
+    parser.add_argument('--gmail-latency-ms', type=float, default=20)
+    parser.add_argument('--telegram-latency-ms', type=float, default=5)
+    parser.add_argument('--rate-429', type=float, default=0)
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed relative ops/s drop or p99 increase')
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    logging.getLogger().setLevel(logging.WARNING)
+    result = asyncio.run(run(args))
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('params') != result['meta']['params']:
+            print(f"Note: {args.baseline} was run with different parameters", file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark: googleapiclient vs. aiohttp Gmail backends on the fake server.
+
+Each simulated account runs the inbox flow (messages.list, a metadata
+batch for the page, then messages.get for one message) in a loop.
+
+Run from the project root:
+    python benchmarks/bench_gmail_backends.py --accounts 20 --rounds 5 --latency-ms 20
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+PORT = 8765
+os.environ.setdefault('BOT_TOKEN', 'bench')
+os.environ.setdefault('MASTER_KEY', 'bench')
+os.environ.setdefault('ADMIN_CHAT_ID', '1')
+os.environ['GMAIL_API_BASE_URL'] = f'http://127.0.0.1:{PORT}'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from google.oauth2.credentials import Credentials  # noqa: E402
+from fake_gmail import FakeGmail  # noqa: E402
+from gmail_service import GmailService, LIST_HEADERS  # noqa: E402
+from gmail_async import AsyncGmailService  # noqa: E402
+from gmail_executor import gmail_executor  # noqa: E402
+from token_manager import credential_manager  # noqa: E402
+
+
+def install_accounts(count: int):
+    """Give each benchmark account a token (= its fake mailbox)."""
+    for account_id in range(1, count + 1):
+        credential_manager.credentials[account_id] = Credentials(token=f'acct{account_id}')
+        credential_manager.user_ids[account_id] = account_id
+
+
+async def inbox_flow(service: GmailService, account_id: int, latencies: list):
+    """List the inbox, fetch the page's metadata, open one message."""
+    started = time.perf_counter()
+    page = await service.get_messages(account_id, max_results=10)
+    ids = [message['id'] for message in page['messages']]
+    await service.get_parsed_messages_batch(account_id, ids, format='metadata', headers=LIST_HEADERS)
+    message = await service.get_parsed_message(account_id, ids[0])
+    message.body(500)
+    latencies.append(time.perf_counter() - started)
+
+
+async def run_backend(service: GmailService, accounts: int, rounds: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        # Cold message cache so every round hits the server
+        service.message_cache.entries.clear()
+        service.message_cache.formats.clear()
+        service.message_cache.size = 0
+        await asyncio.gather(*(inbox_flow(service, account_id, latencies)
+                               for account_id in range(1, accounts + 1)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'flows_per_sec': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    fake = FakeGmail(messages=50, latency_ms=args.latency_ms)
+    runner = await fake.start(port=PORT)
+    install_accounts(args.accounts)
+
+    backends = [('googleapiclient', GmailService()), ('aiohttp', AsyncGmailService())]
+    try:
+        print(f"{'backend':<18}{'flows/sec':>12}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, service in backends:
+            # Warm-up (client builds, connections)
+            await run_backend(service, args.accounts, 1)
+            result = await run_backend(service, args.accounts, args.rounds)
+            print(f"{name:<18}{result['flows_per_sec']:>12.1f}"
+                  f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+    finally:
+        for _, service in backends:
+            await service.close()
+        gmail_executor.shutdown()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
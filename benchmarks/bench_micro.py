@@ -0,0 +1,194 @@
+"""Micro-benchmarks for the text rendering and message parsing primitives.
+
+Each benchmark calls one function over a realistic corpus (corpus.py) and
+reports calls/s plus the mean transient allocation peak per call
+(tracemalloc). parse_email_headers and get_message_body no longer exist;
+their replacements, ParsedMessage and MimeBody, are measured instead.
+The keyboards.* entries cover the inline keyboards sent on the common
+navigation callbacks (static menus, per-message actions, timer pickers,
+account lists).
+
+Run from the project root:
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --filter escape --output micro.json
+    python benchmarks/bench_micro.py --baseline micro.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from telegram import InlineKeyboardButton  # noqa: E402
+
+import corpus  # noqa: E402
+import formatter  # noqa: E402
+import utils  # noqa: E402
+from paginator import paginate  # noqa: E402
+from mime import MimeBody  # noqa: E402
+from parsed_message import ParsedMessage  # noqa: E402
+from otp import extract_otp, extract_message_otp  # noqa: E402
+from keyboards import keyboards, MENUS, TIMER_OPTIONS  # noqa: E402
+
+
+def build_corpora() -> Dict[str, List[Any]]:
+    subjects = corpus.subjects()
+    bodies = corpus.bodies()
+    newsletters = corpus.newsletters()
+    long_texts = [body for body in bodies if len(body) > 4000] + [
+        formatter.escape_markdown(html) for html in newsletters
+    ]
+    messages = corpus.messages()
+    senders = corpus.senders()
+    return {
+        'labels': corpus.labels() + subjects[:40],
+        'subjects': subjects + corpus.senders(),
+        'texts': subjects + bodies,
+        'long_texts': long_texts,
+        'otp_texts': bodies + newsletters,
+        'messages': messages,
+        'menus': list(MENUS),
+        'message_refs': [(1 + i % 5, message['id'], 'UNREAD' in message['labelIds'])
+                         for i, message in enumerate(messages)],
+        'timers': [(f'account_timer:{1 + i % 20}', TIMER_OPTIONS[i % len(TIMER_OPTIONS)][1])
+                   for i in range(100)],
+        'account_lists': [senders[i:i + 1 + i % 5] for i in range(50)],
+    }
+
+
+# name -> (function of one input, corpus name)
+BENCHMARKS: Dict[str, Tuple[Callable[[Any], Any], str]] = {
+    'formatter.to_tiny_caps': (formatter.to_tiny_caps, 'labels'),
+    'formatter.escape_markdown': (formatter.escape_markdown, 'texts'),
+    'utils.escape_markdown': (utils.escape_markdown, 'texts'),
+    'formatter.truncate_text': (lambda text: formatter.truncate_text(text, 40), 'subjects'),
+    'utils.truncate_text': (lambda text: utils.truncate_text(text, 40), 'subjects'),
+    'formatter.split_message': (formatter.split_message, 'long_texts'),
+    'utils.split_message': (utils.split_message, 'long_texts'),
+    'paginator.paginate': (paginate, 'long_texts'),
+    'ParsedMessage': (ParsedMessage, 'messages'),
+    'ParsedMessage.body(1000)': (lambda message: ParsedMessage(message).body(), 'messages'),
+    'MimeBody.text(full)': (lambda message: MimeBody(message['payload']).text(), 'messages'),
+    'otp.extract_otp': (extract_otp, 'otp_texts'),
+    'otp.extract_message_otp': (lambda message: extract_message_otp(ParsedMessage(message)), 'messages'),
+    'keyboards.menu': (keyboards.__getitem__, 'menus'),
+    'keyboards.message_actions': (lambda ref: keyboards.message_actions(*ref), 'message_refs'),
+    'keyboards.timer_menu': (lambda timer: keyboards.timer_menu(*timer, 'accounts'), 'timers'),
+    'keyboards.account_list': (
+        lambda emails: keyboards.markup(
+            [[InlineKeyboardButton(f"📬 {formatter.truncate_text(email, 25)}", callback_data=f"select_account:{i}")]
+             for i, email in enumerate(emails)],
+            'add_account', 'back_to_menu', 'main_menu'),
+        'account_lists'),
+}
+
+
+def measure_speed(func: Callable, inputs: List[Any], min_time: float, repeat: int) -> float:
+    """Best calls/s over repeat runs of at least min_time seconds."""
+    best = 0.0
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            for item in inputs:
+                func(item)
+            calls += len(inputs)
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def measure_allocations(func: Callable, inputs: List[Any]) -> Dict[str, float]:
+    """Mean and max transient allocation peak per call, in bytes."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = func(item)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            del result
+    finally:
+        tracemalloc.stop()
+    return {'alloc_peak_mean_bytes': sum(peaks) / len(peaks), 'alloc_peak_max_bytes': max(peaks)}
+
+
+def run(names: List[str], min_time: float, repeat: int) -> Dict[str, Dict[str, float]]:
+    corpora = build_corpora()
+    results = {}
+    print(f"{'benchmark':<28}{'calls/s':>14}{'peak B/call':>14}", file=sys.stderr)
+    for name in names:
+        func, corpus_name = BENCHMARKS[name]
+        inputs = corpora[corpus_name]
+        # Warm-up (imports, regex compilation, interned tables)
+        for item in inputs:
+            func(item)
+        result = {'corpus': corpus_name, 'inputs': len(inputs),
+                  'ops_per_sec': measure_speed(func, inputs, min_time, repeat)}
+        result.update(measure_allocations(func, inputs))
+        results[name] = result
+        print(f"{name:<28}{result['ops_per_sec']:>14,.0f}{result['alloc_peak_mean_bytes']:>14,.0f}",
+              file=sys.stderr)
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Benchmarks whose calls/s fell or allocation peak grew by more than tolerance."""
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            continue
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops_per_sec']:,.0f} calls/s "
+                               f"(baseline {base['ops_per_sec']:,.0f})")
+        if result['alloc_peak_mean_bytes'] > base['alloc_peak_mean_bytes'] * (1 + tolerance):
+            regressions.append(f"{name}: {result['alloc_peak_mean_bytes']:,.0f} B/call peak "
+                               f"(baseline {base['alloc_peak_mean_bytes']:,.0f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--filter', default='', help='only benchmarks whose name contains this')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timing run')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if not names:
+        parser.error(f'no benchmark matches {args.filter!r}')
+
+    result = {
+        'meta': {'python': sys.version.split()[0], 'min_time': args.min_time, 'repeat': args.repeat},
+        'benchmarks': run(names, args.min_time, args.repeat),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
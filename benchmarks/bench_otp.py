@@ -0,0 +1,115 @@
+"""Micro-benchmark: legacy regex OTP extraction vs. the compiled engine.
+
+Run from the project root:
+    python benchmarks/bench_otp.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from otp import OTPEngine  # noqa: E402
+
+# (body, expected OTP or None)
+CORPUS = [
+    ("Your verification code is 482913. It expires in 10 minutes.", "482913"),
+    ("Use 7731 to sign in to your account.", "7731"),
+    ("G-582014 is your Google verification code.", "582014"),
+    ("Your one-time passcode: 93810274", "93810274"),
+    ("Your security code is 123 456. Do not share it with anyone.", "123456"),
+    ("Enter this code to confirm your email: K7P2QX", "K7P2QX"),
+    ("OTP for your transaction of $2500.00 at AMAZON is 660413.", "660413"),
+    ("Login attempt detected. Your code: 5521", "5521"),
+    ("Hi Sam, the 2024 annual report is attached. Revenue grew 12% to 4500 units.", None),
+    ("Your order #884213 has shipped and will arrive Tuesday.", None),
+    ("Call us at 800-555-0199 or reply to this email.", None),
+    ("Invoice total: $1299 due 2024-05-01.", None),
+    ("Meeting moved to 10:30 in room 4012, see you there.", None),
+    ("Weekly newsletter: 5 tips for 2025, plus 1500 new recipes inside.", None),
+    ("Flash sale! Save 2000 points on orders over 150.", None),
+    ("Your PIN has been changed on 12/05/2024. If this wasn't you contact support.", None),
+    ("Thanks for your purchase. Receipt 20240511 attached.", None),
+    ("Copyright 2024 Example Inc. All rights reserved. Verify your email address here.", None),
+    ("Dear customer, 349912 is your authentication code for Acme Bank. Valid for 5 minutes.", "349912"),
+    ("Your Microsoft account security code is 0931", "0931"),
+    (("Lorem ipsum dolor sit amet 2023. " * 40) + "Your confirmation code is 771204.", "771204"),
+    ("Apple ID: your verification code is 610 299.", "610299"),
+    ("Use code SAVE20 at checkout for 20% off orders over $50.", None),
+    ("<p>Your 2FA code</p><p><b>284751</b></p>", "284751"),
+    ("Order confirmation: your order 12345678 has shipped", None),
+    ("Call us at 555-1234 to confirm your appointment", None),
+    ("Confirm your subscription. Ref 20231015", None),
+    ("Security alert: we noticed a new sign-in to your account. Case 4839201 has been opened.", None),
+    ("Please confirm your booking, reference number 552190, for 2 guests.", None),
+    ("Your PIN reminder: call 0800 123 456 if you did not request this.", None),
+]
+
+
+def legacy_extract_otp(text):
+    """Previous utils.extract_otp (uncompiled patterns, first match wins)."""
+    patterns = [
+        r'\b(\d{6})\b',
+        r'\b(\d{4})\b',
+        r'\b(\d{8})\b',
+        r'code[:\s]+(\d+)',
+        r'OTP[:\s]+(\d+)',
+        r'verification code[:\s]+(\d+)',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+
+def accuracy(func):
+    """Share of corpus bodies with the expected result."""
+    correct = sum(func(body) == expected for body, expected in CORPUS)
+    return correct / len(CORPUS)
+
+
+def main():
+    engine = OTPEngine()
+    bodies = [body for body, _ in CORPUS]
+
+    def run_legacy():
+        for body in bodies:
+            legacy_extract_otp(body)
+
+    def run_engine():
+        for body in bodies:
+            engine.extract(body)
+
+    def run_engine_memo():
+        for i, body in enumerate(bodies):
+            engine.extract(body, key=(1, i))
+
+    number = 50
+    rounds = 20
+    results = [
+        ('legacy', run_legacy, accuracy(legacy_extract_otp)),
+        ('engine', run_engine, accuracy(engine.extract)),
+        ('engine (memoized)', run_engine_memo, accuracy(engine.extract)),
+    ]
+
+    # Interleave the variants so machine noise hits all of them alike
+    best = {name: float('inf') for name, _, _ in results}
+    for _ in range(rounds):
+        for name, func, _ in results:
+            best[name] = min(best[name], timeit.timeit(func, number=number))
+
+    print(f"{'variant':<20}{'bodies/sec':>14}{'accuracy':>10}")
+    for name, func, acc in results:
+        rate = len(bodies) * number / best[name]
+        print(f"{name:<20}{rate:>14,.0f}{acc:>10.0%}")
+
+    misses = [(body[:60], expected, engine.extract(body))
+              for body, expected in CORPUS if engine.extract(body) != expected]
+    for body, expected, got in misses:
+        print(f"  miss: {body!r} expected={expected} got={got}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Deterministic, realistic inputs for the micro-benchmarks.
+
+Every corpus is generated from a fixed seed so runs are comparable:
+
+    subjects     Unicode subjects (emoji, CJK, accents, RTL, MarkdownV2 specials)
+    senders      display-name/address pairs
+    labels       the static button labels the handlers tiny-caps
+    newsletters  long HTML newsletters (entities, inline CSS, tracking links)
+    bodies       plain-text bodies from short OTP mails to long threads
+    messages     Gmail API message dicts, flat to deeply nested MIME
+"""
+import base64
+import random
+from typing import Any, Dict, List
+
+SEED = 2024
+
+SUBJECT_PARTS = [
+    'Your verification code', 'Re: Q3 planning [draft #2]', 'Fwd: Invoice (#INV-2024-0042)',
+    '🎉 50% off — today only!', 'Réunion déplacée à 14h30', '会議の議事録 (2024/05/10)',
+    'Ваш заказ отправлен', 'تم تأكيد طلبك', 'Weekly digest: 10 stories you missed',
+    'Security alert: new sign-in on Windows', '[GitHub] PR #1234 merged: fix_parser()',
+    'Straße & Café — Öffnungszeiten', 'Re: Re: Re: lunch?', '✈️ Your trip to São Paulo',
+    'Price drop: *Sony* WH-1000XM5 = $279.99!', '{urgent} server_load > 95% | alert',
+]
+NAMES = [
+    ('GitHub', 'noreply@github.com'), ('Google', 'no-reply@accounts.google.com'),
+    ('Zoë Müller', 'zoe.mueller@example.de'), ('山田 太郎', 'taro@example.jp'),
+    ('Amazon.com', 'shipment-tracking@amazon.com'), ('José Ñúñez', 'jose@example.es'),
+    ('The Weekly Digest', 'digest@newsletter.example'), ('Bank Alerts', 'alerts@bank.example'),
+]
+LABELS = [
+    'My Accounts', 'Add Account', 'Inbox', 'Compose', 'Search', 'Folders', 'Labels', 'Settings',
+    'Help', 'Back', 'Back to Inbox', 'Main Menu', 'Refresh', 'Reply', 'Forward', 'Mark Read',
+    'Mark Unread', 'Delete', 'Full Email', 'Unsubscribe', 'Spam', 'Star', 'Cancel', 'Message',
+    'Subject', 'From', 'Date', 'Preview', 'OTP', 'Welcome to AutoXMail', 'Privacy Settings',
+    '1m', '5m', '30m', '1h', '6h', '24h', 'Custom Search', 'Next Page', 'Prev Page',
+]
+WORDS = (
+    'the report quarterly numbers attached please review meeting agenda update team project '
+    'deadline invoice payment order shipped delivery tracking account security password '
+    'café naïve résumé über straße 東京 données 🚀 ✅ é ñ'
+).split()
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def subjects(count: int = 200) -> List[str]:
+    rng = random.Random(SEED)
+    return [f'{rng.choice(SUBJECT_PARTS)} {rng.choice(["", "(1)", "— reminder", "!!", "#42"])}'.strip()
+            for _ in range(count)]
+
+
+def senders(count: int = 200) -> List[str]:
+    rng = random.Random(SEED + 1)
+    return [f'"{name}" <{address}>' for name, address in (rng.choice(NAMES) for _ in range(count))]
+
+
+def labels() -> List[str]:
+    return list(LABELS)
+
+
+def newsletter(rng: random.Random) -> str:
+    """One long HTML newsletter."""
+    blocks = []
+    for i in range(rng.randrange(20, 60)):
+        blocks.append(
+            f'<tr><td style="padding:12px;font-family:Arial,sans-serif;color:#333">'
+            f'<h2 style="margin:0">{rng.choice(SUBJECT_PARTS)}</h2>'
+            f'<p>{_sentence(rng, rng.randrange(30, 120))} &amp; more &mdash; &#8220;quoted&#8221;</p>'
+            f'<a href="https://click.example.com/t/{rng.getrandbits(64):x}?utm_source=news&amp;id={i}">'
+            f'Read more &raquo;</a></td></tr>'
+        )
+    return (
+        '<!DOCTYPE html><html><head><style>body{margin:0}.btn{color:#fff}</style></head><body>'
+        '<table width="100%" cellpadding="0" cellspacing="0">' + ''.join(blocks) +
+        '</table><p style="font-size:11px">Unsubscribe | Manage preferences | © 2024 Example Inc.</p>'
+        '</body></html>'
+    )
+
+
+def newsletters(count: int = 20) -> List[str]:
+    rng = random.Random(SEED + 2)
+    return [newsletter(rng) for _ in range(count)]
+
+
+def bodies(count: int = 100) -> List[str]:
+    """Plain-text bodies: OTP mails, short notes and long quoted threads."""
+    rng = random.Random(SEED + 3)
+    result = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            result.append(f'Your verification code is {rng.randrange(10 ** 6):06d}. It expires in 10 minutes.')
+        elif kind == 1:
+            result.append('\n'.join(_sentence(rng, rng.randrange(5, 20)) for _ in range(rng.randrange(2, 8))))
+        else:
+            paragraphs = []
+            for depth in range(rng.randrange(5, 25)):
+                quote = '> ' * min(depth, 4)
+                paragraphs.append('\n'.join(quote + _sentence(rng, rng.randrange(8, 30))
+                                            for _ in range(rng.randrange(2, 6))))
+            result.append('\n\n'.join(paragraphs))
+    return result
+
+
+def _leaf(mime_type: str, text: str, charset: str = 'UTF-8') -> Dict[str, Any]:
+    return {
+        'mimeType': mime_type, 'filename': '',
+        'headers': [{'name': 'Content-Type', 'value': f'{mime_type}; charset="{charset}"'}],
+        'body': {'size': len(text), 'data': _b64(text)},
+    }
+
+
+def _attachment(rng: random.Random) -> Dict[str, Any]:
+    return {
+        'mimeType': 'application/pdf', 'filename': f'report-{rng.randrange(1000)}.pdf',
+        'headers': [{'name': 'Content-Disposition', 'value': 'attachment; filename="report.pdf"'}],
+        'body': {'size': 48213, 'attachmentId': f'ANGjdJ{rng.getrandbits(64):x}'},
+    }
+
+
+def _nest(rng: random.Random, depth: int, text: str, html: str) -> Dict[str, Any]:
+    """multipart/mixed > related > ... > alternative(text, html), depth levels deep."""
+    part = {'mimeType': 'multipart/alternative', 'headers': [], 'body': {'size': 0},
+            'parts': [_leaf('text/plain', text), _leaf('text/html', html)]}
+    for level in range(depth):
+        kind = ['multipart/related', 'multipart/mixed', 'message/rfc822'][level % 3]
+        siblings = [_attachment(rng)] if level % 2 else [{'mimeType': 'image/png', 'filename': 'logo.png',
+                                                          'headers': [], 'body': {'size': 512, 'attachmentId': 'img'}}]
+        part = {'mimeType': kind, 'headers': [], 'body': {'size': 0}, 'parts': siblings + [part]}
+    return part
+
+
+def messages(count: int = 60) -> List[Dict[str, Any]]:
+    """Gmail API messages (format=full): flat text, HTML only and nested MIME."""
+    rng = random.Random(SEED + 4)
+    subject_list, sender_list = subjects(count), senders(count)
+    body_list, html_list = bodies(count), newsletters(max(1, count // 3))
+    result = []
+    for i in range(count):
+        text = body_list[i]
+        kind = i % 3
+        if kind == 0:
+            payload = _leaf('text/plain', text)
+        elif kind == 1:
+            payload = _leaf('text/html', html_list[i % len(html_list)])
+        else:
+            payload = _nest(rng, rng.randrange(3, 9), text, html_list[i % len(html_list)])
+
+        headers = [
+            {'name': 'Delivered-To', 'value': 'me@example.com'},
+            {'name': 'Received', 'value': 'from mail.example.com by mx.google.com with ESMTPS'},
+            {'name': 'Received', 'value': 'from relay.example.net by mail.example.com'},
+            {'name': 'DKIM-Signature', 'value': 'v=1; a=rsa-sha256; d=example.com; ' + 'x' * 300},
+            {'name': 'From', 'value': sender_list[i]},
+            {'name': 'To', 'value': 'Me <me@example.com>'},
+            {'name': 'Subject', 'value': subject_list[i]},
+            {'name': 'Date', 'value': f'Fri, {1 + i % 28:02d} May 2024 10:{i % 60:02d}:00 +0000'},
+            {'name': 'Message-ID', 'value': f'<{rng.getrandbits(64):x}@example.com>'},
+            {'name': 'List-Unsubscribe', 'value': '<mailto:unsub@newsletter.example>'},
+        ]
+        payload = dict(payload, headers=headers + payload['headers'])
+        result.append({
+            'id': f'{0x18f00000000 + i:x}', 'threadId': f'{0x18f00000000 + i:x}',
+            'labelIds': ['INBOX', 'UNREAD'] if i % 2 else ['INBOX'],
+            'snippet': text[:150].replace('&', '&amp;'),
+            'internalDate': str(1715335200000 + i * 60000),
+            'payload': payload,
+        })
+    return result
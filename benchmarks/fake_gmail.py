@@ -0,0 +1,463 @@
+"""Local stand-in for the Gmail REST API.
+
+Serves the endpoints the bot uses from synthetic, deterministic mailboxes
+(one per bearer token) and can inject latency, 429 and 5xx responses.
+Point the bot at it with GMAIL_API_BASE_URL=http://127.0.0.1:8765.
+
+Run from the project root:
+    python benchmarks/fake_gmail.py --port 8765 --messages 500 --latency-ms 20 --error-rate 0.01
+"""
+import json
+import time
+import zlib
+import base64
+import random
+import asyncio
+import argparse
+from datetime import datetime
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+from aiohttp import web
+from multidict import MultiDict
+
+SENDERS = [
+    'GitHub <noreply@github.com>', 'Google <no-reply@accounts.google.com>',
+    'Amazon <shipment-tracking@amazon.com>', 'Alice Smith <alice@example.com>',
+    'Weekly Digest <digest@newsletter.example>', 'Bank Alerts <alerts@bank.example>',
+]
+SUBJECTS = [
+    'Your verification code', 'Weekly newsletter', 'Your order has shipped',
+    'Meeting notes', 'Security alert', 'Invoice attached', 'Re: project update',
+]
+SYSTEM_LABELS = ['INBOX', 'UNREAD', 'STARRED', 'IMPORTANT', 'SENT', 'DRAFT', 'SPAM', 'TRASH']
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+class Mailbox:
+    """Synthetic mailbox with a history counter."""
+
+    def __init__(self, email: str, size: int, seed: int):
+        self.email = email
+        self.rng = random.Random(seed)
+        self.messages: Dict[str, Dict[str, Any]] = {}
+        self.order: List[str] = []  # newest first
+        self.labels = {name: {'id': name, 'name': name, 'type': 'system'} for name in SYSTEM_LABELS}
+        self.history_id = 1000
+        self.history: List[Dict[str, Any]] = []
+        # Generated mail is one message a minute up to now, so date
+        # searches like the inbox's after:YYYY/MM/DD find the newest
+        self.epoch = int(time.time()) - size * 60
+        for _ in range(size):
+            self.deliver(record=False)
+
+    def deliver(self, record: bool = True) -> Dict[str, Any]:
+        """Add a new inbox message."""
+        rng = self.rng
+        self.history_id += 1
+        message_id = f'{self.history_id:016x}'
+        sent = int(time.time()) if record else self.epoch + (self.history_id - 1000) * 60
+        sender = rng.choice(SENDERS)
+        subject = rng.choice(SUBJECTS)
+        code = f'{rng.randrange(10 ** 6):06d}'
+        if 'code' in subject or 'Security' in subject:
+            text = f'Your verification code is {code}. It expires in 10 minutes.'
+        else:
+            text = ' '.join(rng.choice(['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'update', 'report'])
+                            for _ in range(rng.randrange(40, 400)))
+        html = f'<html><body><p>{text}</p>{"<div>footer</div>" * rng.randrange(1, 50)}</body></html>'
+
+        headers = [
+            {'name': 'From', 'value': sender},
+            {'name': 'To', 'value': self.email},
+            {'name': 'Subject', 'value': subject},
+            {'name': 'Date', 'value': formatdate(sent)},
+            {'name': 'Message-ID', 'value': f'<{message_id}@fake.example>'},
+        ]
+        if 'newsletter' in subject:
+            headers.append({'name': 'List-Unsubscribe', 'value': '<mailto:unsub@newsletter.example>'})
+
+        labels = ['INBOX'] + (['UNREAD'] if rng.random() < 0.5 else [])
+        message = {
+            'id': message_id,
+            'threadId': message_id,
+            'labelIds': labels,
+            'snippet': text[:200],
+            'historyId': str(self.history_id),
+            'internalDate': str(sent * 1000),
+            'sizeEstimate': len(text) + len(html),
+            'payload': {
+                'mimeType': 'multipart/alternative',
+                'headers': headers,
+                'body': {'size': 0},
+                'parts': [
+                    {'partId': '0', 'mimeType': 'text/plain', 'filename': '',
+                     'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset="UTF-8"'}],
+                     'body': {'size': len(text), 'data': _b64(text)}},
+                    {'partId': '1', 'mimeType': 'text/html', 'filename': '',
+                     'headers': [{'name': 'Content-Type', 'value': 'text/html; charset="UTF-8"'}],
+                     'body': {'size': len(html), 'data': _b64(html)}},
+                ],
+            },
+        }
+        self.messages[message_id] = message
+        self.order.insert(0, message_id)
+        if record:
+            self.history.append({'id': str(self.history_id), 'messagesAdded': [{'message': {
+                'id': message_id, 'threadId': message_id, 'labelIds': labels}}]})
+        return message
+
+    def render(self, message: Dict[str, Any], format: str, headers: Optional[List[str]]) -> Dict[str, Any]:
+        """Shape a message like messages.get does."""
+        if format == 'full':
+            return message
+        result = {k: v for k, v in message.items() if k != 'payload'}
+        if format == 'metadata':
+            wanted = {h.lower() for h in headers} if headers else None
+            result['payload'] = {
+                'mimeType': message['payload']['mimeType'],
+                'headers': [h for h in message['payload']['headers']
+                            if wanted is None or h['name'].lower() in wanted],
+            }
+        return result
+
+    def modify(self, message_id: str, add: List[str], remove: List[str]) -> Dict[str, Any]:
+        """Change a message's labels and record it in history."""
+        message = self.messages[message_id]
+        labels = [label for label in message['labelIds'] if label not in remove]
+        labels += [label for label in add if label not in labels]
+        message['labelIds'] = labels
+        self.history_id += 1
+        self.history.append({'id': str(self.history_id), 'labelsAdded': [{
+            'message': {'id': message_id, 'labelIds': labels}, 'labelIds': add}]})
+        return {'id': message_id, 'threadId': message['threadId'], 'labelIds': labels}
+
+    def matches(self, message: Dict[str, Any], query: str) -> bool:
+        """Evaluate the subset of Gmail search syntax the bot sends.
+
+        Supports after:/before: (YYYY/MM/DD), is:unread/read/starred, from:,
+        subject: and bare words (matched against snippet and headers).
+        """
+        headers = {h['name'].lower(): h['value'].lower() for h in message['payload']['headers']}
+        sent = int(message['internalDate']) // 1000
+        for term in query.lower().split():
+            operator, _, value = term.partition(':')
+            if not value:
+                operator, value = '', term
+            if operator in ('after', 'before'):
+                bound = datetime.strptime(value, '%Y/%m/%d').timestamp()
+                if (sent < bound) if operator == 'after' else (sent >= bound):
+                    return False
+            elif operator == 'is':
+                label = {'unread': 'UNREAD', 'starred': 'STARRED', 'important': 'IMPORTANT'}.get(value)
+                if value == 'read':
+                    if 'UNREAD' in message['labelIds']:
+                        return False
+                elif label and label not in message['labelIds']:
+                    return False
+            elif operator in ('from', 'to', 'subject'):
+                if value not in headers.get(operator, ''):
+                    return False
+            elif value not in message['snippet'].lower() and not any(value in v for v in headers.values()):
+                return False
+        return True
+
+
+class FakeGmail:
+    """aiohttp application serving fake mailboxes.
+
+    Args:
+        messages: Messages generated per mailbox
+        latency_ms: Added delay per request
+        jitter_ms: Random extra delay (0..jitter_ms)
+        rate_429: Share of requests answered with 429
+        rate_5xx: Share of requests answered with 503
+        seed: Seed for mailbox contents and fault injection
+    """
+
+    def __init__(self, messages: int = 200, latency_ms: float = 0, jitter_ms: float = 0,
+                 rate_429: float = 0, rate_5xx: float = 0, seed: int = 1):
+        self.size = messages
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.mailboxes: Dict[str, Mailbox] = {}
+        self.requests: Dict[str, int] = {}
+        self.app = self._build_app()
+
+    def mailbox(self, token: str) -> Mailbox:
+        """Get (or generate) the mailbox of a bearer token."""
+        box = self.mailboxes.get(token)
+        if box is None:
+            box = Mailbox(f'{token}@fake.example', self.size, zlib.crc32(f'{self.seed}:{token}'.encode()))
+            self.mailboxes[token] = box
+        return box
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._faults])
+        base = '/gmail/v1/users/{user}/'
+        routes = [
+            ('GET', 'messages', self.messages_list),
+            ('GET', 'messages/{id}', self.messages_get),
+            ('POST', 'messages/{id}/modify', self.messages_modify),
+            ('POST', 'messages/{id}/trash', self.messages_trash),
+            ('POST', 'messages/send', self.messages_send),
+            ('POST', 'messages/batchModify', self.messages_batch_modify),
+            ('GET', 'labels', self.labels_list),
+            ('POST', 'labels', self.labels_create),
+            ('DELETE', 'labels/{id}', self.labels_delete),
+            ('GET', 'history', self.history_list),
+            ('POST', 'watch', self.watch),
+            ('GET', 'profile', self.profile),
+        ]
+        for method, path, handler in routes:
+            app.router.add_route(method, base + path, handler)
+        app.router.add_post('/batch/gmail/v1', self.batch)
+        app.router.add_post('/batch', self.batch)
+        app.router.add_post('/_fake/deliver', self.fake_deliver)
+        app.router.add_get('/_fake/stats', self.fake_stats)
+        return app
+
+    # Fault injection / accounting
+
+    async def _delay(self):
+        delay = self.latency_ms + (self.rng.random() * self.jitter_ms if self.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    def _fault(self) -> Optional[int]:
+        """Pick an injected error status (None for success)."""
+        roll = self.rng.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_5xx:
+            return 503
+        return None
+
+    @web.middleware
+    async def _faults(self, request: web.Request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        key = f'{request.method} {route}'
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+        if request.path.startswith('/_fake/'):
+            return await handler(request)
+
+        await self._delay()
+        status = self._fault()
+        if status:
+            return _error(status)
+        if not request.headers.get('Authorization', '').startswith('Bearer '):
+            return _error(401)
+        return await handler(request)
+
+    def _box(self, request: web.Request) -> Mailbox:
+        return self.mailbox(request.headers['Authorization'][len('Bearer '):])
+
+    # users.messages
+
+    async def messages_list(self, request: web.Request):
+        box = self._box(request)
+        label_ids = request.query.getall('labelIds', [])
+        query = request.query.get('q', '')
+        max_results = int(request.query.get('maxResults', 100))
+        offset = int(request.query.get('pageToken', 0) or 0)
+
+        ids = [
+            message_id for message_id in box.order
+            if all(label in box.messages[message_id]['labelIds'] for label in label_ids)
+            and (not query or box.matches(box.messages[message_id], query))
+        ]
+        page = ids[offset:offset + max_results]
+        result = {
+            'messages': [{'id': i, 'threadId': box.messages[i]['threadId']} for i in page],
+            'resultSizeEstimate': len(ids),
+        }
+        if offset + max_results < len(ids):
+            result['nextPageToken'] = str(offset + max_results)
+        return web.json_response(result)
+
+    async def messages_get(self, request: web.Request):
+        box = self._box(request)
+        message = box.messages.get(request.match_info['id'])
+        if message is None:
+            return _error(404)
+        return web.json_response(box.render(
+            message, request.query.get('format', 'full'), request.query.getall('metadataHeaders', [])
+        ))
+
+    async def messages_modify(self, request: web.Request):
+        box = self._box(request)
+        message_id = request.match_info['id']
+        if message_id not in box.messages:
+            return _error(404)
+        body = await request.json()
+        return web.json_response(box.modify(
+            message_id, body.get('addLabelIds', []), body.get('removeLabelIds', [])
+        ))
+
+    async def messages_trash(self, request: web.Request):
+        box = self._box(request)
+        message_id = request.match_info['id']
+        if message_id not in box.messages:
+            return _error(404)
+        return web.json_response(box.modify(message_id, ['TRASH'], ['INBOX']))
+
+    async def messages_send(self, request: web.Request):
+        box = self._box(request)
+        body = await request.json()
+        box.history_id += 1
+        message_id = f'{box.history_id:016x}'
+        return web.json_response({
+            'id': message_id, 'threadId': body.get('threadId', message_id), 'labelIds': ['SENT']
+        })
+
+    async def messages_batch_modify(self, request: web.Request):
+        box = self._box(request)
+        body = await request.json()
+        for message_id in body.get('ids', []):
+            if message_id in box.messages:
+                box.modify(message_id, body.get('addLabelIds', []), body.get('removeLabelIds', []))
+        return web.Response(status=204)
+
+    # users.labels
+
+    async def labels_list(self, request: web.Request):
+        return web.json_response({'labels': list(self._box(request).labels.values())})
+
+    async def labels_create(self, request: web.Request):
+        box = self._box(request)
+        body = await request.json()
+        label_id = f'Label_{len(box.labels)}'
+        label = dict(body, id=label_id, type='user')
+        box.labels[label_id] = label
+        return web.json_response(label)
+
+    async def labels_delete(self, request: web.Request):
+        box = self._box(request)
+        if box.labels.pop(request.match_info['id'], None) is None:
+            return _error(404)
+        return web.Response(status=204)
+
+    # users.history / watch / profile
+
+    async def history_list(self, request: web.Request):
+        box = self._box(request)
+        start = int(request.query.get('startHistoryId', 0))
+        if start < 1000:
+            return _error(404)
+        records = [record for record in box.history if int(record['id']) > start]
+        return web.json_response({'history': records, 'historyId': str(box.history_id)})
+
+    async def watch(self, request: web.Request):
+        box = self._box(request)
+        return web.json_response({'historyId': str(box.history_id), 'expiration': '9999999999999'})
+
+    async def profile(self, request: web.Request):
+        box = self._box(request)
+        return web.json_response({
+            'emailAddress': box.email, 'messagesTotal': len(box.messages),
+            'threadsTotal': len(box.messages), 'historyId': str(box.history_id),
+        })
+
+    # batch
+
+    async def batch(self, request: web.Request):
+        """Answer a multipart/mixed batch of GET messages requests."""
+        box = self._box(request)
+        boundary = request.headers.get('Content-Type', '').partition('boundary=')[2].strip('"')
+        body = (await request.text()).replace('\r\n', '\n')
+
+        out_boundary = f'batch_{self.rng.getrandbits(64):016x}'
+        parts = []
+        for chunk in body.split(f'--{boundary}'):
+            chunk = chunk.strip()
+            if not chunk or chunk == '--':
+                continue
+            outer, _, http_part = chunk.partition('\n\n')
+            content_id = ''
+            for line in outer.split('\n'):
+                name, _, value = line.partition(':')
+                if name.strip().lower() == 'content-id':
+                    content_id = value.strip().strip('<>')
+
+            request_line = http_part.split('\n', 1)[0]
+            _, target, *_ = request_line.split()
+            path, _, query_string = target.partition('?')
+            query = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+
+            status = self._fault()
+            if status:
+                code, payload = status, {'error': {'code': status}}
+            else:
+                message = box.messages.get(path.rstrip('/').rsplit('/', 1)[-1])
+                if message is None:
+                    code, payload = 404, {'error': {'code': 404}}
+                else:
+                    code, payload = 200, box.render(message, query.get('format', 'full'),
+                                                    query.getall('metadataHeaders', []))
+
+            reason = {200: 'OK', 404: 'Not Found', 429: 'Too Many Requests', 503: 'Service Unavailable'}[code]
+            parts.append(
+                f'--{out_boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 {code} {reason}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{json.dumps(payload)}\r\n'
+            )
+        parts.append(f'--{out_boundary}--\r\n')
+        return web.Response(
+            body=''.join(parts).encode(),
+            headers={'Content-Type': f'multipart/mixed; boundary={out_boundary}'}
+        )
+
+    # control endpoints
+
+    async def fake_deliver(self, request: web.Request):
+        """Deliver new messages: /_fake/deliver?token=...&count=N"""
+        box = self.mailbox(request.query['token'])
+        delivered = [box.deliver()['id'] for _ in range(int(request.query.get('count', 1)))]
+        return web.json_response({'delivered': delivered, 'historyId': str(box.history_id)})
+
+    async def fake_stats(self, request: web.Request):
+        return web.json_response({'requests': self.requests, 'mailboxes': len(self.mailboxes)})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> web.AppRunner:
+        """Serve in the running loop; call runner.cleanup() to stop."""
+        runner = web.AppRunner(self.app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def _error(status: int) -> web.Response:
+    return web.json_response({'error': {'code': status, 'message': 'injected' if status != 404 else 'Not Found'}},
+                             status=status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--messages', type=int, default=200, help='messages per mailbox')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0, help='share of requests answered 429')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered 503')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeGmail(args.messages, args.latency_ms, args.jitter_ms, args.rate_429, args.error_rate, args.seed)
+    print(f'Fake Gmail on http://{args.host}:{args.port}')
+    web.run_app(fake.app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    main()
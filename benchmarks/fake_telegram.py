@@ -0,0 +1,380 @@
+"""Local stand-in for the Telegram Bot API.
+
+Serves the Bot API methods the bot uses, queues updates injected by a
+scripted UserSimulator and records everything the bot sends. Can inject
+latency and 429 "retry after" responses. Point the bot at it with
+TELEGRAM_API_BASE_URL=http://127.0.0.1:8081/bot and
+TELEGRAM_FILE_BASE_URL=http://127.0.0.1:8081/file/bot.
+
+Run from the project root:
+    python benchmarks/fake_telegram.py --port 8081 --latency-ms 20 --rate-429 0.01
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+from aiohttp import web
+
+BOT_USER = {'id': 100000, 'is_bot': True, 'first_name': 'AutoXMail', 'username': 'autoxmail_fake_bot'}
+
+# Parameters Telegram takes as plain strings (everything else is JSON encoded)
+STRING_PARAMS = {
+    'text', 'caption', 'callback_query_id', 'inline_message_id', 'file_id',
+    'parse_mode', 'short_description', 'description', 'url', 'chat_instance',
+}
+
+
+def _decode(name: str, value: str) -> Any:
+    """Undo python-telegram-bot's form encoding of one parameter."""
+    if name in STRING_PARAMS:
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _ok(result: Any) -> web.Response:
+    return web.json_response({'ok': True, 'result': result})
+
+
+def _fail(code: int, description: str, **parameters) -> web.Response:
+    body = {'ok': False, 'error_code': code, 'description': description}
+    if parameters:
+        body['parameters'] = parameters
+    return web.json_response(body, status=code)
+
+
+class FakeTelegram:
+    """aiohttp application serving the Bot API.
+
+    Args:
+        latency_ms: Added delay per request (getUpdates excluded)
+        jitter_ms: Random extra delay (0..jitter_ms)
+        rate_429: Share of outgoing requests answered with 429
+        retry_after: retry_after seconds sent with injected 429s
+        seed: Seed for fault injection
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, rate_429: float = 0,
+                 retry_after: int = 1, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+
+        self.updates: List[Dict[str, Any]] = []
+        self.next_update_id = 1
+        self.new_updates = asyncio.Event()
+
+        self.chats: Dict[int, Dict[str, Any]] = {}
+        self.messages: Dict[int, Dict[int, Dict[str, Any]]] = {}  # chat_id -> message_id -> message
+        self.next_message_id: Dict[int, int] = {}
+        self.outbox: Dict[int, asyncio.Queue] = {}  # chat_id -> sent/edited messages
+
+        self.requests: Dict[str, int] = {}
+        self.throttled = 0
+        self.app = self._build_app()
+
+    def _build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self.dispatch)
+        app.router.add_get('/file/bot{token}/{path:.*}', self.download)
+        app.router.add_get('/_fake/stats', self.fake_stats)
+        return app
+
+    # Update queue (used by UserSimulator)
+
+    def push_update(self, update: Dict[str, Any]) -> int:
+        """Queue an update for getUpdates and return its update_id."""
+        update_id = self.next_update_id
+        self.next_update_id += 1
+        self.updates.append(dict(update, update_id=update_id))
+        self.new_updates.set()
+        return update_id
+
+    def chat(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Get (or open) the private chat of a user."""
+        chat = self.chats.get(user['id'])
+        if chat is None:
+            chat = {'id': user['id'], 'type': 'private', 'first_name': user['first_name']}
+            if user.get('username'):
+                chat['username'] = user['username']
+            self.chats[user['id']] = chat
+            self.messages[user['id']] = {}
+            self.next_message_id[user['id']] = 1
+            self.outbox[user['id']] = asyncio.Queue()
+        return chat
+
+    def new_message(self, chat_id: int, sender: Dict[str, Any], **fields) -> Dict[str, Any]:
+        """Store a message in a chat and return it."""
+        chat = self.chats.get(chat_id) or self.chat({'id': chat_id, 'first_name': str(chat_id)})
+        message_id = self.next_message_id[chat_id]
+        self.next_message_id[chat_id] += 1
+        message = {'message_id': message_id, 'from': sender, 'chat': chat, 'date': int(time.time())}
+        message.update(fields)
+        self.messages[chat_id][message_id] = message
+        return message
+
+    # Request handling
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        if request.method == 'GET':
+            return {name: _decode(name, value) for name, value in request.query.items()}
+        if request.content_type == 'application/json':
+            return await request.json()
+        form = await request.post()
+        # Uploaded files (FileField) are not kept
+        return {name: _decode(name, value) for name, value in form.items() if isinstance(value, str)}
+
+    async def dispatch(self, request: web.Request):
+        method = request.match_info['method']
+        self.requests[method] = self.requests.get(method, 0) + 1
+        params = await self._params(request)
+
+        if method == 'getUpdates':
+            return _ok(await self.get_updates(params))
+
+        delay = self.latency_ms + (self.rng.random() * self.jitter_ms if self.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if self.rate_429 and self.rng.random() < self.rate_429:
+            self.throttled += 1
+            return _fail(429, f'Too Many Requests: retry after {self.retry_after}',
+                         retry_after=self.retry_after)
+
+        handler = getattr(self, f'm_{method}', None)
+        if handler is None:
+            # setMyShortDescription, setMyDescription, deleteWebhook, ...
+            return _ok(True)
+        try:
+            return _ok(handler(params))
+        except KeyError as e:
+            return _fail(400, f'Bad Request: {e.args[0]}')
+
+    async def get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Long-poll for updates after offset."""
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+
+        # Confirmed updates are dropped
+        self.updates = [update for update in self.updates if update['update_id'] >= offset]
+        if not self.updates and timeout:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(self.new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:limit]
+
+    def _record(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Hand a sent/edited message to whoever waits on the chat."""
+        queue = self.outbox.get(message['chat']['id'])
+        if queue is not None:
+            queue.put_nowait(dict(message))
+        return message
+
+    # Bot API methods (m_<method>)
+
+    def m_getMe(self, params):
+        return dict(BOT_USER, can_join_groups=True, can_read_all_group_messages=False,
+                    supports_inline_queries=False)
+
+    def m_sendMessage(self, params):
+        fields = {'text': params['text']}
+        if params.get('reply_markup'):
+            fields['reply_markup'] = params['reply_markup']
+        return self._record(self.new_message(int(params['chat_id']), BOT_USER, **fields))
+
+    def m_editMessageText(self, params):
+        if 'inline_message_id' in params:
+            return True
+        message = self.messages[int(params['chat_id'])][int(params['message_id'])]
+        message['text'] = params['text']
+        message['edit_date'] = int(time.time())
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        else:
+            message.pop('reply_markup', None)
+        return self._record(message)
+
+    def m_editMessageReplyMarkup(self, params):
+        message = self.messages[int(params['chat_id'])][int(params['message_id'])]
+        message['reply_markup'] = params.get('reply_markup')
+        return self._record(message)
+
+    def m_deleteMessage(self, params):
+        chat_messages = self.messages.get(int(params['chat_id']), {})
+        return chat_messages.pop(int(params['message_id']), None) is not None
+
+    def m_answerCallbackQuery(self, params):
+        return True
+
+    def m_getChatMember(self, params):
+        user_id = int(params['user_id'])
+        chat = self.chats.get(user_id, {})
+        return {'status': 'member', 'user': {'id': user_id, 'is_bot': False,
+                                             'first_name': chat.get('first_name', str(user_id))}}
+
+    def m_setMyCommands(self, params):
+        return True
+
+    def m_getFile(self, params):
+        file_id = params['file_id']
+        return {'file_id': file_id, 'file_unique_id': file_id[-16:], 'file_size': 1024,
+                'file_path': f'documents/{file_id}.bin'}
+
+    def m_sendPhoto(self, params):
+        return self._record(self.new_message(int(params['chat_id']), BOT_USER, caption=params.get('caption', '')))
+
+    def m_sendDocument(self, params):
+        return self._record(self.new_message(int(params['chat_id']), BOT_USER, caption=params.get('caption', '')))
+
+    async def download(self, request: web.Request):
+        return web.Response(body=b'\0' * 1024, content_type='application/octet-stream')
+
+    async def fake_stats(self, request: web.Request):
+        return web.json_response({'requests': self.requests, 'throttled': self.throttled,
+                                  'pending_updates': len(self.updates)})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8081) -> web.AppRunner:
+        """Serve in the running loop; call runner.cleanup() to stop."""
+        runner = web.AppRunner(self.app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+class UserSimulator:
+    """One scripted Telegram user talking to the bot through FakeTelegram.
+
+    Each step injects an update and waits for the bot's next sent or
+    edited message in the user's chat (or the first one passing ``until``);
+    step latencies are kept in ``latencies`` by step name.
+    """
+
+    def __init__(self, fake: FakeTelegram, user_id: int, timeout: float = 30):
+        self.fake = fake
+        self.user = {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}',
+                     'username': f'user{user_id}', 'language_code': 'en'}
+        self.chat = fake.chat(self.user)
+        self.timeout = timeout
+        self.screen: Optional[Dict[str, Any]] = None  # last message shown by the bot
+        self.latencies: Dict[str, List[float]] = {}
+        self._callbacks = 0
+
+    @property
+    def inbox(self) -> asyncio.Queue:
+        """Messages the bot sent or edited in this chat."""
+        return self.fake.outbox[self.chat['id']]
+
+    async def _step(self, name: str, update: Dict[str, Any],
+                    until: Callable[[Dict[str, Any]], bool] = None) -> Dict[str, Any]:
+        queue = self.inbox
+        while not queue.empty():
+            queue.get_nowait()
+
+        started = time.perf_counter()
+        self.fake.push_update(update)
+        deadline = started + self.timeout
+        while True:
+            message = await asyncio.wait_for(queue.get(), max(0, deadline - time.perf_counter()))
+            if until is None or until(message):
+                break
+        self.screen = message
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        return message
+
+    async def send(self, text: str, name: str = None,
+                   until: Callable[[Dict[str, Any]], bool] = None) -> Dict[str, Any]:
+        """Send a text message (or /command) and wait for the reply."""
+        fields = {'text': text}
+        if text.startswith('/'):
+            fields['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        message = self.fake.new_message(self.chat['id'], self.user, **fields)
+        return await self._step(name or text.split()[0], {'message': message}, until)
+
+    async def press(self, callback_data: str, name: str = None,
+                    until: Callable[[Dict[str, Any]], bool] = None) -> Dict[str, Any]:
+        """Press an inline button of the current screen and wait for the result."""
+        self._callbacks += 1
+        query = {
+            'id': f"{self.user['id']}_{self._callbacks}",
+            'from': self.user,
+            'chat_instance': str(self.chat['id']),
+            'message': self.screen,
+            'data': callback_data,
+        }
+        return await self._step(name or callback_data.split(':')[0], {'callback_query': query}, until)
+
+    async def receive(self, count: int) -> List[float]:
+        """Wait for count unprompted messages (e.g. notifications).
+
+        Returns:
+            perf_counter() arrival time of each message
+        """
+        arrivals = []
+        deadline = time.perf_counter() + self.timeout
+        for _ in range(count):
+            await asyncio.wait_for(self.inbox.get(), max(0, deadline - time.perf_counter()))
+            arrivals.append(time.perf_counter())
+        return arrivals
+
+    def buttons(self, prefix: str = '') -> List[str]:
+        """callback_data of the current screen's buttons starting with prefix."""
+        markup = (self.screen or {}).get('reply_markup') or {}
+        return [
+            button['callback_data']
+            for row in markup.get('inline_keyboard', [])
+            for button in row
+            if button.get('callback_data', '').startswith(prefix)
+        ]
+
+    async def inbox_flow(self, time_range: str = '24h') -> bool:
+        """/start -> Inbox -> time range -> first message.
+
+        Returns:
+            True if a message was opened
+        """
+        await self.send('/start')
+        await self.press('inbox')
+        await self.press(f'inbox_time:{time_range}')
+        messages = self.buttons('view_msg:')
+        if not messages:
+            return False
+        await self.press(messages[0])
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0, help='share of requests answered 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    async def serve():
+        fake = FakeTelegram(args.latency_ms, args.jitter_ms, args.rate_429, args.retry_after, args.seed)
+        runner = await fake.start(args.host, args.port)
+        print(f'Fake Telegram on http://{args.host}:{args.port}/bot')
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Run the whole bot in-process against the fake Telegram and Gmail servers.
+
+Import this before any bot module: it points the bot's Telegram and Gmail
+endpoints at the fakes and puts src/ on the path.
+"""
+import os
+import sys
+import json
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Dict, List
+
+TELEGRAM_PORT = 8081
+GMAIL_PORT = 8765
+PUSH_PORT = 8082
+os.environ.setdefault('BOT_TOKEN', '123456:bench')
+os.environ.setdefault('MASTER_KEY', 'bench')
+os.environ.setdefault('ADMIN_CHAT_ID', '1')
+os.environ['TELEGRAM_API_BASE_URL'] = f'http://127.0.0.1:{TELEGRAM_PORT}/bot'
+os.environ['TELEGRAM_FILE_BASE_URL'] = f'http://127.0.0.1:{TELEGRAM_PORT}/file/bot'
+os.environ['GMAIL_API_BASE_URL'] = f'http://127.0.0.1:{GMAIL_PORT}'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_gmail import FakeGmail  # noqa: E402
+from fake_telegram import FakeTelegram, UserSimulator  # noqa: E402
+import config  # noqa: E402
+import crypto  # noqa: E402
+import push_service  # noqa: E402
+from database import db  # noqa: E402
+from main import build_application, post_init, post_stop, post_shutdown  # noqa: E402
+
+FIRST_USER_ID = 10000
+
+
+def percentile(samples: List[float], share: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (ms) of one measurement."""
+    if not samples:
+        return {'ops': 0, 'ops_per_sec': 0.0}
+    return {
+        'ops': len(samples),
+        'ops_per_sec': len(samples) / elapsed,
+        'p50_ms': statistics.median(samples) * 1000,
+        'p90_ms': percentile(samples, 0.90) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': max(samples) * 1000,
+    }
+
+
+class BotHarness:
+    """The bot application, both fakes and a temporary database.
+
+    Args:
+        users: Simulated users, each owning one Gmail account
+        messages: Messages per fake mailbox
+        gmail_latency_ms: Fake Gmail delay per request
+        telegram_latency_ms: Fake Telegram delay per request
+        rate_429: Share of Telegram requests answered 429
+        push: Also run the Pub/Sub push endpoint on PUSH_PORT
+
+    Usage:
+        async with BotHarness(users=20) as harness:
+            await harness.users[0].inbox_flow()
+    """
+
+    def __init__(self, users: int = 10, messages: int = 50, gmail_latency_ms: float = 20,
+                 telegram_latency_ms: float = 5, rate_429: float = 0, push: bool = False):
+        self.user_count = users
+        self.push = push
+        self.telegram = FakeTelegram(latency_ms=telegram_latency_ms, rate_429=rate_429)
+        self.gmail = FakeGmail(messages=messages, latency_ms=gmail_latency_ms)
+        self.users: List[UserSimulator] = []
+        self.accounts: Dict[int, int] = {}  # user_id -> account_id
+        self.app = None
+        self._runners = []
+        self._tmp = None
+
+    async def __aenter__(self) -> 'BotHarness':
+        self._tmp = tempfile.TemporaryDirectory()
+        db.db_path = Path(self._tmp.name) / 'bench.db'
+        # Simulated users act far faster than the per-minute limits allow
+        config.RATE_LIMIT_REQUESTS = 1_000_000
+
+        self._runners = [await self.telegram.start(port=TELEGRAM_PORT), await self.gmail.start(port=GMAIL_PORT)]
+
+        self.app = build_application()
+        await self.app.initialize()
+        await post_init(self.app)
+        if self.push:
+            push_service.push_service = push_service.PushService(self.app.bot)
+            await push_service.push_service.start_server('127.0.0.1', PUSH_PORT)
+        await self.app.start()
+        await self.app.updater.start_polling(poll_interval=0, timeout=5)
+
+        await self._add_users()
+        return self
+
+    async def __aexit__(self, *exc):
+        # Same order as Application.run_polling()
+        await self.app.updater.stop()
+        await self.app.stop()
+        await post_stop(self.app)
+        await self.app.shutdown()
+        await post_shutdown(self.app)
+        push_service.push_service = None
+        for runner in self._runners:
+            await runner.cleanup()
+        self._tmp.cleanup()
+
+    async def _add_users(self):
+        """Register users with one Gmail account each (token = fake mailbox)."""
+        for user_id in range(FIRST_USER_ID, FIRST_USER_ID + self.user_count):
+            await db.add_user(user_id, f'user{user_id}', f'User{user_id}')
+            token = json.dumps({
+                'token': self.token(user_id), 'refresh_token': 'bench',
+                'token_uri': 'https://oauth2.googleapis.com/token', 'client_id': 'bench',
+                'client_secret': 'bench', 'scopes': config.SCOPES, 'expiry': None,
+            })
+            credentials_enc, _ = crypto.encrypt_credentials('{}', user_id)
+            await db.add_gmail_account(user_id, self.email(user_id), credentials_enc,
+                                       crypto.encrypt_token(token, user_id))
+            self.accounts[user_id] = (await db.get_gmail_accounts(user_id))[0]['id']
+            self.users.append(UserSimulator(self.telegram, user_id))
+
+    @staticmethod
+    def token(user_id: int) -> str:
+        """Access token of a user's account (selects its fake mailbox)."""
+        return f'acct{user_id}'
+
+    @staticmethod
+    def email(user_id: int) -> str:
+        return f'acct{user_id}@fake.example'
+
+    def mailbox(self, user_id: int):
+        return self.gmail.mailbox(self.token(user_id))
@@ -0,0 +1,98 @@
+"""In-memory routing table for Gmail accounts and per-user push settings."""
+from typing import Dict, Any, List, Iterable
+
+# Defaults for users without settings rows
+DEFAULT_USER_SETTINGS = {
+    'enabled': True,
+    'push_mode': 'all',  # off, otp, vip, all
+    'global_auto_delete_secs': 0,
+}
+
+# Account fields kept in the index (no credentials)
+ACCOUNT_FIELDS = ('id', 'user_id', 'email', 'auto_delete_secs')
+
+
+class AccountIndex:
+    """Email -> active account rows, plus the settings the push filter reads.
+
+    Loaded once at startup and updated by the code paths that write the
+    underlying rows, so webhook routing is a dict lookup.
+    """
+
+    def __init__(self):
+        self.by_email: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.users: Dict[int, Dict[str, Any]] = {}
+
+    def load(self, accounts: Iterable[Dict[str, Any]],
+             user_settings: Iterable[Dict[str, Any]]):
+        """Replace the index contents.
+
+        Args:
+            accounts: Active account rows
+            user_settings: Per-user settings rows (must contain user_id)
+        """
+        self.by_email.clear()
+        self.by_id.clear()
+        self.users.clear()
+
+        for account in accounts:
+            self.add(account)
+        for settings in user_settings:
+            fields = dict(settings)
+            self.update_user(fields.pop('user_id'), **fields)
+
+    def add(self, account: Dict[str, Any]):
+        """Add or replace an account."""
+        entry = {field: account.get(field) for field in ACCOUNT_FIELDS}
+        entry['auto_delete_secs'] = entry['auto_delete_secs'] or 0
+
+        self.remove(entry['id'])
+        self.by_id[entry['id']] = entry
+        self.by_email.setdefault(entry['email'].lower(), {})[entry['id']] = entry
+
+    def remove(self, account_id: int):
+        """Remove an account if present."""
+        entry = self.by_id.pop(account_id, None)
+        if entry is None:
+            return
+
+        key = entry['email'].lower()
+        accounts = self.by_email.get(key)
+        if accounts is not None:
+            accounts.pop(account_id, None)
+            if not accounts:
+                del self.by_email[key]
+
+    def lookup(self, email: str) -> List[Dict[str, Any]]:
+        """Get active accounts for an email address (one per linked user)."""
+        return list(self.by_email.get(email.lower(), {}).values())
+
+    def update_account(self, account_id: int, user_id: int, **fields):
+        """Update indexed fields of an account owned by user_id."""
+        entry = self.by_id.get(account_id)
+        if entry is not None and entry['user_id'] == user_id:
+            entry.update((k, v) for k, v in fields.items() if k in ACCOUNT_FIELDS)
+
+    def get_user_settings(self, user_id: int) -> Dict[str, Any]:
+        """Get push settings for a user (defaults if none stored)."""
+        return self.users.get(user_id, DEFAULT_USER_SETTINGS)
+
+    def update_user(self, user_id: int, **settings):
+        """Merge settings into a user's entry."""
+        entry = self.users.get(user_id)
+        if entry is None:
+            entry = dict(DEFAULT_USER_SETTINGS)
+            self.users[user_id] = entry
+        entry.update(
+            (k, v) for k, v in settings.items()
+            if k in DEFAULT_USER_SETTINGS and v is not None
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index sizes."""
+        return {
+            'accounts': len(self.by_id),
+            'addresses': len(self.by_email),
+            'users': len(self.users),
+        }
@@ -2,12 +2,17 @@
 import os
 import sys
 import psutil
-import aiosqlite
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from database import db
-from formatter import to_tiny_caps, escape_markdown
+from gmail_executor import gmail_executor
+from gmail_service import gmail_service
+import push_service
+from send_scheduler import send_scheduler
+from broadcast import broadcast_manager
+from auto_delete import delete_scheduler
+from render import to_tiny_caps, escape_markdown, header, field
 import config
 
 # Bot start time
@@ -37,8 +42,7 @@ class AdminHandler:
             
             if not log_file.exists():
                 await update.message.reply_text(
-                    f"📋 *{to_tiny_caps('Logs')}*\n"
-                    f"`────────────────────────`\n\n"
+                    header('📋', 'Logs') +
                     f"{to_tiny_caps('No log file found.')}",
                     parse_mode='MarkdownV2'
                 )
@@ -92,8 +96,7 @@ class AdminHandler:
                 db_size = config.DB_PATH.stat().st_size / 1024 / 1024  # MB
             
             # Get user counts
-            async with aiosqlite.connect(db.db_path) as conn:
-                conn.row_factory = None
+            async with db.read() as conn:
                 cursor = await conn.execute("SELECT COUNT(*) FROM users")
                 total_users = (await cursor.fetchone())[0]
                 
@@ -104,17 +107,74 @@ class AdminHandler:
             uptime = datetime.now() - START_TIME
             uptime_str = str(uptime).split('.')[0]  # Remove microseconds
             
+            # Gmail executor counters
+            gmail_stats = gmail_executor.stats()
+            avg_wait = f"{gmail_stats['avg_wait_ms']:.1f} ms"
+            max_wait = f"{gmail_stats['max_wait_ms']:.1f} ms"
+            
+            # Gmail client cache counters
+            service_stats = gmail_service.services.stats()
+            
+            # Message cache counters
+            cache_stats = gmail_service.message_cache.stats()
+            cache_size = f"{cache_stats['size_mb']:.1f}/{cache_stats['max_mb']:.0f} MB"
+            hit_rate = f"{cache_stats['hit_rate'] * 100:.0f}%"
+            
+            # Push ingestion counters (webhook mode only)
+            push_text = ""
+            if push_service.push_service is not None:
+                push_stats = push_service.push_service.stats()
+                push_lag = f"{push_stats['avg_lag_ms']:.1f} ms"
+                push_text = (
+                    f"{field('Push Queue')}\n"
+                    f"• {to_tiny_caps('Depth')}: {push_stats['depth']}/{push_stats['capacity']} "
+                    f"\\({to_tiny_caps('Max')} {push_stats['max_depth']}\\)\n"
+                    f"• {to_tiny_caps('Processed')}: {push_stats['processed']}\n"
+                    f"• {to_tiny_caps('Failed')}: {push_stats['failed']}\n"
+                    f"• {to_tiny_caps('Rejected')}: {push_stats['rejected']}\n"
+                    f"• {to_tiny_caps('Avg Lag')}: {escape_markdown(push_lag)}\n\n"
+                )
+            
+            # Telegram send scheduler counters
+            send_stats = send_scheduler.stats()
+            send_wait = f"{send_stats['avg_wait_ms']:.1f} ms"
+            
+            # Auto-delete backlog
+            delete_stats = delete_scheduler.stats()
+            
             text = (
-                f"🏥 *{to_tiny_caps('Bot Health')}*\n"
-                f"`────────────────────────`\n\n"
-                f"*{to_tiny_caps('System')}:*\n"
+                header('🏥', 'Bot Health') +
+                f"{field('System')}\n"
                 f"• {to_tiny_caps('RAM Usage')}: {ram_usage_mb:.1f} MB\n"
                 f"• {to_tiny_caps('DB Size')}: {db_size:.2f} MB\n"
                 f"• {to_tiny_caps('Uptime')}: {escape_markdown(uptime_str)}\n\n"
-                f"*{to_tiny_caps('Statistics')}:*\n"
+                f"{field('Statistics')}\n"
                 f"• {to_tiny_caps('Total Users')}: {total_users}\n"
                 f"• {to_tiny_caps('Gmail Accounts')}: {total_accounts}\n\n"
-                f"*{to_tiny_caps('Status')}:* ✅ {to_tiny_caps('Running')}"
+                f"{field('Gmail API')}\n"
+                f"• {to_tiny_caps('In Flight')}: {gmail_stats['in_flight']}\n"
+                f"• {to_tiny_caps('Queued')}: {gmail_stats['waiting']}\n"
+                f"• {to_tiny_caps('Avg Wait')}: {escape_markdown(avg_wait)}\n"
+                f"• {to_tiny_caps('Max Wait')}: {escape_markdown(max_wait)}\n\n"
+                f"{field('Gmail Clients')}\n"
+                f"• {to_tiny_caps('Resident')}: {service_stats['resident']}/{service_stats['max_size']}\n"
+                f"• {to_tiny_caps('Builds')}: {service_stats['builds']}\n"
+                f"• {to_tiny_caps('Evictions')}: {service_stats['evictions']}\n\n"
+                f"{field('Message Cache')}\n"
+                f"• {to_tiny_caps('Entries')}: {cache_stats['entries']} \\({escape_markdown(cache_size)}\\)\n"
+                f"• {to_tiny_caps('Hits')}: {cache_stats['hits']}\n"
+                f"• {to_tiny_caps('Misses')}: {cache_stats['misses']}\n"
+                f"• {to_tiny_caps('Hit Rate')}: {escape_markdown(hit_rate)}\n\n"
+                f"{push_text}"
+                f"{field('Telegram Sends')}\n"
+                f"• {to_tiny_caps('Queued')}: {send_stats['queue_depth']}\n"
+                f"• {to_tiny_caps('Sent')}: {send_stats['sent']}\n"
+                f"• {to_tiny_caps('Flood Waits')}: {send_stats['flood_waits']}\n"
+                f"• {to_tiny_caps('Avg Wait')}: {escape_markdown(send_wait)}\n\n"
+                f"{field('Auto Delete')}\n"
+                f"• {to_tiny_caps('Pending')}: {delete_stats['pending']}\n"
+                f"• {to_tiny_caps('Deleted')}: {delete_stats['deleted']}\n\n"
+                f"{field('Status')} ✅ {to_tiny_caps('Running')}"
             )
             
             keyboard = [[InlineKeyboardButton(
@@ -156,8 +216,7 @@ class AdminHandler:
         
         try:
             text = (
-                f"♻️ *{to_tiny_caps('Restarting Bot')}*\n"
-                f"`────────────────────────`\n\n"
+                header('♻️', 'Restarting Bot') +
                 f"{to_tiny_caps('Bot is restarting...')}\n"
                 f"{to_tiny_caps('This may take a few seconds.')}"
             )
@@ -191,8 +250,7 @@ class AdminHandler:
         # Check if message provided
         if not context.args:
             await update.message.reply_text(
-                f"📢 *{to_tiny_caps('Broadcast')}*\n"
-                f"`────────────────────────`\n\n"
+                header('📢', 'Broadcast') +
                 f"{to_tiny_caps('Usage')}: `/broadcast <message>`\n\n"
                 f"{to_tiny_caps('Example')}:\n"
                 f"`/broadcast Bot will be down for maintenance in 10 minutes`",
@@ -203,44 +261,8 @@ class AdminHandler:
         broadcast_text = ' '.join(context.args)
         
         try:
-            # Get all users
-            async with aiosqlite.connect(db.db_path) as conn:
-                conn.row_factory = aiosqlite.Row
-                cursor = await conn.execute("SELECT DISTINCT user_id FROM users")
-                users = await cursor.fetchall()
-            
-            # Send broadcast
-            success_count = 0
-            fail_count = 0
-            
-            status_msg = await update.message.reply_text(
-                f"📢 {to_tiny_caps(f'Broadcasting to {len(users)} users...')}",
-                parse_mode='MarkdownV2'
-            )
-            
-            for user in users:
-                try:
-                    await context.bot.send_message(
-                        chat_id=user['user_id'],
-                        text=(
-                            f"📢 *{to_tiny_caps('Announcement')}*\n"
-                            f"`────────────────────────`\n\n"
-                            f"{escape_markdown(broadcast_text)}"
-                        ),
-                        parse_mode='MarkdownV2'
-                    )
-                    success_count += 1
-                except Exception:
-                    fail_count += 1
-            
-            # Update status
-            await status_msg.edit_text(
-                f"📢 *{to_tiny_caps('Broadcast Complete')}*\n"
-                f"`────────────────────────`\n\n"
-                f"✅ {to_tiny_caps('Sent')}: {success_count}\n"
-                f"❌ {to_tiny_caps('Failed')}: {fail_count}",
-                parse_mode='MarkdownV2'
-            )
+            # Runs as a background job; progress is edited into the status message
+            await broadcast_manager.start(context.bot, broadcast_text, update.effective_chat.id)
             
         except Exception as e:
             await update.message.reply_text(
@@ -260,8 +282,7 @@ class AdminHandler:
             return
         
         try:
-            async with aiosqlite.connect(db.db_path) as conn:
-                conn.row_factory = None
+            async with db.read() as conn:
                 
                 # Total users
                 cursor = await conn.execute("SELECT COUNT(*) FROM users")
@@ -280,17 +301,16 @@ class AdminHandler:
                 users_with_accounts = (await cursor.fetchone())[0]
             
             text = (
-                f"📊 *{to_tiny_caps('Bot Statistics')}*\n"
-                f"`────────────────────────`\n\n"
-                f"*{to_tiny_caps('Users')}:*\n"
+                header('📊', 'Bot Statistics') +
+                f"{field('Users')}\n"
                 f"• {to_tiny_caps('Total Users')}: {total_users}\n"
                 f"• {to_tiny_caps('With Accounts')}: {users_with_accounts}\n"
                 f"• {to_tiny_caps('Without Accounts')}: {total_users - users_with_accounts}\n\n"
-                f"*{to_tiny_caps('Gmail Accounts')}:*\n"
+                f"{field('Gmail Accounts')}\n"
                 f"• {to_tiny_caps('Total')}: {total_accounts}\n"
                 f"• {to_tiny_caps('Active')}: {active_accounts}\n"
                 f"• {to_tiny_caps('Inactive')}: {total_accounts - active_accounts}\n\n"
-                f"*{to_tiny_caps('Average')}:*\n"
+                f"{field('Average')}\n"
                 f"• {to_tiny_caps('Accounts per User')}: {total_accounts / users_with_accounts if users_with_accounts > 0 else 0:.1f}"
             )
             
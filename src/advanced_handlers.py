@@ -1,12 +1,13 @@
 """Advanced handlers for blocklist, VIP, privacy, and bot settings."""
 import re
 import logging
-import aiosqlite
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from database import db
 from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown
+from render import to_tiny_caps, escape_markdown, header
+from keyboards import keyboards
+from sender_matcher import sender_rules
 from auto_delete import schedule_delete, DELETE_SUCCESS, DELETE_IMMEDIATE, DELETE_WARNING
 
 logger = logging.getLogger(__name__)
@@ -14,17 +15,6 @@ logger = logging.getLogger(__name__)
 EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}$')
 DOMAIN_REGEX = re.compile(r'^@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}$')
 
-TIMER_OPTIONS = [
-    ("❌ ᴏғғ", 0),
-    ("⚡ 30s", 30),
-    ("🕐 1ᴍ", 60),
-    ("🕐 5ᴍ", 300),
-    ("📅 30ᴍ", 1800),
-    ("📅 1ʜ", 3600),
-    ("📅 24ʜ", 86400),
-]
-
-
 def _timer_label(secs: int) -> str:
     """Convert seconds to human-readable label."""
     if secs == 0:
@@ -46,8 +36,7 @@ class AdvancedHandlers:
         await query.answer()
         user_id = update.effective_user.id
 
-        async with aiosqlite.connect(db.db_path) as conn:
-            conn.row_factory = aiosqlite.Row
+        async with db.read() as conn:
             cursor = await conn.execute(
                 "SELECT * FROM blocklist WHERE user_id = ? ORDER BY created_at DESC",
                 (user_id,)
@@ -55,7 +44,7 @@ class AdvancedHandlers:
             blocked = await cursor.fetchall()
 
         keyboard = []
-        text = f"🚫 *{to_tiny_caps('Blocklist')}*\n`────────────────────────`\n\n"
+        text = header('🚫', 'Blocklist')
 
         if blocked:
             text += f"*{len(blocked)}* blocked sender\\(s\\):\n\n"
@@ -84,14 +73,13 @@ class AdvancedHandlers:
         context.user_data['waiting_for'] = 'blocklist_add'
 
         text = (
-            f"🚫 *{to_tiny_caps('Block Sender')}*\n"
-            f"`────────────────────────`\n\n"
-            f"✍️ Send the email address or domain to block:\n\n"
-            f"*Examples:*\n"
-            f"`spam@example.com`\n"
-            f"`@newsletters.com`\n\n"
-            f"`────────────────────────`\n"
-            f"⏳ _Waiting for your input\\.\\.\\._"
+            header('🚫', 'Block Sender') +
+            "✍️ Send the email address or domain to block:\n\n"
+            "*Examples:*\n"
+            "`spam@example.com`\n"
+            "`@newsletters.com`\n\n"
+            "`────────────────────────`\n"
+            "⏳ _Waiting for your input\\.\\.\\._"
         )
         keyboard = [[InlineKeyboardButton("❌ ᴄᴀɴᴄᴇʟ", callback_data="blocklist")]]
         msg = await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
@@ -121,15 +109,15 @@ class AdvancedHandlers:
             await schedule_delete(context.bot, msg.chat.id, msg.message_id, DELETE_WARNING)
             return
 
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.write() as conn:
             try:
                 await conn.execute(
                     "INSERT OR IGNORE INTO blocklist (user_id, blocked_value) VALUES (?, ?)",
                     (user_id, value.lower())
                 )
-                await conn.commit()
             except Exception as e:
                 logger.error(f"Blocklist insert error: {e}")
+        await sender_rules.reload(user_id)
 
         context.user_data.pop('waiting_for', None)
 
@@ -148,7 +136,7 @@ class AdvancedHandlers:
         user_id = update.effective_user.id
         entry_id = int(query.data.split(":")[1])
 
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.write() as conn:
             cursor = await conn.execute(
                 "SELECT blocked_value FROM blocklist WHERE id = ? AND user_id = ?",
                 (entry_id, user_id)
@@ -159,7 +147,7 @@ class AdvancedHandlers:
                     "DELETE FROM blocklist WHERE id = ? AND user_id = ?",
                     (entry_id, user_id)
                 )
-                await conn.commit()
+        await sender_rules.reload(user_id)
 
         await self.show_blocklist(update, context)
 
@@ -169,8 +157,7 @@ class AdvancedHandlers:
         await query.answer()
         user_id = update.effective_user.id
 
-        async with aiosqlite.connect(db.db_path) as conn:
-            conn.row_factory = aiosqlite.Row
+        async with db.read() as conn:
             cursor = await conn.execute(
                 "SELECT * FROM vip_senders WHERE user_id = ? ORDER BY created_at DESC",
                 (user_id,)
@@ -178,7 +165,7 @@ class AdvancedHandlers:
             vips = await cursor.fetchall()
 
         keyboard = []
-        text = f"⭐ *{to_tiny_caps('VIP Senders')}*\n`────────────────────────`\n\n"
+        text = header('⭐', 'VIP Senders')
 
         if vips:
             text += f"*{len(vips)}* VIP sender\\(s\\) — always notified:\n\n"
@@ -208,14 +195,13 @@ class AdvancedHandlers:
         context.user_data['waiting_for'] = 'vip_add'
 
         text = (
-            f"⭐ *{to_tiny_caps('Add VIP Sender')}*\n"
-            f"`────────────────────────`\n\n"
-            f"✍️ Send the email address or domain:\n\n"
-            f"*Examples:*\n"
-            f"`boss@company.com`\n"
-            f"`@hbl.com`\n\n"
-            f"`────────────────────────`\n"
-            f"⏳ _Waiting for your input\\.\\.\\._"
+            header('⭐', 'Add VIP Sender') +
+            "✍️ Send the email address or domain:\n\n"
+            "*Examples:*\n"
+            "`boss@company.com`\n"
+            "`@hbl.com`\n\n"
+            "`────────────────────────`\n"
+            "⏳ _Waiting for your input\\.\\.\\._"
         )
         keyboard = [[InlineKeyboardButton("❌ ᴄᴀɴᴄᴇʟ", callback_data="vip_senders")]]
         msg = await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
@@ -244,15 +230,15 @@ class AdvancedHandlers:
             await schedule_delete(context.bot, msg.chat.id, msg.message_id, DELETE_WARNING)
             return
 
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.write() as conn:
             try:
                 await conn.execute(
                     "INSERT OR IGNORE INTO vip_senders (user_id, sender_value) VALUES (?, ?)",
                     (user_id, value.lower())
                 )
-                await conn.commit()
             except Exception as e:
                 logger.error(f"VIP insert error: {e}")
+        await sender_rules.reload(user_id)
 
         context.user_data.pop('waiting_for', None)
 
@@ -271,12 +257,12 @@ class AdvancedHandlers:
         user_id = update.effective_user.id
         entry_id = int(query.data.split(":")[1])
 
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.write() as conn:
             await conn.execute(
                 "DELETE FROM vip_senders WHERE id = ? AND user_id = ?",
                 (entry_id, user_id)
             )
-            await conn.commit()
+        await sender_rules.reload(user_id)
 
         await self.show_vip_senders(update, context)
 
@@ -286,8 +272,7 @@ class AdvancedHandlers:
         await query.answer()
         user_id = update.effective_user.id
 
-        async with aiosqlite.connect(db.db_path) as conn:
-            conn.row_factory = aiosqlite.Row
+        async with db.read() as conn:
             cursor = await conn.execute(
                 "SELECT global_auto_delete_secs FROM privacy_settings WHERE user_id = ?",
                 (user_id,)
@@ -296,27 +281,15 @@ class AdvancedHandlers:
             current_secs = row['global_auto_delete_secs'] if row else 0
 
         text = (
-            f"🔒 *{to_tiny_caps('Privacy Settings')}*\n"
-            f"`────────────────────────`\n\n"
+            header('🔒', 'Privacy Settings') +
             f"*{to_tiny_caps('Global Auto-Delete')}*\n"
             f"Email notifications auto\\-delete after:\n\n"
             f"Current: *{escape_markdown(_timer_label(current_secs))}*\n\n"
             f"`────────────────────────`"
         )
 
-        keyboard = []
-        row_buttons = []
-        for label, secs in TIMER_OPTIONS:
-            display = f"✅ {label}" if secs == current_secs else label
-            row_buttons.append(InlineKeyboardButton(display, callback_data=f"privacy_timer:{secs}"))
-            if len(row_buttons) == 2:
-                keyboard.append(row_buttons)
-                row_buttons = []
-        if row_buttons:
-            keyboard.append(row_buttons)
-
-        keyboard.append([InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="settings")])
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
+        keyboard = keyboards.timer_menu('privacy_timer', current_secs, 'settings')
+        await query.edit_message_text(text, reply_markup=keyboard, parse_mode="MarkdownV2")
 
     async def set_privacy_timer(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Save the selected global auto-delete timer."""
@@ -325,12 +298,12 @@ class AdvancedHandlers:
         user_id = update.effective_user.id
         secs = int(query.data.split(":")[1])
 
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.write() as conn:
             await conn.execute(
                 "INSERT OR REPLACE INTO privacy_settings (user_id, global_auto_delete_secs) VALUES (?, ?)",
                 (user_id, secs)
             )
-            await conn.commit()
+        db.account_index.update_user(user_id, global_auto_delete_secs=secs)
 
         await self.show_privacy_settings(update, context)
 
@@ -341,16 +314,11 @@ class AdvancedHandlers:
         await query.answer()
 
         text = (
-            f"🤖 *{to_tiny_caps('Bot Settings')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Customize your AutoXMail bot\\.\n\n"
-            f"`────────────────────────`"
+            header('🤖', 'Bot Settings') +
+            "Customize your AutoXMail bot\\.\n\n"
+            "`────────────────────────`"
         )
-        keyboard = [
-            [InlineKeyboardButton(f"🖼️ {to_tiny_caps('Change Profile Pic')}", callback_data="bot_change_photo")],
-            [InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="settings")],
-        ]
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
+        await query.edit_message_text(text, reply_markup=keyboards['bot_settings'], parse_mode="MarkdownV2")
 
     async def start_change_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Ask user to send a photo for bot profile picture."""
@@ -360,12 +328,11 @@ class AdvancedHandlers:
         context.user_data['waiting_for'] = 'bot_photo'
 
         text = (
-            f"🖼️ *{to_tiny_caps('Change Profile Pic')}*\n"
-            f"`────────────────────────`\n\n"
-            f"📸 Send the photo to use as bot profile picture\\.\n\n"
-            f"⚠️ _Your photo will be deleted from chat immediately\\._\n\n"
-            f"`────────────────────────`\n"
-            f"⏳ _Waiting for photo\\.\\.\\._"
+            header('🖼️', 'Change Profile Pic') +
+            "📸 Send the photo to use as bot profile picture\\.\n\n"
+            "⚠️ _Your photo will be deleted from chat immediately\\._\n\n"
+            "`────────────────────────`\n"
+            "⏳ _Waiting for photo\\.\\.\\._"
         )
         keyboard = [[InlineKeyboardButton("❌ ᴄᴀɴᴄᴇʟ", callback_data="bot_settings")]]
         msg = await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
@@ -392,9 +359,7 @@ class AdvancedHandlers:
                 f"`────────────────────────`\n"
                 f"Bot profile picture changed successfully\\!",
                 parse_mode="MarkdownV2",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="bot_settings")
-                ]])
+                reply_markup=keyboards.back('bot_settings')
             )
             await schedule_delete(context.bot, msg.chat.id, msg.message_id, DELETE_SUCCESS)
         except Exception as e:
@@ -414,8 +379,7 @@ class AdvancedHandlers:
         user_id = update.effective_user.id
         account_id = int(query.data.split(":")[1])
 
-        async with aiosqlite.connect(db.db_path) as conn:
-            conn.row_factory = aiosqlite.Row
+        async with db.read() as conn:
             cursor = await conn.execute(
                 "SELECT email, auto_delete_secs FROM gmail_accounts WHERE id = ? AND user_id = ?",
                 (account_id, user_id)
@@ -430,27 +394,15 @@ class AdvancedHandlers:
         email = escape_markdown(account['email'])
 
         text = (
-            f"⏱️ *{to_tiny_caps('Auto-Delete Timer')}*\n"
-            f"`────────────────────────`\n\n"
+            header('⏱️', 'Auto-Delete Timer') +
             f"*Account:* `{email}`\n\n"
             f"Notifications for this account auto\\-delete after:\n\n"
             f"Current: *{escape_markdown(_timer_label(current_secs))}*\n\n"
             f"`────────────────────────`"
         )
 
-        keyboard = []
-        row_buttons = []
-        for label, secs in TIMER_OPTIONS:
-            display = f"✅ {label}" if secs == current_secs else label
-            row_buttons.append(InlineKeyboardButton(display, callback_data=f"account_timer:{account_id}:{secs}"))
-            if len(row_buttons) == 2:
-                keyboard.append(row_buttons)
-                row_buttons = []
-        if row_buttons:
-            keyboard.append(row_buttons)
-
-        keyboard.append([InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="accounts")])
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
+        keyboard = keyboards.timer_menu(f'account_timer:{account_id}', current_secs, 'accounts')
+        await query.edit_message_text(text, reply_markup=keyboard, parse_mode="MarkdownV2")
 
     async def set_account_auto_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Save the selected per-account auto-delete timer."""
@@ -461,12 +413,12 @@ class AdvancedHandlers:
         account_id = int(parts[1])
         secs = int(parts[2])
 
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.write() as conn:
             await conn.execute(
                 "UPDATE gmail_accounts SET auto_delete_secs = ? WHERE id = ? AND user_id = ?",
                 (secs, account_id, user_id)
             )
-            await conn.commit()
+        db.account_index.update_account(account_id, user_id, auto_delete_secs=secs)
 
         await self.show_account_auto_delete(update, context)
 
@@ -480,13 +432,12 @@ class AdvancedHandlers:
         msg_id = parts[3]
 
         text = (
-            f"⚠️ *{to_tiny_caps('Unsubscribe Confirmation')}*\n"
-            f"`────────────────────────`\n\n"
-            f"This will:\n"
-            f"1\\. Send unsubscribe request to sender\n"
-            f"2\\. Add sender to your blocklist\n\n"
-            f"Continue?\n\n"
-            f"`────────────────────────`"
+            header('⚠️', 'Unsubscribe Confirmation') +
+            "This will:\n"
+            "1\\. Send unsubscribe request to sender\n"
+            "2\\. Add sender to your blocklist\n\n"
+            "Continue?\n\n"
+            "`────────────────────────`"
         )
         keyboard = [
             [
@@ -508,40 +459,40 @@ class AdvancedHandlers:
 
         try:
             # Fixed: Pass account_id directly, not service object
-            message = await gmail_service.get_message(account_id, msg_id)
+            message = await gmail_service.get_parsed_message(
+                account_id, msg_id, format='metadata', headers=['From']
+            )
             
-            sender = message.get('from', '')
+            sender = message.sender
             sender_match = re.search(r'<(.+?)>', sender)
             sender_email = sender_match.group(1) if sender_match else sender.strip()
 
             # Fixed: Pass account_id directly, not service object
             success = await gmail_service.unsubscribe_email(account_id, msg_id)
 
-            async with aiosqlite.connect(db.db_path) as conn:
+            async with db.write() as conn:
                 try:
                     await conn.execute(
                         "INSERT OR IGNORE INTO blocklist (user_id, blocked_value) VALUES (?, ?)",
                         (user_id, sender_email.lower())
                     )
-                    await conn.commit()
                 except Exception as e:
                     logger.error(f"Blocklist insert error during unsubscribe: {e}")
+            await sender_rules.reload(user_id)
 
             if success:
                 text = (
-                    f"✅ *{to_tiny_caps('Unsubscribed')}*\n"
-                    f"`────────────────────────`\n\n"
-                    f"Unsubscribe request sent\\!\n"
-                    f"Sender added to blocklist\\.\n\n"
-                    f"`────────────────────────`"
+                    header('✅', 'Unsubscribed') +
+                    "Unsubscribe request sent\\!\n"
+                    "Sender added to blocklist\\.\n\n"
+                    "`────────────────────────`"
                 )
             else:
                 text = (
-                    f"⚠️ *{to_tiny_caps('No Unsubscribe Link')}*\n"
-                    f"`────────────────────────`\n\n"
-                    f"No unsubscribe link found in email\\.\n"
-                    f"Sender added to blocklist\\.\n\n"
-                    f"`────────────────────────`"
+                    header('⚠️', 'No Unsubscribe Link') +
+                    "No unsubscribe link found in email\\.\n"
+                    "Sender added to blocklist\\.\n\n"
+                    "`────────────────────────`"
                 )
 
             keyboard = [[InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data=f"view_msg:{account_id}:{msg_id}")]]
@@ -551,11 +502,10 @@ class AdvancedHandlers:
         except Exception as e:
             logger.error(f"Unsubscribe error: {e}")
             text = (
-                f"❌ *{to_tiny_caps('Error')}*\n"
-                f"`────────────────────────`\n\n"
-                f"Failed to unsubscribe\\.\n"
-                f"Please try again later\\.\n\n"
-                f"`────────────────────────`"
+                header('❌', 'Error') +
+                "Failed to unsubscribe\\.\n"
+                "Please try again later\\.\n\n"
+                "`────────────────────────`"
             )
             keyboard = [[InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data=f"view_msg:{account_id}:{msg_id}")]]
             msg = await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="MarkdownV2")
@@ -1,6 +1,13 @@
 """Auto-delete message system."""
+import time
+import heapq
 import asyncio
+import logging
+from typing import Dict, Any, List, Tuple
 from telegram import Bot
+from database import db
+
+logger = logging.getLogger(__name__)
 
 
 # Delete delays (in seconds)
@@ -10,24 +17,185 @@ DELETE_SUCCESS = 15  # Success messages
 DELETE_WARNING = 30  # Warnings, errors
 DELETE_GUIDE = 60  # Help, guides
 
+# Deletions fired per driver wake-up
+DELETE_BATCH_SIZE = 100
+
+
+class DeleteScheduler:
+    """Persistent scheduler for message deletions.
+    
+    Pending deletions live in the ``scheduled_deletes`` table and in an
+    in-memory heap. A single driver task sleeps until the earliest one is due
+    and fires due deletions in batches grouped by chat. Pending work is
+    reloaded at startup, so a restart does not leave messages behind.
+    """
+    
+    def __init__(self):
+        self.bot = None
+        self.heap: List[Tuple[float, int, int]] = []
+        self.due: Dict[Tuple[int, int], float] = {}
+        self._wakeup = None
+        self._driver = None
+        
+        # Counters
+        self.deleted = 0
+        self.failed = 0
+    
+    async def start(self, bot: Bot):
+        """Load pending deletions and start the driver."""
+        self.bot = bot
+        
+        async with db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT chat_id, message_id, due_at FROM scheduled_deletes"
+            )
+            rows = await cursor.fetchall()
+        
+        for chat_id, message_id, due_at in rows:
+            self._push(chat_id, message_id, due_at)
+        
+        self._ensure_driver()
+        logger.info(f"Delete scheduler started with {len(rows)} pending deletion(s)")
+    
+    async def stop(self):
+        """Stop the driver (pending deletions stay in the database)."""
+        if self._driver is not None:
+            self._driver.cancel()
+            await asyncio.gather(self._driver, return_exceptions=True)
+            self._driver = None
+    
+    def _ensure_driver(self):
+        """Start the driver task if it is not running."""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+    
+    def _push(self, chat_id: int, message_id: int, due_at: float):
+        """Add a deletion to the heap (replacing an earlier schedule)."""
+        self.due[(chat_id, message_id)] = due_at
+        heapq.heappush(self.heap, (due_at, chat_id, message_id))
+    
+    async def schedule(self, bot: Bot, chat_id: int, message_id: int, delay: int):
+        """Schedule a message deletion.
+        
+        Args:
+            bot: Bot instance
+            chat_id: Chat ID
+            message_id: Message ID to delete
+            delay: Delay in seconds before deletion
+        """
+        if self.bot is None:
+            self.bot = bot
+        
+        if delay <= 0:
+            await self._delete(chat_id, [message_id])
+            return
+        
+        due_at = time.time() + delay
+        async with db.write() as conn:
+            await conn.execute(
+                "INSERT OR REPLACE INTO scheduled_deletes (chat_id, message_id, due_at) VALUES (?, ?, ?)",
+                (chat_id, message_id, due_at)
+            )
+        
+        wake = not self.heap or due_at < self.heap[0][0]
+        self._push(chat_id, message_id, due_at)
+        self._ensure_driver()
+        if wake:
+            self._wakeup.set()
+    
+    async def _drive(self):
+        """Sleep until the next deletion is due, then fire due ones."""
+        while True:
+            try:
+                now = time.time()
+                if not self.heap or self.heap[0][0] > now:
+                    timeout = self.heap[0][0] - now if self.heap else None
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                # Collect a batch of due deletions, grouped by chat
+                batch: Dict[int, List[int]] = {}
+                fired = []
+                while self.heap and self.heap[0][0] <= now and len(fired) < DELETE_BATCH_SIZE:
+                    due_at, chat_id, message_id = heapq.heappop(self.heap)
+                    if self.due.get((chat_id, message_id)) != due_at:
+                        continue  # rescheduled or already fired
+                    del self.due[(chat_id, message_id)]
+                    batch.setdefault(chat_id, []).append(message_id)
+                    fired.append((chat_id, message_id))
+                
+                await asyncio.gather(*(
+                    self._delete(chat_id, message_ids)
+                    for chat_id, message_ids in batch.items()
+                ))
+                
+                if fired:
+                    async with db.write() as conn:
+                        await conn.executemany(
+                            "DELETE FROM scheduled_deletes WHERE chat_id = ? AND message_id = ?",
+                            fired
+                        )
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Delete scheduler error: {e}")
+                await asyncio.sleep(1)
+    
+    async def _delete(self, chat_id: int, message_ids: List[int]):
+        """Delete messages of one chat."""
+        # deleteMessages (bulk) needs a newer python-telegram-bot
+        if len(message_ids) > 1 and hasattr(self.bot, 'delete_messages'):
+            try:
+                await self.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+                self.deleted += len(message_ids)
+            except Exception:
+                # Messages already deleted or not found
+                self.failed += len(message_ids)
+            return
+        
+        for message_id in message_ids:
+            try:
+                await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+                self.deleted += 1
+            except Exception:
+                # Message already deleted or not found
+                self.failed += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get scheduler counters."""
+        next_due = min(self.due.values()) - time.time() if self.due else None
+        return {
+            'pending': len(self.due),
+            'next_due_secs': max(next_due, 0.0) if next_due is not None else None,
+            'deleted': self.deleted,
+            'failed': self.failed,
+        }
+
+
+# Global scheduler instance (started in main.py)
+delete_scheduler = DeleteScheduler()
+
 
 async def schedule_delete(bot: Bot, chat_id: int, message_id: int, delay: int):
     """Schedule message deletion.
     
+    Returns once the deletion is recorded; the scheduler deletes the
+    message when it is due.
+    
     Args:
         bot: Bot instance
         chat_id: Chat ID
         message_id: Message ID to delete
         delay: Delay in seconds before deletion
     """
-    if delay > 0:
-        await asyncio.sleep(delay)
-    
-    try:
-        await bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception:
-        # Message already deleted or not found
-        pass
+    await delete_scheduler.schedule(bot, chat_id, message_id, delay)
 
 
 def get_delete_delay(message_type: str) -> int:
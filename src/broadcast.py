@@ -0,0 +1,230 @@
+"""Persisted, resumable admin broadcast jobs."""
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Tuple
+from telegram import Bot
+from telegram.error import Forbidden, BadRequest
+from database import db
+from render import to_tiny_caps, escape_markdown, header
+from send_scheduler import PRIORITY_BULK
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastManager:
+    """Run broadcasts as background jobs.
+
+    Recipients are snapshotted into ``broadcast_recipients`` when a job is
+    created and marked as they are processed, so a restart resumes with the
+    pending ones. Users that blocked the bot are marked inactive and skipped
+    by later broadcasts.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    async def start(self, bot: Bot, text: str, status_chat_id: int) -> int:
+        """Create a broadcast job for all active users and start it.
+
+        Args:
+            bot: Bot instance
+            text: Announcement text (plain)
+            status_chat_id: Chat that receives the progress message
+
+        Returns:
+            Job ID
+        """
+        async with db.write() as conn:
+            cursor = await conn.execute(
+                "INSERT INTO broadcast_jobs (text, status_chat_id) VALUES (?, ?)",
+                (text, status_chat_id)
+            )
+            job_id = cursor.lastrowid
+
+            cursor = await conn.execute("""
+                INSERT INTO broadcast_recipients (job_id, user_id)
+                SELECT ?, user_id FROM users WHERE is_active = 1
+            """, (job_id,))
+            total = cursor.rowcount
+
+            await conn.execute(
+                "UPDATE broadcast_jobs SET total = ? WHERE id = ?",
+                (total, job_id)
+            )
+
+        try:
+            status_msg = await bot.send_message(
+                chat_id=status_chat_id,
+                text=f"📢 {escape_markdown(to_tiny_caps(f'Broadcasting to {total} users...'))}",
+                parse_mode='MarkdownV2'
+            )
+
+            async with db.write() as conn:
+                await conn.execute(
+                    "UPDATE broadcast_jobs SET status_message_id = ? WHERE id = ?",
+                    (status_msg.message_id, job_id)
+                )
+        except BaseException:
+            # The job is committed as 'running'; keep resume() from
+            # starting a broadcast the admin was never told about
+            async with db.write() as conn:
+                await conn.execute(
+                    "UPDATE broadcast_jobs SET status = 'failed', finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (job_id,)
+                )
+            raise
+
+        self._spawn(bot, job_id)
+        return job_id
+
+    async def resume(self, bot: Bot):
+        """Restart jobs left running by a previous process."""
+        async with db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT id FROM broadcast_jobs WHERE status = 'running'"
+            )
+            job_ids = [row[0] for row in await cursor.fetchall()]
+
+        for job_id in job_ids:
+            logger.info(f"Resuming broadcast job {job_id}")
+            self._spawn(bot, job_id)
+
+    def _spawn(self, bot: Bot, job_id: int):
+        """Start the runner task for a job."""
+        if job_id in self.tasks and not self.tasks[job_id].done():
+            return
+        task = asyncio.create_task(self._run(bot, job_id))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+
+    async def stop(self):
+        """Cancel running jobs (they resume on next start)."""
+        for task in list(self.tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+    async def _run(self, bot: Bot, job_id: int):
+        """Send a job to its pending recipients in waves."""
+        try:
+            job = await self._get_job(job_id)
+            text = (
+                header('📢', 'Announcement') +
+                f"{escape_markdown(job['text'])}"
+            )
+            last_progress = time.monotonic()
+
+            while True:
+                recipients = await self._get_pending(job_id, config.BROADCAST_CONCURRENCY)
+                if not recipients:
+                    break
+
+                results = await asyncio.gather(
+                    *(self._send(bot, user_id, text) for user_id in recipients)
+                )
+                await self._save_results(job_id, results)
+
+                if time.monotonic() - last_progress >= config.BROADCAST_PROGRESS_SECS:
+                    last_progress = time.monotonic()
+                    await self._edit_progress(bot, job, done=False)
+
+            async with db.write() as conn:
+                await conn.execute(
+                    "UPDATE broadcast_jobs SET status = 'done', finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (job_id,)
+                )
+            await self._edit_progress(bot, job, done=True)
+            logger.info(f"Broadcast job {job_id} completed")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast job {job_id} error: {e}")
+
+    async def _send(self, bot: Bot, user_id: int, text: str) -> Tuple[int, str, str]:
+        """Send to one recipient and classify the outcome."""
+        try:
+            await bot.send_message(
+                chat_id=user_id,
+                text=text,
+                parse_mode='MarkdownV2',
+                rate_limit_args=PRIORITY_BULK
+            )
+            return user_id, 'sent', None
+        except Forbidden as e:
+            return user_id, 'blocked', str(e)
+        except BadRequest as e:
+            if 'chat not found' in str(e).lower():
+                return user_id, 'blocked', str(e)
+            return user_id, 'failed', str(e)
+        except Exception as e:
+            return user_id, 'failed', str(e)
+
+    async def _get_job(self, job_id: int) -> Dict[str, Any]:
+        """Load a job row."""
+        async with db.read() as conn:
+            cursor = await conn.execute("SELECT * FROM broadcast_jobs WHERE id = ?", (job_id,))
+            return dict(await cursor.fetchone())
+
+    async def _get_pending(self, job_id: int, limit: int) -> List[int]:
+        """Get the next pending recipients."""
+        async with db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT user_id FROM broadcast_recipients WHERE job_id = ? AND status = 'pending' LIMIT ?",
+                (job_id, limit)
+            )
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def _save_results(self, job_id: int, results: List[Tuple[int, str, str]]):
+        """Persist a wave of outcomes and deactivate blocked users."""
+        async with db.write() as conn:
+            await conn.executemany(
+                "UPDATE broadcast_recipients SET status = ?, error = ? WHERE job_id = ? AND user_id = ?",
+                [(status, error, job_id, user_id) for user_id, status, error in results]
+            )
+            blocked = [(user_id,) for user_id, status, _ in results if status == 'blocked']
+            if blocked:
+                await conn.executemany("UPDATE users SET is_active = 0 WHERE user_id = ?", blocked)
+
+    async def get_counts(self, job_id: int) -> Dict[str, int]:
+        """Count recipients per status."""
+        async with db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT status, COUNT(*) FROM broadcast_recipients WHERE job_id = ? GROUP BY status",
+                (job_id,)
+            )
+            counts = {'pending': 0, 'sent': 0, 'failed': 0, 'blocked': 0}
+            counts.update({row[0]: row[1] for row in await cursor.fetchall()})
+            return counts
+
+    async def _edit_progress(self, bot: Bot, job: Dict[str, Any], done: bool):
+        """Update the admin's status message."""
+        if not job.get('status_message_id'):
+            return
+
+        counts = await self.get_counts(job['id'])
+        title = 'Broadcast Complete' if done else 'Broadcasting'
+        processed = job['total'] - counts['pending']
+
+        try:
+            await bot.edit_message_text(
+                chat_id=job['status_chat_id'],
+                message_id=job['status_message_id'],
+                text=(
+                    f"📢 *{to_tiny_caps(title)}*\n"
+                    f"`────────────────────────`\n\n"
+                    f"📊 {to_tiny_caps('Progress')}: {processed}/{job['total']}\n"
+                    f"✅ {to_tiny_caps('Sent')}: {counts['sent']}\n"
+                    f"❌ {to_tiny_caps('Failed')}: {counts['failed']}\n"
+                    f"🚫 {to_tiny_caps('Blocked')}: {counts['blocked']}"
+                ),
+                parse_mode='MarkdownV2',
+                rate_limit_args=PRIORITY_BULK
+            )
+        except Exception as e:
+            logger.debug(f"Broadcast progress edit failed: {e}")
+
+
+# Global broadcast manager
+broadcast_manager = BroadcastManager()
@@ -22,9 +22,12 @@ FORCE_JOIN_CHANNEL = os.getenv('FORCE_JOIN_CHANNEL')  # Channel username (e.g.,
 
 # Database
 DB_PATH = DATA_DIR / 'autoxmail.db'
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '3'))
 
 # Encryption
 MASTER_KEY = os.getenv('MASTER_KEY')  # Master encryption key
+CRYPTO_KEY_CACHE_SIZE = int(os.getenv('CRYPTO_KEY_CACHE_SIZE', '256'))  # derived keys kept in memory
+CRYPTO_ZEROIZE_KEYS = os.getenv('CRYPTO_ZEROIZE_KEYS', 'true').lower() == 'true'  # wipe evicted keys
 
 # Gmail API
 SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
@@ -34,11 +37,54 @@ MAX_ACCOUNTS_PER_USER = int(os.getenv('MAX_ACCOUNTS_PER_USER', '75'))
 MAX_MESSAGE_LENGTH = 4000
 MEMORY_LIMIT_MB = 100
 
+# Message cache budget (share of MEMORY_LIMIT_MB)
+MESSAGE_CACHE_MB = int(os.getenv('MESSAGE_CACHE_MB', str(MEMORY_LIMIT_MB // 10)))
+
+# Gmail transport: 'googleapiclient' (threaded) or 'aiohttp' (native asyncio)
+GMAIL_BACKEND = os.getenv('GMAIL_BACKEND', 'googleapiclient')
+GMAIL_API_BASE_URL = os.getenv('GMAIL_API_BASE_URL', 'https://gmail.googleapis.com')
+GMAIL_HTTP_POOL_SIZE = int(os.getenv('GMAIL_HTTP_POOL_SIZE', '32'))  # aiohttp connections
+GMAIL_HTTP_KEEPALIVE = int(os.getenv('GMAIL_HTTP_KEEPALIVE', '30'))  # idle seconds
+GMAIL_HTTP_TIMEOUT = int(os.getenv('GMAIL_HTTP_TIMEOUT', '30'))  # seconds per request
+
+# Gmail API clients kept built (each holds its own HTTP client)
+GMAIL_SERVICE_CACHE_SIZE = int(os.getenv('GMAIL_SERVICE_CACHE_SIZE', '32'))
+GMAIL_SERVICE_TTL = int(os.getenv('GMAIL_SERVICE_TTL', '3600'))  # seconds before a rebuild
+
+# Gmail API execution
+GMAIL_EXECUTOR_WORKERS = int(os.getenv('GMAIL_EXECUTOR_WORKERS', '16'))
+GMAIL_MAX_CONCURRENCY = int(os.getenv('GMAIL_MAX_CONCURRENCY', '16'))  # in-flight calls, all accounts
+GMAIL_MAX_PER_ACCOUNT = int(os.getenv('GMAIL_MAX_PER_ACCOUNT', '4'))  # in-flight calls per account
+
 # Webhook (optional)
 WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # For push notifications
 WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
 GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID')  # Google Cloud Project ID for Pub/Sub
 
+# Push ingestion
+PUSH_WORKERS = int(os.getenv('PUSH_WORKERS', '4'))
+PUSH_QUEUE_SIZE = int(os.getenv('PUSH_QUEUE_SIZE', '1000'))  # full queue answers 503
+PUSH_DRAIN_TIMEOUT = int(os.getenv('PUSH_DRAIN_TIMEOUT', '10'))  # seconds on shutdown
+
+# Telegram Bot API endpoint (e.g. a local fake server for load tests)
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+TELEGRAM_FILE_BASE_URL = os.getenv('TELEGRAM_FILE_BASE_URL', 'https://api.telegram.org/file/bot')
+
+# Telegram outbound limits
+TG_GLOBAL_RATE = float(os.getenv('TG_GLOBAL_RATE', '30'))  # messages/sec, whole bot
+TG_CHAT_RATE = float(os.getenv('TG_CHAT_RATE', '1'))  # messages/sec per private chat
+TG_CHAT_BURST = float(os.getenv('TG_CHAT_BURST', '3'))
+TG_GROUP_RATE_PER_MIN = float(os.getenv('TG_GROUP_RATE_PER_MIN', '20'))  # per group/channel
+TG_MAX_RETRIES = int(os.getenv('TG_MAX_RETRIES', '2'))  # retries after RetryAfter
+
+# Broadcasts
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '25'))  # sends in flight per job
+BROADCAST_PROGRESS_SECS = int(os.getenv('BROADCAST_PROGRESS_SECS', '5'))  # status message refresh
+
+# OAuth token refresh
+TOKEN_REFRESH_MARGIN = int(os.getenv('TOKEN_REFRESH_MARGIN', '300'))  # seconds before expiry
+TOKEN_REFRESH_INTERVAL = int(os.getenv('TOKEN_REFRESH_INTERVAL', '60'))  # driver check period
+
 # Rate limiting
 RATE_LIMIT_REQUESTS = 30  # per minute per user
 RATE_LIMIT_WINDOW = 60  # seconds
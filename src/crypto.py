@@ -1,12 +1,79 @@
-"""Encryption utilities using Fernet AES-128."""
+"""Encryption utilities using Fernet AES-128.
+
+Ciphertext envelopes:
+    v1 (legacy): raw Fernet token, key = PBKDF2(MASTER_KEY, per-user salt)
+    v2:          b'v2:' + Fernet token, key = HKDF(master key, user + purpose)
+
+v2 runs PBKDF2 once per process for the master key and derives cheap
+per-user subkeys from it. Both versions decrypt; new data is written as v2.
+"""
 import os
 import base64
 import hashlib
+import threading
+from collections import OrderedDict
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import config
 
+ENVELOPE_V2 = b'v2:'
+
+# Key purposes
+PURPOSE_CREDENTIALS = 'credentials'
+PURPOSE_TOKEN = 'token'
+
+
+class KeyCache:
+    """Bounded LRU cache of derived keys.
+    
+    Keys are held in bytearrays so they can be overwritten when evicted.
+    """
+    
+    def __init__(self, max_size: int, zeroize: bool = True):
+        self.max_size = max_size
+        self.zeroize = zeroize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, cache_key):
+        """Get cached key bytes or None."""
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is None:
+                return None
+            self._keys.move_to_end(cache_key)
+            return bytes(key)
+    
+    def put(self, cache_key, key: bytes):
+        """Store key, evicting the least recently used one if full."""
+        with self._lock:
+            if cache_key in self._keys:
+                self._wipe(self._keys.pop(cache_key))
+            self._keys[cache_key] = bytearray(key)
+            while len(self._keys) > self.max_size:
+                _, evicted = self._keys.popitem(last=False)
+                self._wipe(evicted)
+    
+    def clear(self):
+        """Drop all cached keys."""
+        with self._lock:
+            for key in self._keys.values():
+                self._wipe(key)
+            self._keys.clear()
+    
+    def _wipe(self, key: bytearray):
+        """Overwrite key material if zeroization is enabled."""
+        if self.zeroize:
+            key[:] = bytes(len(key))
+    
+    def __len__(self):
+        return len(self._keys)
+
+
+key_cache = KeyCache(config.CRYPTO_KEY_CACHE_SIZE, config.CRYPTO_ZEROIZE_KEYS)
+
 
 def derive_key(password: str, salt: bytes) -> bytes:
     """Derive encryption key from password using PBKDF2.
@@ -64,22 +131,85 @@ def decrypt(encrypted_data: bytes, password: str, salt: bytes) -> bytes:
     return f.decrypt(encrypted_data)
 
 
+def _legacy_salt(user_id: int, purpose: str) -> bytes:
+    """Per-user salt used by v1 envelopes."""
+    suffix = 'token' if purpose == PURPOSE_TOKEN else ''
+    return hashlib.sha256(f"{user_id}{config.MASTER_KEY}{suffix}".encode()).digest()[:16]
+
+
+def _legacy_key(user_id: int, purpose: str) -> bytes:
+    """Get (cached) PBKDF2 key for a v1 envelope."""
+    cache_key = (user_id, purpose, 1)
+    key = key_cache.get(cache_key)
+    if key is None:
+        key = derive_key(config.MASTER_KEY, _legacy_salt(user_id, purpose))
+        key_cache.put(cache_key, key)
+    return key
+
+
+# The v2 master key lives outside the LRU: evicting it under churn would
+# rerun PBKDF2 for every new subkey
+_master = None
+_master_lock = threading.Lock()
+
+
+def _master_key() -> bytes:
+    """Get (cached) PBKDF2 master key that v2 subkeys are derived from."""
+    global _master
+    if _master is None:
+        with _master_lock:
+            if _master is None:
+                salt = hashlib.sha256(f"{config.MASTER_KEY}autoxmail-v2".encode()).digest()[:16]
+                _master = base64.urlsafe_b64decode(derive_key(config.MASTER_KEY, salt))
+    return _master
+
+
+def _subkey(user_id: int, purpose: str) -> bytes:
+    """Get (cached) HKDF subkey for a v2 envelope."""
+    cache_key = (user_id, purpose, 2)
+    key = key_cache.get(cache_key)
+    if key is None:
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=f"autoxmail:{purpose}:{user_id}".encode(),
+        )
+        key = base64.urlsafe_b64encode(hkdf.derive(_master_key()))
+        key_cache.put(cache_key, key)
+    return key
+
+
+def _seal(data: bytes, user_id: int, purpose: str) -> bytes:
+    """Encrypt data into a v2 envelope."""
+    return ENVELOPE_V2 + Fernet(_subkey(user_id, purpose)).encrypt(data)
+
+
+def _open(blob: bytes, user_id: int, purpose: str) -> bytes:
+    """Decrypt a v1 or v2 envelope."""
+    blob = bytes(blob)
+    if blob.startswith(ENVELOPE_V2):
+        return Fernet(_subkey(user_id, purpose)).decrypt(blob[len(ENVELOPE_V2):])
+    return Fernet(_legacy_key(user_id, purpose)).decrypt(blob)
+
+
+def needs_migration(blob: bytes) -> bool:
+    """Check if a stored blob still uses the legacy v1 envelope."""
+    return bool(blob) and not bytes(blob).startswith(ENVELOPE_V2)
+
+
 def encrypt_credentials(credentials_json: str, user_id: int) -> tuple[bytes, bytes]:
     """Encrypt Gmail credentials.
     
     Args:
         credentials_json: JSON string of credentials
-        user_id: User ID for salt generation
+        user_id: User ID for key derivation
         
     Returns:
         Tuple of (encrypted_data, salt)
     """
-    # Generate per-user salt
-    salt = hashlib.sha256(f"{user_id}{config.MASTER_KEY}".encode()).digest()[:16]
-    
-    # Encrypt
-    encrypted = encrypt(credentials_json.encode(), config.MASTER_KEY, salt)
-    
+    salt = _legacy_salt(user_id, PURPOSE_CREDENTIALS)
+    encrypted = _seal(credentials_json.encode(), user_id, PURPOSE_CREDENTIALS)
     return encrypted, salt
 
 
@@ -88,18 +218,12 @@ def decrypt_credentials(encrypted_data: bytes, user_id: int) -> str:
     
     Args:
         encrypted_data: Encrypted credentials
-        user_id: User ID for salt generation
+        user_id: User ID for key derivation
         
     Returns:
         Decrypted JSON string
     """
-    # Regenerate salt
-    salt = hashlib.sha256(f"{user_id}{config.MASTER_KEY}".encode()).digest()[:16]
-    
-    # Decrypt
-    decrypted = decrypt(encrypted_data, config.MASTER_KEY, salt)
-    
-    return decrypted.decode()
+    return _open(encrypted_data, user_id, PURPOSE_CREDENTIALS).decode()
 
 
 def encrypt_token(token_json: str, user_id: int) -> bytes:
@@ -107,13 +231,12 @@ def encrypt_token(token_json: str, user_id: int) -> bytes:
     
     Args:
         token_json: JSON string of token
-        user_id: User ID for salt generation
+        user_id: User ID for key derivation
         
     Returns:
         Encrypted token
     """
-    salt = hashlib.sha256(f"{user_id}{config.MASTER_KEY}token".encode()).digest()[:16]
-    return encrypt(token_json.encode(), config.MASTER_KEY, salt)
+    return _seal(token_json.encode(), user_id, PURPOSE_TOKEN)
 
 
 def decrypt_token(encrypted_token: bytes, user_id: int) -> str:
@@ -121,10 +244,25 @@ def decrypt_token(encrypted_token: bytes, user_id: int) -> str:
     
     Args:
         encrypted_token: Encrypted token
-        user_id: User ID for salt generation
+        user_id: User ID for key derivation
         
     Returns:
         Decrypted JSON string
     """
-    salt = hashlib.sha256(f"{user_id}{config.MASTER_KEY}token".encode()).digest()[:16]
-    return decrypt(encrypted_token, config.MASTER_KEY, salt).decode()
+    return _open(encrypted_token, user_id, PURPOSE_TOKEN).decode()
+
+
+def migrate_blob(blob: bytes, user_id: int, purpose: str) -> bytes:
+    """Re-encrypt a v1 blob as v2 (v2 blobs are returned unchanged).
+    
+    Args:
+        blob: Stored ciphertext
+        user_id: Owner user ID
+        purpose: PURPOSE_CREDENTIALS or PURPOSE_TOKEN
+        
+    Returns:
+        v2 ciphertext
+    """
+    if not needs_migration(blob):
+        return blob
+    return _seal(_open(blob, user_id, purpose), user_id, purpose)
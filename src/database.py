@@ -1,20 +1,119 @@
 """Database management with aiosqlite."""
+import asyncio
+import logging
 import aiosqlite
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, List, Dict, Any
+from account_index import AccountIndex
 import config
 
+logger = logging.getLogger(__name__)
+
+# Applied to every pooled connection
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -2000",  # 2 MB per connection
+)
+
 
 class Database:
-    """Async SQLite database manager."""
+    """Async SQLite database manager.
+    
+    Keeps one long-lived writer connection and a small pool of reader
+    connections open for the lifetime of the process. WAL mode lets the
+    readers run concurrently with the writer.
+    """
     
     def __init__(self):
         self.db_path = config.DB_PATH
+        self.read_pool_size = config.DB_READ_POOL_SIZE
+        self._writer = None
+        self._write_lock = None
+        self._readers = None
+        self._all_readers = []
+        self._connect_lock = None
+        self.account_index = AccountIndex()
+    
+    async def _open(self) -> aiosqlite.Connection:
+        """Open a connection with the standard pragmas."""
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+    
+    async def connect(self):
+        """Open the writer and reader connections (idempotent)."""
+        if self._writer is not None:
+            return
+        
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            
+            writer = await self._open()
+            readers = asyncio.Queue()
+            for _ in range(self.read_pool_size):
+                conn = await self._open()
+                self._all_readers.append(conn)
+                readers.put_nowait(conn)
+            
+            self._write_lock = asyncio.Lock()
+            self._readers = readers
+            self._writer = writer
+            logger.info(f"Database pool opened (1 writer, {self.read_pool_size} readers)")
+    
+    async def close(self):
+        """Close all pooled connections."""
+        if self._writer is None:
+            return
+        
+        async with self._write_lock:
+            await self._writer.close()
+            self._writer = None
+        
+        for conn in self._all_readers:
+            await conn.close()
+        self._all_readers = []
+        self._readers = None
+        logger.info("Database pool closed")
+    
+    @asynccontextmanager
+    async def read(self):
+        """Borrow a reader connection from the pool."""
+        await self.connect()
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+    
+    @asynccontextmanager
+    async def write(self):
+        """Hold the writer connection for one transaction.
+        
+        Commits on success, rolls back on error.
+        """
+        await self.connect()
+        async with self._write_lock:
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
     
     async def init_db(self):
         """Initialize database schema."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             # Users table
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -125,25 +224,84 @@ class Database:
                 )
             """)
             
-            await db.commit()
+            # Broadcast jobs (resumable)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS broadcast_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    text TEXT NOT NULL,
+                    status TEXT DEFAULT 'running',
+                    status_chat_id INTEGER,
+                    status_message_id INTEGER,
+                    total INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            """)
+            
+            # Per-recipient broadcast status: pending, sent, failed, blocked
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS broadcast_recipients (
+                    job_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    status TEXT DEFAULT 'pending',
+                    error TEXT,
+                    PRIMARY KEY (job_id, user_id)
+                )
+            """)
+            
+            # Pending auto-deletions (survive restarts)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_deletes (
+                    chat_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    due_at REAL NOT NULL,
+                    PRIMARY KEY (chat_id, message_id)
+                )
+            """)
+            
+            # Push routing looks accounts up by address
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_gmail_accounts_email ON gmail_accounts(email)"
+            )
+    
+    async def load_account_index(self):
+        """Load active accounts and push settings into the routing table."""
+        async with self.read() as db:
+            async with db.execute("""
+                SELECT id, user_id, email, auto_delete_secs
+                FROM gmail_accounts WHERE is_active = 1
+            """) as cursor:
+                accounts = [dict(row) for row in await cursor.fetchall()]
+            
+            async with db.execute(
+                "SELECT user_id, enabled FROM notification_settings"
+            ) as cursor:
+                user_settings = [dict(row) for row in await cursor.fetchall()]
+            
+            async with db.execute(
+                "SELECT user_id, global_auto_delete_secs FROM privacy_settings"
+            ) as cursor:
+                user_settings += [dict(row) for row in await cursor.fetchall()]
+        
+        self.account_index.load(accounts, user_settings)
+        logger.info(f"Account index loaded: {len(accounts)} account(s)")
     
     async def add_user(self, user_id: int, username: str = None, first_name: str = None):
         """Add or update user."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute("""
                 INSERT INTO users (user_id, username, first_name, last_active)
                 VALUES (?, ?, ?, ?)
                 ON CONFLICT(user_id) DO UPDATE SET
                     username = excluded.username,
                     first_name = excluded.first_name,
-                    last_active = excluded.last_active
+                    last_active = excluded.last_active,
+                    is_active = 1
             """, (user_id, username, first_name, datetime.now()))
-            await db.commit()
     
     async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by ID."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute(
                 "SELECT * FROM users WHERE user_id = ?", (user_id,)
             ) as cursor:
@@ -153,17 +311,18 @@ class Database:
     async def add_gmail_account(self, user_id: int, email: str, 
                                credentials_enc: bytes, token_enc: bytes = None):
         """Add Gmail account for user."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
+        async with self.write() as db:
+            cursor = await db.execute("""
                 INSERT INTO gmail_accounts (user_id, email, credentials_enc, token_enc)
                 VALUES (?, ?, ?, ?)
             """, (user_id, email, credentials_enc, token_enc))
-            await db.commit()
+            account_id = cursor.lastrowid
+        
+        self.account_index.add({'id': account_id, 'user_id': user_id, 'email': email})
     
     async def get_gmail_accounts(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all Gmail accounts for user."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute("""
                 SELECT id, email, last_sync, is_active
                 FROM gmail_accounts
@@ -174,8 +333,7 @@ class Database:
     
     async def get_gmail_account(self, account_id: int) -> Optional[Dict[str, Any]]:
         """Get specific Gmail account with credentials."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute("""
                 SELECT * FROM gmail_accounts WHERE id = ?
             """, (account_id,)) as cursor:
@@ -184,27 +342,84 @@ class Database:
     
     async def update_token(self, account_id: int, token_enc: bytes):
         """Update Gmail account token."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute("""
                 UPDATE gmail_accounts
                 SET token_enc = ?, last_sync = ?
                 WHERE id = ?
             """, (token_enc, datetime.now(), account_id))
-            await db.commit()
+    
+    async def get_encrypted_accounts(self) -> List[Dict[str, Any]]:
+        """Get encrypted blobs of all Gmail accounts (for key migration)."""
+        async with self.read() as db:
+            async with db.execute("""
+                SELECT id, user_id, credentials_enc, token_enc FROM gmail_accounts
+            """) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def update_encrypted_blobs(self, account_id: int,
+                                     old_credentials_enc: bytes, old_token_enc: Optional[bytes],
+                                     credentials_enc: bytes, token_enc: Optional[bytes]) -> bool:
+        """Replace encrypted blobs without touching last_sync.
+        
+        Compare-and-swap: the row is only updated if it still holds the old
+        blobs, so a token refreshed meanwhile is not overwritten.
+        
+        Returns:
+            True if the row was updated
+        """
+        async with self.write() as db:
+            cursor = await db.execute("""
+                UPDATE gmail_accounts
+                SET credentials_enc = ?, token_enc = ?
+                WHERE id = ? AND credentials_enc = ? AND token_enc IS ?
+            """, (credentials_enc, token_enc, account_id, old_credentials_enc, old_token_enc))
+            return cursor.rowcount > 0
+    
+    async def get_history_id(self, account_id: int) -> Optional[str]:
+        """Get last processed historyId of a Gmail account."""
+        async with self.read() as db:
+            async with db.execute(
+                "SELECT last_history_id FROM gmail_accounts WHERE id = ?",
+                (account_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else None
+    
+    async def advance_history_id(self, account_id: int, history_id: int):
+        """Move last processed historyId forward (never backwards)."""
+        async with self.write() as db:
+            await db.execute("""
+                UPDATE gmail_accounts
+                SET last_history_id = ?
+                WHERE id = ?
+                  AND (last_history_id IS NULL OR CAST(last_history_id AS INTEGER) < ?)
+            """, (str(history_id), account_id, int(history_id)))
+    
+    async def init_history_id(self, account_id: int, history_id: int):
+        """Set historyId only if the account has none yet."""
+        async with self.write() as db:
+            await db.execute("""
+                UPDATE gmail_accounts
+                SET last_history_id = ?
+                WHERE id = ? AND last_history_id IS NULL
+            """, (str(history_id), account_id))
     
     async def delete_gmail_account(self, account_id: int):
         """Delete Gmail account."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute(
                 "UPDATE gmail_accounts SET is_active = 0 WHERE id = ?",
                 (account_id,)
             )
-            await db.commit()
+        
+        self.account_index.remove(account_id)
     
     async def create_session(self, session_id: str, user_id: int, 
                             state: str, data: Dict = None):
         """Create user session."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             expires_at = datetime.now().timestamp() + config.SESSION_TIMEOUT
             await db.execute("""
                 INSERT INTO sessions (session_id, user_id, state, data, expires_at)
@@ -212,12 +427,10 @@ class Database:
             """, (session_id, user_id, state, 
                   json.dumps(data) if data else None,
                   datetime.fromtimestamp(expires_at)))
-            await db.commit()
     
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get session by ID."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute("""
                 SELECT * FROM sessions 
                 WHERE session_id = ? AND expires_at > ?
@@ -232,20 +445,17 @@ class Database:
     
     async def delete_session(self, session_id: str):
         """Delete session."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-            await db.commit()
     
     async def cleanup_expired_sessions(self):
         """Remove expired sessions."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute("DELETE FROM sessions WHERE expires_at < ?", (datetime.now(),))
-            await db.commit()
     
     async def get_notification_settings(self, user_id: int) -> Dict[str, Any]:
         """Get notification settings for user."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.read() as db:
             async with db.execute("""
                 SELECT * FROM notification_settings WHERE user_id = ?
             """, (user_id,)) as cursor:
@@ -262,7 +472,7 @@ class Database:
     
     async def update_notification_settings(self, user_id: int, **settings):
         """Update notification settings."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             await db.execute("""
                 INSERT INTO notification_settings (user_id, enabled, keywords, 
                                                    exclude_spam, exclude_promotions)
@@ -279,11 +489,12 @@ class Database:
                 settings.get('exclude_spam', True),
                 settings.get('exclude_promotions', True)
             ))
-            await db.commit()
+        
+        self.account_index.update_user(user_id, enabled=settings.get('enabled', True))
     
     async def check_rate_limit(self, user_id: int, endpoint: str) -> bool:
         """Check if user exceeded rate limit."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.write() as db:
             now = datetime.now()
             window_start = datetime.fromtimestamp(
                 now.timestamp() - config.RATE_LIMIT_WINDOW
@@ -301,7 +512,6 @@ class Database:
                         INSERT INTO rate_limits (user_id, endpoint, request_count)
                         VALUES (?, ?, 1)
                     """, (user_id, endpoint))
-                    await db.commit()
                     return True
                 
                 count, start = row
@@ -314,7 +524,6 @@ class Database:
                         SET request_count = 1, window_start = ?
                         WHERE user_id = ? AND endpoint = ?
                     """, (now, user_id, endpoint))
-                    await db.commit()
                     return True
                 
                 if count >= config.RATE_LIMIT_REQUESTS:
@@ -326,7 +535,6 @@ class Database:
                     SET request_count = request_count + 1
                     WHERE user_id = ? AND endpoint = ?
                 """, (user_id, endpoint))
-                await db.commit()
                 return True
 
 
@@ -4,10 +4,9 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from database import db
 from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown
+from render import to_tiny_caps, escape_markdown, header, app_header, field
+from keyboards import keyboards
 from paginator import paginate, create_pagination_keyboard
-from utils import parse_email_headers, get_message_body
-import asyncio
 from auto_delete import schedule_delete, DELETE_SUCCESS
 
 # Compose flow states
@@ -28,9 +27,7 @@ class EmailHandlers:
         if not accounts:
             await query.edit_message_text(
                 f"❌ {escape_markdown('No accounts found. Add an account first!')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return ConversationHandler.END
@@ -54,9 +51,8 @@ class EmailHandlers:
         )])
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Send Mail — Step 1/4')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Select the account to send from:"
+            app_header('Send Mail — Step 1/4') +
+            "Select the account to send from:"
         )
         
         await query.edit_message_text(
@@ -83,10 +79,9 @@ class EmailHandlers:
         query = update.callback_query if update.callback_query else None
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Send Mail — Step 2/4')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Enter recipient email address:\n\n"
-            f"Example: `user@example\\.com`"
+            app_header('Send Mail — Step 2/4') +
+            "Enter recipient email address:\n\n"
+            "Example: `user@example\\.com`"
         )
         
         keyboard = [[InlineKeyboardButton(
@@ -121,15 +116,14 @@ class EmailHandlers:
                 f"❌ {escape_markdown('Invalid email format. Please try again.')}",
                 parse_mode='MarkdownV2'
             )
-            asyncio.create_task(schedule_delete(context.bot, update.effective_chat.id, msg.message_id, 5))
+            await schedule_delete(context.bot, update.effective_chat.id, msg.message_id, 5)
             return ENTER_TO
         
         context.user_data['compose_to'] = to_email
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Send Mail — Step 3/4')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Enter email subject:"
+            app_header('Send Mail — Step 3/4') +
+            "Enter email subject:"
         )
         
         keyboard = [[InlineKeyboardButton(
@@ -152,9 +146,8 @@ class EmailHandlers:
         context.user_data['compose_subject'] = subject
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Send Mail — Step 4/4')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Enter email body:"
+            app_header('Send Mail — Step 4/4') +
+            "Enter email body:"
         )
         
         keyboard = [[InlineKeyboardButton(
@@ -185,11 +178,10 @@ class EmailHandlers:
         ellipsis = '\\.\\.\\.' if len(body) > 100 else ''
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Confirm Send')}*\n"
-            f"`────────────────────────`\n\n"
-            f"*{to_tiny_caps('To')}:* {escape_markdown(to_email)}\n"
-            f"*{to_tiny_caps('Subject')}:* {escape_markdown(subject)}\n"
-            f"*{to_tiny_caps('Body')}:* {escape_markdown(body_preview)}{ellipsis}\n\n"
+            app_header('Confirm Send') +
+            f"{field('To')} {escape_markdown(to_email)}\n"
+            f"{field('Subject')} {escape_markdown(subject)}\n"
+            f"{field('Body')} {escape_markdown(body_preview)}{ellipsis}\n\n"
             f"Ready to send?"
         )
         
@@ -225,8 +217,7 @@ class EmailHandlers:
             await gmail_service.send_email(account_id, to_email, subject, body)
             
             text = (
-                f"✅ *{to_tiny_caps('Email Sent Successfully')}\\!*\n"
-                f"`────────────────────────`\n\n"
+                header('✅', 'Email Sent Successfully!') +
                 f"Your email has been sent to {escape_markdown(to_email)}\\."
             )
             
@@ -239,12 +230,12 @@ class EmailHandlers:
             )
             
             # Auto-delete success message
-            asyncio.create_task(schedule_delete(
+            await schedule_delete(
                 context.bot,
                 update.effective_chat.id,
                 msg.message_id,
                 DELETE_SUCCESS
-            ))
+            )
             
             # Clear compose data
             for key in ['compose_from_account', 'compose_to', 'compose_subject', 'compose_body', 'waiting_for']:
@@ -255,9 +246,7 @@ class EmailHandlers:
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Failed to send: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return ConversationHandler.END
@@ -302,9 +291,8 @@ class EmailHandlers:
         context.user_data['waiting_for'] = 'reply_body'
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Reply to Email')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Enter your reply:"
+            app_header('Reply to Email') +
+            "Enter your reply:"
         )
         
         keyboard = [[InlineKeyboardButton(
@@ -334,9 +322,8 @@ class EmailHandlers:
             await gmail_service.reply_email(account_id, message_id, reply_body)
             
             text = (
-                f"✅ *{to_tiny_caps('Reply Sent Successfully')}\\!*\n"
-                f"`────────────────────────`\n\n"
-                f"Your reply has been sent\\."
+                header('✅', 'Reply Sent Successfully!') +
+                "Your reply has been sent\\."
             )
             
             keyboard = [[InlineKeyboardButton(
@@ -351,12 +338,12 @@ class EmailHandlers:
             )
             
             # Auto-delete success message
-            asyncio.create_task(schedule_delete(
+            await schedule_delete(
                 context.bot,
                 update.effective_chat.id,
                 msg.message_id,
                 DELETE_SUCCESS
-            ))
+            )
             
             # Clear reply data
             for key in ['reply_account_id', 'reply_message_id', 'waiting_for']:
@@ -382,9 +369,8 @@ class EmailHandlers:
         context.user_data['waiting_for'] = 'forward_to'
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Forward Email')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Enter recipient email address:"
+            app_header('Forward Email') +
+            "Enter recipient email address:"
         )
         
         keyboard = [[InlineKeyboardButton(
@@ -412,7 +398,7 @@ class EmailHandlers:
                 f"❌ {escape_markdown('Invalid email format. Please try again.')}",
                 parse_mode='MarkdownV2'
             )
-            asyncio.create_task(schedule_delete(context.bot, update.effective_chat.id, msg.message_id, 5))
+            await schedule_delete(context.bot, update.effective_chat.id, msg.message_id, 5)
             return
         
         account_id = context.user_data['forward_account_id']
@@ -425,8 +411,7 @@ class EmailHandlers:
             await gmail_service.forward_email(account_id, message_id, forward_to)
             
             text = (
-                f"✅ *{to_tiny_caps('Email Forwarded Successfully')}\\!*\n"
-                f"`────────────────────────`\n\n"
+                header('✅', 'Email Forwarded Successfully!') +
                 f"Email forwarded to {escape_markdown(forward_to)}\\."
             )
             
@@ -442,12 +427,12 @@ class EmailHandlers:
             )
             
             # Auto-delete success message
-            asyncio.create_task(schedule_delete(
+            await schedule_delete(
                 context.bot,
                 update.effective_chat.id,
                 msg.message_id,
                 DELETE_SUCCESS
-            ))
+            )
             
             # Clear forward data
             for key in ['forward_account_id', 'forward_message_id', 'waiting_for']:
@@ -472,16 +457,16 @@ class EmailHandlers:
         
         try:
             # Fetch full message
-            message = await gmail_service.get_message(account_id, message_id)
-            subject, sender, date = parse_email_headers(message)
-            body = get_message_body(message['payload'])
+            message = await gmail_service.get_parsed_message(account_id, message_id)
+            subject, sender, date = message.subject, message.sender, message.date
+            body = message.body()
             
             # Build full email text
             full_text = (
-                f"*{to_tiny_caps('Subject')}:* {escape_markdown(subject)}\n"
-                f"*{to_tiny_caps('From')}:* {escape_markdown(sender)}\n"
-                f"*{to_tiny_caps('Date')}:* {escape_markdown(date)}\n\n"
-                f"*{to_tiny_caps('Body')}:*\n"
+                f"{field('Subject')} {escape_markdown(subject)}\n"
+                f"{field('From')} {escape_markdown(sender)}\n"
+                f"{field('Date')} {escape_markdown(date)}\n\n"
+                f"{field('Body')}\n"
                 f"{escape_markdown(body)}"
             )
             
@@ -493,7 +478,7 @@ class EmailHandlers:
             current_text = chunks[page - 1]
             
             # Add header
-            header = (
+            page_header = (
                 f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Full Email')}* — "
                 f"{to_tiny_caps(f'Page {page} of {total_pages}')}\n"
                 f"`────────────────────────`\n\n"
@@ -508,7 +493,7 @@ class EmailHandlers:
             )
             
             await query.edit_message_text(
-                header + current_text,
+                page_header + current_text,
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode='MarkdownV2'
             )
@@ -516,9 +501,7 @@ class EmailHandlers:
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Error: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="inbox")
-                ]]),
+                reply_markup=keyboards.back('inbox'),
                 parse_mode='MarkdownV2'
             )
 
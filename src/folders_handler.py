@@ -1,10 +1,11 @@
 """Folders (system labels) handler."""
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from database import db
-from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown
-from utils import parse_email_headers, truncate_text
+from gmail_service import gmail_service, LIST_HEADERS
+from render import to_tiny_caps, escape_markdown, header, app_header
+from keyboards import keyboards
+from utils import truncate_text
 
 
 class FoldersHandler:
@@ -21,9 +22,7 @@ class FoldersHandler:
         if not accounts:
             await query.edit_message_text(
                 f"❌ {escape_markdown('No accounts found. Add an account first!')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return
@@ -41,20 +40,14 @@ class FoldersHandler:
                 callback_data=f"folders_account:{acc['id']}"
             )])
         
-        keyboard.append([InlineKeyboardButton(
-            f"🔙 {to_tiny_caps('Back')}",
-            callback_data="start"
-        )])
-        
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Folders')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Select account:"
+            app_header('Folders') +
+            "Select account:"
         )
         
         await query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards.markup(keyboard, 'back:start'),
             parse_mode='MarkdownV2'
         )
     
@@ -91,9 +84,8 @@ class FoldersHandler:
             
             keyboard = []
             text = (
-                f"📁 *{to_tiny_caps('Folders')}*\n"
-                f"`────────────────────────`\n\n"
-                f"Select a folder to view:\n\n"
+                header('📁', 'Folders') +
+                "Select a folder to view:\n\n"
             )
             
             for folder in folders:
@@ -109,25 +101,18 @@ class FoldersHandler:
                     callback_data=f"folder_view:{account_id}:{folder_id}"
                 )])
             
-            keyboard.append([InlineKeyboardButton(
-                f"🔙 {to_tiny_caps('Back to Menu')}",
-                callback_data="start"
-            )])
-            keyboard.append([InlineKeyboardButton(
-                f"🏠 {to_tiny_caps('Main Menu')}",
-                callback_data="start"
-            )])
+            reply_markup = keyboards.markup(keyboard, 'back_to_menu', 'main_menu')
             
             if query:
                 await query.edit_message_text(
                     text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=reply_markup,
                     parse_mode='MarkdownV2'
                 )
             else:
                 await update.message.reply_text(
                     text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=reply_markup,
                     parse_mode='MarkdownV2'
                 )
             
@@ -136,9 +121,7 @@ class FoldersHandler:
             if query:
                 await query.edit_message_text(
                     error_text,
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                    ]]),
+                    reply_markup=keyboards.back('start'),
                     parse_mode='MarkdownV2'
                 )
             else:
@@ -172,9 +155,7 @@ class FoldersHandler:
             if not messages:
                 await query.edit_message_text(
                     f"📭 {escape_markdown(f'{folder_name} is empty.')}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="folders")
-                    ]]),
+                    reply_markup=keyboards.back('folders'),
                     parse_mode='MarkdownV2'
                 )
                 return
@@ -185,42 +166,34 @@ class FoldersHandler:
                 f"`────────────────────────`\n\n"
             )
             
-            for msg in messages[:10]:
-                full_msg = await gmail_service.get_message(account_id, msg['id'])
-                subject, sender, date = parse_email_headers(full_msg)
+            full_msgs = await gmail_service.get_parsed_messages_batch(
+                account_id, [msg['id'] for msg in messages[:10]],
+                format='metadata', headers=LIST_HEADERS
+            )
+            
+            for full_msg in full_msgs:
+                subject, sender = full_msg.subject, full_msg.sender
                 
-                is_unread = 'UNREAD' in full_msg.get('labelIds', [])
-                icon = "🔵" if is_unread else "⚪"
+                icon = "🔵" if full_msg.is_unread else "⚪"
                 
                 text += f"{icon} {escape_markdown(truncate_text(subject, 40))}\n"
                 text += f"   From: {escape_markdown(truncate_text(sender, 30))}\n\n"
                 
                 keyboard.append([InlineKeyboardButton(
                     f"{icon} {truncate_text(subject, 35)}",
-                    callback_data=f"view_msg:{account_id}:{msg['id']}"
+                    callback_data=f"view_msg:{account_id}:{full_msg.id}"
                 )])
             
-            keyboard.append([InlineKeyboardButton(
-                f"🔙 {to_tiny_caps('Back to Folders')}",
-                callback_data="folders"
-            )])
-            keyboard.append([InlineKeyboardButton(
-                f"🏠 {to_tiny_caps('Main Menu')}",
-                callback_data="start"
-            )])
-            
             await query.edit_message_text(
                 text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards.markup(keyboard, 'back_to_folders', 'main_menu'),
                 parse_mode='MarkdownV2'
             )
             
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Error: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="folders")
-                ]]),
+                reply_markup=keyboards.back('folders'),
                 parse_mode='MarkdownV2'
             )
 
@@ -1,19 +1,17 @@
 """Message formatting utilities with tiny caps and MarkdownV2."""
-import re
 from datetime import datetime
+from otp import otp_engine
+from render import TINY_CAPS, DIVIDER, to_tiny_caps, escape_markdown
 
+# TINY_CAPS, DIVIDER, to_tiny_caps and escape_markdown live in render and
+# are re-exported for existing callers
+__all__ = [
+    'EMOJI', 'TINY_CAPS', 'DIVIDER', 'to_tiny_caps', 'escape_markdown',
+    'format_header', 'format_button_text', 'format_email_preview', 'format_timestamp',
+    'truncate_text', 'format_success', 'format_error', 'format_warning', 'format_info',
+    'split_message', 'extract_otp',
+]
 
-# Tiny caps mapping
-TINY_CAPS = {
-    'a': 'ᴀ', 'b': 'ʙ', 'c': 'ᴄ', 'd': 'ᴅ', 'e': 'ᴇ', 'f': 'ғ', 'g': 'ɢ', 'h': 'ʜ',
-    'i': 'ɪ', 'j': 'ᴊ', 'k': 'ᴋ', 'l': 'ʟ', 'm': 'ᴍ', 'n': 'ɴ', 'o': 'ᴏ', 'p': 'ᴘ',
-    'q': 'ǫ', 'r': 'ʀ', 's': 's', 't': 'ᴛ', 'u': 'ᴜ', 'v': 'ᴠ', 'w': 'ᴡ', 'x': 'x',
-    'y': 'ʏ', 'z': 'ᴢ',
-    'A': 'ᴀ', 'B': 'ʙ', 'C': 'ᴄ', 'D': 'ᴅ', 'E': 'ᴇ', 'F': 'ғ', 'G': 'ɢ', 'H': 'ʜ',
-    'I': 'ɪ', 'J': 'ᴊ', 'K': 'ᴋ', 'L': 'ʟ', 'M': 'ᴍ', 'N': 'ɴ', 'O': 'ᴏ', 'P': 'ᴘ',
-    'Q': 'ǫ', 'R': 'ʀ', 'S': 's', 'T': 'ᴛ', 'U': 'ᴜ', 'V': 'ᴠ', 'W': 'ᴡ', 'X': 'x',
-    'Y': 'ʏ', 'Z': 'ᴢ'
-}
 
 # Emoji map for consistent usage across bot
 EMOJI = {
@@ -69,33 +67,6 @@ EMOJI = {
 }
 
 
-def to_tiny_caps(text: str) -> str:
-    """Convert text to tiny caps.
-    
-    Args:
-        text: Input text
-        
-    Returns:
-        Text in tiny caps
-    """
-    return ''.join(TINY_CAPS.get(c, c) for c in text)
-
-
-def escape_markdown(text: str) -> str:
-    """Escape special characters for MarkdownV2.
-    
-    Args:
-        text: Input text
-        
-    Returns:
-        Escaped text safe for MarkdownV2
-    """
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-    for char in special_chars:
-        text = text.replace(char, f'\\{char}')
-    return text
-
-
 def format_header(title: str, subtitle: str = None) -> str:
     """Format message header with tiny caps.
     
@@ -109,7 +80,7 @@ def format_header(title: str, subtitle: str = None) -> str:
     header = f"*{to_tiny_caps(title)}*"
     if subtitle:
         header += f" · *{to_tiny_caps(subtitle)}*"
-    header += "\n`────────────────────────`\n"
+    header += f"\n{DIVIDER}\n"
     return header
 
 
@@ -276,19 +247,4 @@ def extract_otp(text: str) -> str:
     Returns:
         OTP code if found, empty string otherwise
     """
-    # Common OTP patterns
-    patterns = [
-        r'\b(\d{6})\b',  # 6-digit code
-        r'\b(\d{4})\b',  # 4-digit code
-        r'\b([A-Z0-9]{6})\b',  # 6-char alphanumeric
-        r'code[:\s]+(\d+)',  # "code: 123456"
-        r'OTP[:\s]+(\d+)',  # "OTP: 123456"
-        r'verification[:\s]+(\d+)',  # "verification: 123456"
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    
-    return ""
+    return otp_engine.extract(text) or ""
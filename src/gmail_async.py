@@ -0,0 +1,229 @@
+"""Gmail REST backend on aiohttp (GMAIL_BACKEND=aiohttp)."""
+import json
+import uuid
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+import aiohttp
+import httplib2
+from googleapiclient.errors import HttpError
+from google.auth.exceptions import RefreshError
+import config
+from gmail_service import GmailService, TokenExpiredError, QuotaExceededError
+from token_manager import credential_manager
+
+logger = logging.getLogger(__name__)
+
+# (resource, method) -> (HTTP method, path under users/me)
+ROUTES = {
+    ('messages', 'list'): ('GET', 'messages'),
+    ('messages', 'get'): ('GET', 'messages/{id}'),
+    ('messages', 'modify'): ('POST', 'messages/{id}/modify'),
+    ('messages', 'trash'): ('POST', 'messages/{id}/trash'),
+    ('messages', 'send'): ('POST', 'messages/send'),
+    ('messages', 'batchModify'): ('POST', 'messages/batchModify'),
+    ('labels', 'list'): ('GET', 'labels'),
+    ('labels', 'create'): ('POST', 'labels'),
+    ('labels', 'delete'): ('DELETE', 'labels/{id}'),
+    ('history', 'list'): ('GET', 'history'),
+    ('', 'getProfile'): ('GET', 'profile'),
+    ('', 'watch'): ('POST', 'watch'),
+}
+
+API_PATH = '/gmail/v1/users/me/'
+BATCH_PATH = '/batch/gmail/v1'
+
+# Google only compresses responses for clients that say they accept gzip
+USER_AGENT = 'AutoXMail/1.0 (gzip)'
+
+
+def _query(params: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Encode method parameters as query pairs (lists repeat the key)."""
+    pairs = []
+    for name, value in params.items():
+        if value is None:
+            continue
+        for item in (value if isinstance(value, (list, tuple)) else [value]):
+            if isinstance(item, bool):
+                item = 'true' if item else 'false'
+            pairs.append((name, str(item)))
+    return pairs
+
+
+def _http_error(status: int, content: bytes, uri: str, reason: str = '') -> HttpError:
+    """Build the HttpError googleapiclient would raise, so callers need no changes."""
+    resp = httplib2.Response({'status': status})
+    resp.reason = reason
+    return HttpError(resp, content, uri=uri)
+
+
+def _parse_batch(body: str, boundary: str) -> Dict[str, Tuple[int, bytes]]:
+    """Split a multipart/mixed batch response.
+
+    Returns:
+        (status, body) by Content-ID (without the "response-" prefix)
+
+    Raises:
+        ValueError: If the response carries no boundary
+    """
+    if not boundary:
+        raise ValueError("Batch response has no multipart boundary")
+    results = {}
+    for chunk in body.replace('\r\n', '\n').split(f'--{boundary}'):
+        chunk = chunk.strip()
+        if not chunk or chunk == '--':
+            continue
+
+        outer, _, http_part = chunk.partition('\n\n')
+        content_id = ''
+        for line in outer.split('\n'):
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-id':
+                content_id = value.strip().strip('<>')
+        if content_id.startswith('response-'):
+            content_id = content_id[len('response-'):]
+
+        head, _, payload = http_part.partition('\n\n')
+        status_line = head.split('\n', 1)[0]
+        status = int(status_line.split()[1])
+        results[content_id] = (status, payload.strip().encode())
+    return results
+
+
+class AsyncGmailService(GmailService):
+    """GmailService over a shared aiohttp session.
+
+    One ClientSession (keep-alive connection pool, gzip) serves every
+    account; requests authenticate with the account's current access token
+    from the credential manager. Batches use Gmail's multipart batch
+    endpoint. Everything above _call/_execute_batch is inherited.
+    """
+
+    def __init__(self, base_url: str = None):
+        super().__init__()
+        self.base_url = (base_url or config.GMAIL_API_BASE_URL).rstrip('/')
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the shared session on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.GMAIL_HTTP_POOL_SIZE,
+                keepalive_timeout=config.GMAIL_HTTP_KEEPALIVE,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=config.GMAIL_HTTP_TIMEOUT),
+                headers={'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip'}
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, account_id: int, http_method: str, url: str,
+                       params: List[Tuple[str, str]] = None, json_body: Any = None,
+                       data: bytes = None, headers: Dict[str, str] = None) -> Tuple[int, Any, bytes]:
+        """Send an authenticated request.
+
+        Same retry policy as gmail_request_with_backoff: backoff on 429/5xx
+        and one token refresh on 401.
+
+        Returns:
+            (status, response headers, body) of the final attempt
+        """
+        session = self._get_session()
+        max_retries = 3
+        refreshed = False
+
+        for attempt in range(max_retries):
+            creds = await credential_manager.get(account_id)
+            request_headers = {'Authorization': f'Bearer {creds.token}'}
+            if headers:
+                request_headers.update(headers)
+
+            async with session.request(http_method, url, params=params, json=json_body,
+                                       data=data, headers=request_headers) as response:
+                body = await response.read()
+                status = response.status
+                response_headers = response.headers
+
+            if status < 300:
+                return status, response_headers, body
+
+            if status in [429, 500, 503]:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if status == 401:
+                if refreshed:
+                    raise TokenExpiredError("Gmail token expired")
+                try:
+                    await credential_manager.refresh(account_id)
+                except RefreshError:
+                    raise TokenExpiredError("Gmail token expired")
+                refreshed = True
+                continue
+            raise _http_error(status, body, url)
+
+        raise QuotaExceededError("Gmail API quota exceeded after retries")
+
+    async def _call(self, account_id: int, resource: str, method: str, **params) -> Any:
+        """Run one Gmail API method over REST."""
+        http_method, path = ROUTES[(resource, method)]
+        if '{id}' in path:
+            path = path.format(id=params.pop('id'))
+        body = params.pop('body', None)
+
+        _, _, content = await self._request(
+            account_id, http_method, f"{self.base_url}{API_PATH}{path}",
+            params=_query(params), json_body=body
+        )
+        return json.loads(content) if content else {}
+
+    async def _execute_batch(self, account_id: int, message_ids: List[str],
+                             format: str, headers: Optional[List[str]]):
+        """Fetch messages through the multipart batch endpoint.
+
+        Returns:
+            Tuple of (responses by message ID, errors by message ID)
+        """
+        boundary = f'batch_{uuid.uuid4().hex}'
+        query = [('format', format)]
+        if headers and format == 'metadata':
+            query.extend(('metadataHeaders', header) for header in headers)
+        query_string = urlencode(query)
+
+        parts = []
+        for message_id in message_ids:
+            parts.append(
+                f'--{boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: <{message_id}>\r\n\r\n'
+                f'GET {API_PATH}messages/{quote(message_id, safe="")}?{query_string}\r\n\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n')
+
+        url = f"{self.base_url}{BATCH_PATH}"
+        _, response_headers, content = await self._request(
+            account_id, 'POST', url,
+            data=''.join(parts).encode(),
+            headers={'Content-Type': f'multipart/mixed; boundary={boundary}'}
+        )
+
+        content_type = response_headers.get('Content-Type', '')
+        response_boundary = content_type.partition('boundary=')[2].strip('"')
+
+        responses = {}
+        errors = {}
+        for message_id, (status, payload) in _parse_batch(content.decode('utf-8', errors='replace'),
+                                                          response_boundary).items():
+            if status < 300:
+                responses[message_id] = json.loads(payload)
+            else:
+                errors[message_id] = _http_error(status, payload, url)
+        return responses, errors
@@ -0,0 +1,135 @@
+"""Bounded executor for blocking Gmail API calls."""
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class GmailExecutor:
+    """Run blocking googleapiclient calls off the event loop.
+
+    Every call goes through a sized thread pool and is gated by a global
+    semaphore plus a per-account semaphore, so one slow mailbox can neither
+    stall the event loop nor starve the other accounts.
+    """
+
+    def __init__(self, max_workers: int = None, max_concurrency: int = None,
+                 max_per_account: int = None):
+        self.max_workers = max_workers or config.GMAIL_EXECUTOR_WORKERS
+        self.max_concurrency = max_concurrency or config.GMAIL_MAX_CONCURRENCY
+        self.max_per_account = max_per_account or config.GMAIL_MAX_PER_ACCOUNT
+
+        self._pool = None
+        self._global_sem = None
+        self._account_sems: Dict[int, asyncio.Semaphore] = {}
+
+        # Counters
+        self.waiting = 0
+        self.in_flight = 0
+        self.total_calls = 0
+        self.total_errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Create the thread pool on first use."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='gmail'
+            )
+        return self._pool
+
+    def _get_global_sem(self) -> asyncio.Semaphore:
+        """Create the global semaphore on first use."""
+        if self._global_sem is None:
+            self._global_sem = asyncio.Semaphore(self.max_concurrency)
+        return self._global_sem
+
+    def _get_account_sem(self, account_id: Optional[int]) -> Optional[asyncio.Semaphore]:
+        """Get per-account semaphore (None for calls not tied to an account)."""
+        if account_id is None:
+            return None
+        sem = self._account_sems.get(account_id)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_per_account)
+            self._account_sems[account_id] = sem
+        return sem
+
+    async def run(self, account_id: Optional[int], func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function in the pool under the concurrency caps.
+
+        Args:
+            account_id: Gmail account ID the call belongs to (None if unbound)
+            func: Blocking callable
+            *args: Positional arguments
+            **kwargs: Keyword arguments
+
+        Returns:
+            Function result
+        """
+        loop = asyncio.get_running_loop()
+        account_sem = self._get_account_sem(account_id)
+        global_sem = self._get_global_sem()
+
+        self.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            # Account cap first so a busy mailbox queues on its own semaphore
+            # instead of holding global slots.
+            if account_sem is not None:
+                await account_sem.acquire()
+            try:
+                await global_sem.acquire()
+            except BaseException:
+                if account_sem is not None:
+                    account_sem.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        wait = time.monotonic() - queued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_calls += 1
+        self.in_flight += 1
+
+        try:
+            return await loop.run_in_executor(
+                self._get_pool(), lambda: func(*args, **kwargs)
+            )
+        except Exception:
+            self.total_errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            global_sem.release()
+            if account_sem is not None:
+                account_sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get executor counters."""
+        return {
+            'workers': self.max_workers,
+            'waiting': self.waiting,
+            'in_flight': self.in_flight,
+            'total_calls': self.total_calls,
+            'total_errors': self.total_errors,
+            'avg_wait_ms': (self.total_wait / self.total_calls * 1000) if self.total_calls else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+    def shutdown(self):
+        """Stop the thread pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("Gmail executor stopped")
+
+
+# Global executor instance
+gmail_executor = GmailExecutor()
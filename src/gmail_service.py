@@ -3,17 +3,74 @@ import json
 import base64
 import re
 import asyncio
+import threading
+from collections import OrderedDict
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional, List, Dict, Any
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from typing import Optional, List, Dict, Any, Tuple
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
-from google.auth.transport.requests import Request
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
 import aiohttp
 import config
-from crypto import decrypt_token, encrypt_token
-from database import db
+from google.auth.exceptions import RefreshError
+from gmail_executor import gmail_executor
+from token_manager import credential_manager
+from message_cache import MessageCache
+from service_cache import ServiceCache
+from parsed_message import ParsedMessage
+
+# Gmail accepts up to 100 calls per batch; 50 keeps us clear of per-batch rate limits
+BATCH_SIZE = 50
+
+# Headers needed to render message lists (format='metadata')
+LIST_HEADERS = ['Subject', 'From', 'Date']
+
+
+# Bundled Gmail discovery document, parsed once and shared by every client
+_discovery_doc = None
+
+
+def build_gmail_client(creds):
+    """Build a Gmail client from the bundled discovery document.
+    
+    No discovery request and no JSON parsing happen per build.
+    """
+    global _discovery_doc
+    if _discovery_doc is None:
+        _discovery_doc = json.loads(get_static_doc('gmail', 'v1'))
+        # GMAIL_API_BASE_URL (e.g. a local fake server); batch requests are
+        # sent to rootUrl too, so the document itself is repointed
+        _discovery_doc['rootUrl'] = config.GMAIL_API_BASE_URL.rstrip('/') + '/'
+    return build_from_document(_discovery_doc, credentials=creds)
+
+
+# httplib2.Http is not thread-safe, so executor threads never share a
+# client's built-in connection: each thread keeps its own per credentials.
+_thread_http = threading.local()
+
+
+def _authorized_http(creds) -> AuthorizedHttp:
+    """This thread's AuthorizedHttp for creds (LRU-bounded per thread)."""
+    https = getattr(_thread_http, 'https', None)
+    if https is None:
+        https = _thread_http.https = OrderedDict()
+    http = https.get(id(creds))
+    if http is None or http.credentials is not creds:
+        http = AuthorizedHttp(creds, http=build_http())
+        https[id(creds)] = http
+        while len(https) > config.GMAIL_SERVICE_CACHE_SIZE:
+            https.popitem(last=False)
+    else:
+        https.move_to_end(id(creds))
+    return http
+
+
+def execute_request(request):
+    """Execute a googleapiclient request on this thread's connection."""
+    return request.execute(http=_authorized_http(request.http.credentials))
 
 
 class TokenExpiredError(Exception):
@@ -26,27 +83,31 @@ class QuotaExceededError(Exception):
     pass
 
 
-async def gmail_request_with_backoff(func, *args, **kwargs):
+async def gmail_request_with_backoff(func, *args, account_id: int = None, **kwargs):
     """Execute Gmail API request with exponential backoff.
     
+    The blocking call runs on the Gmail executor, never on the event loop.
+    
     Args:
         func: Function to execute
         *args: Positional arguments
+        account_id: Gmail account ID (for per-account concurrency cap)
         **kwargs: Keyword arguments
         
     Returns:
         Function result
         
     Raises:
-        TokenExpiredError: If token is expired
+        TokenExpiredError: If token is expired and cannot be refreshed
         QuotaExceededError: If quota exceeded after retries
         HttpError: For other HTTP errors
     """
     max_retries = 3
+    refreshed = False
     
     for attempt in range(max_retries):
         try:
-            return func(*args, **kwargs)
+            return await gmail_executor.run(account_id, func, *args, **kwargs)
         except HttpError as e:
             status_code = e.resp.status
             
@@ -61,8 +122,16 @@ async def gmail_request_with_backoff(func, *args, **kwargs):
                 await asyncio.sleep(wait)
                 continue
             elif status_code == 401:
-                # Unauthorized - token expired
-                raise TokenExpiredError("Gmail token expired")
+                # Unauthorized - refresh once and retry; the request's
+                # credentials are refreshed in place
+                if refreshed or account_id is None:
+                    raise TokenExpiredError("Gmail token expired")
+                try:
+                    await credential_manager.refresh(account_id)
+                except RefreshError:
+                    raise TokenExpiredError("Gmail token expired")
+                refreshed = True
+                continue
             else:
                 # Other error - don't retry
                 raise
@@ -75,77 +144,73 @@ class GmailService:
     """Gmail API operations."""
     
     def __init__(self):
-        self.services = {}  # Cache Gmail service instances
+        self.services = ServiceCache(config.GMAIL_SERVICE_CACHE_SIZE, config.GMAIL_SERVICE_TTL)
+        self.message_cache = MessageCache(config.MESSAGE_CACHE_MB * 1024 * 1024)
+        credential_manager.add_listener(self._on_token_refresh)
     
     async def get_service(self, account_id: int):
         """Get or create Gmail service for account."""
         # Check cache
-        if account_id in self.services:
-            return self.services[account_id]
+        service = self.services.get(account_id)
+        if service is not None:
+            return service
         
-        # Load from database
-        account = await db.get_gmail_account(account_id)
-        if not account:
-            raise ValueError("Account not found")
-        
-        # Decrypt token
-        token_data = decrypt_token(account['token_enc'], account['user_id'])
-        token_info = json.loads(token_data)
-        
-        # Create credentials
-        creds = Credentials(
-            token=token_info['token'],
-            refresh_token=token_info.get('refresh_token'),
-            token_uri=token_info['token_uri'],
-            client_id=token_info['client_id'],
-            client_secret=token_info['client_secret'],
-            scopes=token_info['scopes']
-        )
-        
-        # Refresh if expired
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            
-            # Save refreshed token
-            new_token_info = {
-                'token': creds.token,
-                'refresh_token': creds.refresh_token,
-                'token_uri': creds.token_uri,
-                'client_id': creds.client_id,
-                'client_secret': creds.client_secret,
-                'scopes': creds.scopes
-            }
-            token_enc = encrypt_token(
-                json.dumps(new_token_info), 
-                account['user_id']
-            )
-            await db.update_token(account_id, token_enc)
+        # Valid (refreshed if expired) credentials
+        creds = await credential_manager.get(account_id)
         
         # Build service
-        service = build('gmail', 'v1', credentials=creds)
-        self.services[account_id] = service
+        service = await gmail_executor.run(account_id, build_gmail_client, creds)
+        self.services.put(account_id, service)
         return service
     
-    async def get_labels(self, account_id: int) -> List[Dict[str, Any]]:
-        """Get all labels."""
+    async def _on_token_refresh(self, account_id: int, creds):
+        """Swap a cached service for one built with refreshed credentials."""
+        if account_id not in self.services:
+            return
+        self.services.put(account_id, await gmail_executor.run(account_id, build_gmail_client, creds))
+    
+    async def _call(self, account_id: int, resource: str, method: str, **params) -> Any:
+        """Run one Gmail API method for the account's mailbox.
+        
+        Every API call goes through here (and _execute_batch), so another
+        transport only has to override these two.
+        
+        Args:
+            account_id: Gmail account ID
+            resource: users.* collection ('messages', 'labels', 'history'),
+                or '' for methods on users itself
+            method: Method name, e.g. 'list' or 'getProfile'
+            **params: Method parameters (without userId)
+            
+        Returns:
+            Decoded response
+        """
         service = await self.get_service(account_id)
-        results = await gmail_request_with_backoff(
-            service.users().labels().list(userId='me').execute
+        target = service.users()
+        if resource:
+            target = getattr(target, resource)()
+        return await gmail_request_with_backoff(
+            execute_request, getattr(target, method)(userId='me', **params),
+            account_id=account_id
         )
+    
+    async def close(self):
+        """Release transport resources (nothing to do for googleapiclient)."""
+        pass
+    
+    async def get_labels(self, account_id: int) -> List[Dict[str, Any]]:
+        """Get all labels."""
+        results = await self._call(account_id, 'labels', 'list')
         return results.get('labels', [])
     
     async def get_messages(self, account_id: int, label_id: str = 'INBOX',
                           max_results: int = 20, page_token: str = None) -> Dict[str, Any]:
         """Get messages from label."""
-        service = await self.get_service(account_id)
-        
-        results = await gmail_request_with_backoff(
-            service.users().messages().list(
-                userId='me',
-                labelIds=[label_id],
-                maxResults=max_results,
-                pageToken=page_token
-            ).execute
+        results = await self._call(
+            account_id, 'messages', 'list',
+            labelIds=[label_id],
+            maxResults=max_results,
+            pageToken=page_token
         )
         
         return {
@@ -154,89 +219,211 @@ class GmailService:
             'resultSizeEstimate': results.get('resultSizeEstimate', 0)
         }
     
-    async def get_message(self, account_id: int, message_id: str) -> Dict[str, Any]:
-        """Get full message details."""
+    async def get_message(self, account_id: int, message_id: str, format: str = 'full',
+                          headers: List[str] = None) -> Dict[str, Any]:
+        """Get message details.
+        
+        Args:
+            account_id: Gmail account ID
+            message_id: Message ID
+            format: Gmail message format ('full', 'metadata', 'minimal')
+            headers: Header whitelist for 'metadata' format
+            
+        Returns:
+            Message object
+        """
+        cached = self.message_cache.get(account_id, message_id, format, headers)
+        if cached is not None:
+            return cached
+        
+        params = {'id': message_id, 'format': format}
+        if headers and format == 'metadata':
+            params['metadataHeaders'] = headers
+        
+        message = await self._call(account_id, 'messages', 'get', **params)
+        self.message_cache.put(account_id, message_id, format, message, headers)
+        return message
+    
+    async def get_parsed_message(self, account_id: int, message_id: str, format: str = 'full',
+                                 headers: List[str] = None) -> ParsedMessage:
+        """Get a message as a ParsedMessage (see get_message)."""
+        message = await self.get_message(account_id, message_id, format, headers)
+        return self.message_cache.parse(account_id, message, format, headers)
+    
+    async def get_messages_batch(self, account_id: int, message_ids: List[str],
+                                 format: str = 'full',
+                                 headers: List[str] = None) -> List[Dict[str, Any]]:
+        """Get several messages in one HTTP batch round trip.
+        
+        Args:
+            account_id: Gmail account ID
+            message_ids: Message IDs to fetch
+            format: Gmail message format ('full', 'metadata', 'minimal')
+            headers: Header whitelist for 'metadata' format
+        
+        Returns:
+            Messages in the order of message_ids; messages that could not
+            be fetched are left out
+        """
+        fetched = {}
+        for message_id in message_ids:
+            cached = self.message_cache.get(account_id, message_id, format, headers)
+            if cached is not None:
+                fetched[message_id] = cached
+        
+        pending = [m for m in dict.fromkeys(message_ids) if m not in fetched]
+        if not pending:
+            return [fetched[message_id] for message_id in message_ids]
+        
+        refreshed = False
+        
+        for attempt in range(3):
+            retry = []
+            expired = False
+            for start in range(0, len(pending), BATCH_SIZE):
+                chunk = pending[start:start + BATCH_SIZE]
+                responses, errors = await self._execute_batch(
+                    account_id, chunk, format, headers
+                )
+                fetched.update(responses)
+                for message_id, message in responses.items():
+                    self.message_cache.put(account_id, message_id, format, message, headers)
+                
+                for message_id, error in errors.items():
+                    status_code = error.resp.status if isinstance(error, HttpError) else None
+                    if status_code == 401:
+                        expired = True
+                    if status_code in [401, 429, 500, 503]:
+                        retry.append(message_id)
+            
+            if not retry:
+                break
+            
+            # Refresh once and retry parts rejected with 401
+            if expired:
+                if refreshed:
+                    raise TokenExpiredError("Gmail token expired")
+                try:
+                    await credential_manager.refresh(account_id)
+                except RefreshError:
+                    raise TokenExpiredError("Gmail token expired")
+                refreshed = True
+            
+            # Back off before retrying rate-limited parts of the batch
+            await asyncio.sleep(2 ** attempt)
+            pending = retry
+        
+        return [fetched[message_id] for message_id in message_ids if message_id in fetched]
+    
+    async def get_parsed_messages_batch(self, account_id: int, message_ids: List[str],
+                                        format: str = 'full',
+                                        headers: List[str] = None) -> List[ParsedMessage]:
+        """Get several messages as ParsedMessages (see get_messages_batch)."""
+        messages = await self.get_messages_batch(account_id, message_ids, format, headers)
+        return [self.message_cache.parse(account_id, message, format, headers) for message in messages]
+    
+    async def _execute_batch(self, account_id: int, message_ids: List[str],
+                             format: str, headers: Optional[List[str]]):
+        """Run one batch request for up to BATCH_SIZE messages.
+        
+        Returns:
+            Tuple of (responses by message ID, errors by message ID)
+        """
         service = await self.get_service(account_id)
-        message = await gmail_request_with_backoff(
-            service.users().messages().get(
-                userId='me',
-                id=message_id,
-                format='full'
-            ).execute
+        responses = {}
+        errors = {}
+        
+        def callback(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                responses[request_id] = response
+        
+        batch = service.new_batch_http_request(callback=callback)
+        for message_id in message_ids:
+            params = {'userId': 'me', 'id': message_id, 'format': format}
+            if headers and format == 'metadata':
+                params['metadataHeaders'] = headers
+            request = service.users().messages().get(**params)
+            batch.add(request, request_id=message_id)
+        
+        creds = request.http.credentials
+        await gmail_request_with_backoff(
+            lambda: batch.execute(http=_authorized_http(creds)), account_id=account_id
         )
-        return message
+        return responses, errors
     
     async def search_messages(self, account_id: int, query: str,
                              max_results: int = 20) -> List[Dict[str, Any]]:
         """Search messages."""
-        service = await self.get_service(account_id)
-        
-        results = service.users().messages().list(
-            userId='me',
+        results = await self._call(
+            account_id, 'messages', 'list',
             q=query,
             maxResults=max_results
-        ).execute()
+        )
         
         return results.get('messages', [])
     
+    async def _modify_labels(self, account_id: int, message_id: str,
+                             add: List[str] = None, remove: List[str] = None):
+        """Modify message labels and update cached copies."""
+        body = {}
+        if add:
+            body['addLabelIds'] = add
+        if remove:
+            body['removeLabelIds'] = remove
+        
+        result = await self._call(account_id, 'messages', 'modify', id=message_id, body=body)
+        self._update_cached_labels(account_id, message_id, result)
+    
+    def _update_cached_labels(self, account_id: int, message_id: str, result: Dict[str, Any]):
+        """Apply labelIds returned by a mutation to cached copies."""
+        if result and 'labelIds' in result:
+            self.message_cache.set_labels(account_id, message_id, result['labelIds'])
+        else:
+            self.message_cache.invalidate(account_id, message_id)
+    
     async def mark_as_read(self, account_id: int, message_id: str):
         """Mark message as read."""
-        service = await self.get_service(account_id)
-        service.users().messages().modify(
-            userId='me',
-            id=message_id,
-            body={'removeLabelIds': ['UNREAD']}
-        ).execute()
+        await self._modify_labels(account_id, message_id, remove=['UNREAD'])
     
     async def mark_as_unread(self, account_id: int, message_id: str):
         """Mark message as unread."""
-        service = await self.get_service(account_id)
-        service.users().messages().modify(
-            userId='me',
-            id=message_id,
-            body={'addLabelIds': ['UNREAD']}
-        ).execute()
+        await self._modify_labels(account_id, message_id, add=['UNREAD'])
     
     async def move_to_trash(self, account_id: int, message_id: str):
         """Move message to trash."""
-        service = await self.get_service(account_id)
-        service.users().messages().trash(
-            userId='me',
-            id=message_id
-        ).execute()
+        result = await self._call(account_id, 'messages', 'trash', id=message_id)
+        self._update_cached_labels(account_id, message_id, result)
     
     async def mark_as_spam(self, account_id: int, message_id: str):
         """Mark message as spam."""
-        service = await self.get_service(account_id)
-        service.users().messages().modify(
-            userId='me',
-            id=message_id,
-            body={'addLabelIds': ['SPAM']}
-        ).execute()
+        await self._modify_labels(account_id, message_id, add=['SPAM'])
     
     async def add_label(self, account_id: int, message_id: str, label_id: str):
         """Add label to message."""
-        service = await self.get_service(account_id)
-        service.users().messages().modify(
-            userId='me',
-            id=message_id,
-            body={'addLabelIds': [label_id]}
-        ).execute()
+        await self._modify_labels(account_id, message_id, add=[label_id])
     
     async def remove_label(self, account_id: int, message_id: str, label_id: str):
         """Remove label from message."""
-        service = await self.get_service(account_id)
-        service.users().messages().modify(
-            userId='me',
-            id=message_id,
-            body={'removeLabelIds': [label_id]}
-        ).execute()
+        await self._modify_labels(account_id, message_id, remove=[label_id])
+    
+    async def create_label(self, account_id: int, name: str) -> Dict[str, Any]:
+        """Create user label."""
+        label_object = {
+            'name': name,
+            'labelListVisibility': 'labelShow',
+            'messageListVisibility': 'show'
+        }
+        return await self._call(account_id, 'labels', 'create', body=label_object)
+    
+    async def delete_label(self, account_id: int, label_id: str):
+        """Delete user label."""
+        await self._call(account_id, 'labels', 'delete', id=label_id)
     
     async def get_profile(self, account_id: int) -> Dict[str, Any]:
         """Get Gmail profile."""
-        service = await self.get_service(account_id)
-        profile = service.users().getProfile(userId='me').execute()
-        return profile
+        return await self._call(account_id, '', 'getProfile')
     
     async def send_email(self, account_id: int, to_email: str, subject: str, 
                         body: str, reply_to_id: str = None) -> Dict[str, Any]:
@@ -253,8 +440,6 @@ class GmailService:
             Sent message object
         """
         try:
-            service = await self.get_service(account_id)
-            
             # Get sender email
             profile = await self.get_profile(account_id)
             from_email = profile['emailAddress']
@@ -267,15 +452,11 @@ class GmailService:
             
             # Add reply headers if replying
             if reply_to_id:
-                original = await self.get_message(account_id, reply_to_id)
-                thread_id = original.get('threadId')
-                
-                # Extract Message-ID from original
-                headers = original['payload']['headers']
-                original_msg_id = next(
-                    (h['value'] for h in headers if h['name'].lower() == 'message-id'),
-                    None
+                original = await self.get_parsed_message(
+                    account_id, reply_to_id, format='metadata', headers=['Message-ID']
                 )
+                thread_id = original.thread_id
+                original_msg_id = original.header('Message-ID')
                 
                 if original_msg_id:
                     message['In-Reply-To'] = original_msg_id
@@ -291,10 +472,7 @@ class GmailService:
             if thread_id:
                 body_data['threadId'] = thread_id
             
-            sent_message = service.users().messages().send(
-                userId='me',
-                body=body_data
-            ).execute()
+            sent_message = await self._call(account_id, 'messages', 'send', body=body_data)
             
             return sent_message
             
@@ -314,26 +492,17 @@ class GmailService:
             Sent reply message object
         """
         try:
-            service = await self.get_service(account_id)
-            
-            # Fetch original message
-            original = await self.get_message(account_id, original_message_id)
-            headers = original['payload']['headers']
+            # Fetch original message headers
+            original = await self.get_parsed_message(
+                account_id, original_message_id, format='metadata',
+                headers=['Subject', 'From', 'Message-ID']
+            )
             
             # Extract details
-            original_subject = next(
-                (h['value'] for h in headers if h['name'].lower() == 'subject'),
-                'No Subject'
-            )
-            original_from = next(
-                (h['value'] for h in headers if h['name'].lower() == 'from'),
-                ''
-            )
-            original_msg_id = next(
-                (h['value'] for h in headers if h['name'].lower() == 'message-id'),
-                None
-            )
-            thread_id = original.get('threadId')
+            original_subject = original.subject
+            original_from = original.header('From', '')
+            original_msg_id = original.header('Message-ID')
+            thread_id = original.thread_id
             
             # Extract email from "Name <email>" format
             to_email = re.search(r'<(.+?)>', original_from)
@@ -367,13 +536,13 @@ class GmailService:
             raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
             
             # Send as reply in same thread
-            sent_message = service.users().messages().send(
-                userId='me',
+            sent_message = await self._call(
+                account_id, 'messages', 'send',
                 body={
                     'raw': raw_message,
                     'threadId': thread_id
                 }
-            ).execute()
+            )
             
             return sent_message
             
@@ -394,28 +563,16 @@ class GmailService:
             Sent forwarded message object
         """
         try:
-            service = await self.get_service(account_id)
-            
             # Fetch original message
-            original = await self.get_message(account_id, original_message_id)
-            headers = original['payload']['headers']
+            original = await self.get_parsed_message(account_id, original_message_id)
             
             # Extract details
-            original_subject = next(
-                (h['value'] for h in headers if h['name'].lower() == 'subject'),
-                'No Subject'
-            )
-            original_from = next(
-                (h['value'] for h in headers if h['name'].lower() == 'from'),
-                'Unknown'
-            )
-            original_date = next(
-                (h['value'] for h in headers if h['name'].lower() == 'date'),
-                ''
-            )
+            original_subject = original.subject
+            original_from = original.sender
+            original_date = original.date
             
             # Get original body
-            original_body = self._extract_body(original['payload'])
+            original_body = original.body(None)
             
             # Add "Fwd:" if not already there
             if not original_subject.lower().startswith('fwd:'):
@@ -448,42 +605,13 @@ class GmailService:
             raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
             
             # Send
-            sent_message = service.users().messages().send(
-                userId='me',
-                body={'raw': raw_message}
-            ).execute()
+            sent_message = await self._call(account_id, 'messages', 'send', body={'raw': raw_message})
             
             return sent_message
             
         except Exception as e:
             raise Exception(f"Failed to forward email: {str(e)}")
     
-    def _extract_body(self, payload: Dict[str, Any]) -> str:
-        """Extract email body from payload.
-        
-        Args:
-            payload: Message payload
-            
-        Returns:
-            Email body text
-        """
-        body = ""
-        
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    if 'data' in part['body']:
-                        body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-                        break
-                elif part['mimeType'] == 'text/html' and not body:
-                    if 'data' in part['body']:
-                        body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-        else:
-            if 'body' in payload and 'data' in payload['body']:
-                body = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8', errors='ignore')
-        
-        return body
-    
     async def unsubscribe_email(self, account_id: int, message_id: str) -> bool:
         """Unsubscribe from mailing list.
         
@@ -495,17 +623,11 @@ class GmailService:
             True if unsubscribe successful, False if no unsubscribe header found
         """
         try:
-            service = await self.get_service(account_id)
-            
             # Get message headers
-            message = await self.get_message(account_id, message_id)
-            headers = message['payload']['headers']
-            
-            # Find List-Unsubscribe header
-            unsubscribe_header = next(
-                (h['value'] for h in headers if h['name'].lower() == 'list-unsubscribe'),
-                None
+            message = await self.get_parsed_message(
+                account_id, message_id, format='metadata', headers=['List-Unsubscribe']
             )
+            unsubscribe_header = message.header('List-Unsubscribe')
             
             if not unsubscribe_header:
                 return False
@@ -530,10 +652,7 @@ class GmailService:
                 
                 raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
                 
-                service.users().messages().send(
-                    userId='me',
-                    body={'raw': raw_message}
-                ).execute()
+                await self._call(account_id, 'messages', 'send', body={'raw': raw_message})
                 
                 return True
             
@@ -566,18 +685,13 @@ class GmailService:
             Dict with historyId and expiration timestamp
         """
         try:
-            service = await self.get_service(account_id)
-            
             # Call users.watch()
             request_body = {
                 'topicName': topic_name,
                 'labelIds': ['INBOX']  # Watch inbox only
             }
             
-            result = service.users().watch(
-                userId='me',
-                body=request_body
-            ).execute()
+            result = await self._call(account_id, '', 'watch', body=request_body)
             
             return {
                 'historyId': result.get('historyId'),
@@ -587,43 +701,71 @@ class GmailService:
         except Exception as e:
             raise Exception(f"Failed to setup push notifications: {str(e)}")
     
-    async def get_history(self, account_id: int, start_history_id: str) -> List[str]:
-        """Get message history since historyId.
+    async def get_history(self, account_id: int, start_history_id: str) -> Tuple[List[str], Optional[str]]:
+        """Get message history since historyId, following every page.
         
         Args:
             account_id: Gmail account ID
             start_history_id: Starting history ID
             
         Returns:
-            List of new message IDs
+            Tuple of (new message IDs in order without duplicates, latest mailbox
+            historyId or None if start_history_id is too old)
         """
         try:
-            service = await self.get_service(account_id)
-            
-            # Call users.history.list()
-            result = service.users().history().list(
-                userId='me',
-                startHistoryId=start_history_id,
-                historyTypes=['messageAdded']
-            ).execute()
-            
-            # Extract message IDs
             message_ids = []
+            seen = set()
+            latest_history_id = None
+            page_token = None
+            
+            while True:
+                # Call users.history.list()
+                result = await self._call(
+                    account_id, 'history', 'list',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+                    pageToken=page_token
+                )
+                
+                # Extract message IDs
+                for history_item in result.get('history', []):
+                    for msg_added in history_item.get('messagesAdded', []):
+                        msg_id = msg_added['message']['id']
+                        if msg_id not in seen:
+                            seen.add(msg_id)
+                            message_ids.append(msg_id)
+                    self._apply_history_to_cache(account_id, history_item)
+                
+                latest_history_id = result.get('historyId', latest_history_id)
+                page_token = result.get('nextPageToken')
+                if not page_token:
+                    break
             
-            if 'history' in result:
-                for history_item in result['history']:
-                    if 'messagesAdded' in history_item:
-                        for msg_added in history_item['messagesAdded']:
-                            message_ids.append(msg_added['message']['id'])
-            
-            return message_ids
+            return message_ids, latest_history_id
             
         except Exception as e:
-            # If history ID is too old, return empty list
+            # If history ID is too old, there is nothing to catch up on
             if 'Not Found' in str(e) or '404' in str(e):
-                return []
+                return [], None
             raise Exception(f"Failed to get history: {str(e)}")
+    
+    def _apply_history_to_cache(self, account_id: int, history_item: Dict[str, Any]):
+        """Keep cached messages in sync with a history record."""
+        for deleted in history_item.get('messagesDeleted', []):
+            self.message_cache.invalidate(account_id, deleted['message']['id'])
+        
+        for key in ('labelsAdded', 'labelsRemoved'):
+            for change in history_item.get(key, []):
+                message = change['message']
+                if 'labelIds' in message:
+                    self.message_cache.set_labels(account_id, message['id'], message['labelIds'])
+                else:
+                    self.message_cache.invalidate(account_id, message['id'])
 
 
-# Global service instance
-gmail_service = GmailService()
+# Global service instance (GMAIL_BACKEND picks the transport)
+if config.GMAIL_BACKEND == 'aiohttp':
+    from gmail_async import AsyncGmailService
+    gmail_service = AsyncGmailService()
+else:
+    gmail_service = GmailService()
@@ -2,15 +2,15 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ChatMember
 from telegram.ext import ContextTypes
 from database import db
-from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown, format_button_text
+from gmail_service import gmail_service, LIST_HEADERS
+from formatter import format_button_text
+from render import to_tiny_caps, escape_markdown, header, field
+from keyboards import keyboards, label
 from utils import (
-    parse_email_headers, get_message_body, extract_otp,
-    truncate_text, format_timestamp, split_message
+    extract_message_otp, truncate_text, format_timestamp, split_message
 )
 from auto_delete import schedule_delete, DELETE_WARNING
 import config
-import asyncio
 
 
 class BotHandlers:
@@ -56,10 +56,9 @@ class BotHandlers:
             ]
             
             text = (
-                f"⚠️ *{to_tiny_caps('Join Required')}*\n"
-                f"`────────────────────────`\n\n"
-                f"Please join our channel to use this bot\\.\n\n"
-                f"After joining, click the button below\\."
+                header('⚠️', 'Join Required') +
+                "Please join our channel to use this bot\\.\n\n"
+                "After joining, click the button below\\."
             )
             
             if update.callback_query:
@@ -113,28 +112,6 @@ class BotHandlers:
         # Register user
         await db.add_user(user.id, user.username, user.first_name)
         
-        keyboard = [
-            [
-                InlineKeyboardButton(f"📧 {to_tiny_caps('My Accounts')}", callback_data="accounts"),
-                InlineKeyboardButton(f"➕ {to_tiny_caps('Add Account')}", callback_data="add_account")
-            ],
-            [
-                InlineKeyboardButton(f"📬 {to_tiny_caps('Inbox')}", callback_data="inbox"),
-                InlineKeyboardButton(f"✉️ {to_tiny_caps('Compose')}", callback_data="compose")
-            ],
-            [
-                InlineKeyboardButton(f"🔍 {to_tiny_caps('Search')}", callback_data="search"),
-                InlineKeyboardButton(f"📁 {to_tiny_caps('Folders')}", callback_data="folders")
-            ],
-            [
-                InlineKeyboardButton(f"🏷️ {to_tiny_caps('Labels')}", callback_data="labels"),
-                InlineKeyboardButton(f"⚙️ {to_tiny_caps('Settings')}", callback_data="settings")
-            ],
-            [
-                InlineKeyboardButton(f"ℹ️ {to_tiny_caps('Help')}", callback_data="help")
-            ]
-        ]
-        
         # Prepare text with proper escaping outside f-strings
         welcome_text = to_tiny_caps('Welcome to AutoXMail')
         secure_text = to_tiny_caps('Secure Multi-Account Gmail Client').replace('-', '\\-')
@@ -157,7 +134,7 @@ class BotHandlers:
         if update.message:
             msg = await update.message.reply_text(
                 message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards['main'],
                 parse_mode='MarkdownV2'
             )
             # Store message ID for future deletion
@@ -165,7 +142,7 @@ class BotHandlers:
         else:
             await update.callback_query.edit_message_text(
                 message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards['main'],
                 parse_mode='MarkdownV2'
             )
     
@@ -182,23 +159,17 @@ class BotHandlers:
         accounts = await db.get_gmail_accounts(user_id)
         
         if not accounts:
-            keyboard = [
-                [InlineKeyboardButton(f"➕ {to_tiny_caps('Add Account')}", callback_data="add_account")],
-                [InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")]
-            ]
-            
             await query.edit_message_text(
-                f"📧 *{to_tiny_caps('My Accounts')}*\n"
-                f"`────────────────────────`\n\n"
-                f"No accounts added yet\\.\n\n"
-                f"Add your first Gmail account to get started\\!",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                header('📧', 'My Accounts') +
+                "No accounts added yet\\.\n\n"
+                "Add your first Gmail account to get started\\!",
+                reply_markup=keyboards['no_accounts'],
                 parse_mode='MarkdownV2'
             )
             return
         
         keyboard = []
-        message = f"📧 *{to_tiny_caps('My Accounts')}*\n`────────────────────────`\n\n"
+        message = header('📧', 'My Accounts')
         
         for acc in accounts:
             message += f"• {escape_markdown(acc['email'])}\n"
@@ -213,13 +184,9 @@ class BotHandlers:
                 )
             ])
         
-        keyboard.append([InlineKeyboardButton(f"➕ {to_tiny_caps('Add Account')}", callback_data="add_account")])
-        keyboard.append([InlineKeyboardButton(f"🔙 {to_tiny_caps('Back to Menu')}", callback_data="start")])
-        keyboard.append([InlineKeyboardButton(f"🏠 {to_tiny_caps('Main Menu')}", callback_data="start")])
-        
         await query.edit_message_text(
             message,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards.markup(keyboard, 'add_account', 'back_to_menu', 'main_menu'),
             parse_mode='MarkdownV2'
         )
     
@@ -238,38 +205,20 @@ class BotHandlers:
         if not accounts:
             await query.edit_message_text(
                 f"❌ {escape_markdown('No accounts found. Add an account first!')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return
         
         # Show time range selector
-        keyboard = [
-            [
-                InlineKeyboardButton(f"⚡ {to_tiny_caps('1m')}", callback_data="inbox_time:1m"),
-                InlineKeyboardButton(f"🕐 {to_tiny_caps('5m')}", callback_data="inbox_time:5m"),
-                InlineKeyboardButton(f"🕐 {to_tiny_caps('30m')}", callback_data="inbox_time:30m")
-            ],
-            [
-                InlineKeyboardButton(f"📅 {to_tiny_caps('1h')}", callback_data="inbox_time:1h"),
-                InlineKeyboardButton(f"📅 {to_tiny_caps('6h')}", callback_data="inbox_time:6h"),
-                InlineKeyboardButton(f"📅 {to_tiny_caps('24h')}", callback_data="inbox_time:24h")
-            ],
-            [InlineKeyboardButton(f"🔍 {to_tiny_caps('Custom Search')}", callback_data="search")],
-            [InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")]
-        ]
-        
         text = (
-            f"📬 *{to_tiny_caps('Inbox')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Select time range:"
+            header('📬', 'Inbox') +
+            "Select time range:"
         )
         
         await query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards['inbox_range'],
             parse_mode='MarkdownV2'
         )
     
@@ -311,9 +260,7 @@ class BotHandlers:
             if not await db.check_rate_limit(user_id, 'inbox'):
                 await query.edit_message_text(
                     f"⚠️ {escape_markdown('Rate limit exceeded. Please wait a moment.')}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                    ]]),
+                    reply_markup=keyboards.back('start'),
                     parse_mode='MarkdownV2'
                 )
                 return
@@ -329,9 +276,7 @@ class BotHandlers:
             if not messages:
                 await query.edit_message_text(
                     f"📭 {escape_markdown(f'No emails in last {time_range}!')}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="inbox")
-                    ]]),
+                    reply_markup=keyboards.back('inbox'),
                     parse_mode='MarkdownV2'
                 )
                 return
@@ -339,14 +284,18 @@ class BotHandlers:
             keyboard = []
             text = f"📬 *{to_tiny_caps('Inbox')}* \\(Last {escape_markdown(time_range)}\\)\n`────────────────────────`\n\n"
             
-            for msg in messages[:10]:
-                msg_id = msg['id'] if isinstance(msg, dict) else msg
-                full_msg = await gmail_service.get_message(account_id, msg_id)
-                subject, sender, date = parse_email_headers(full_msg)
+            full_msgs = await gmail_service.get_parsed_messages_batch(
+                account_id,
+                [msg['id'] if isinstance(msg, dict) else msg for msg in messages[:10]],
+                format='metadata', headers=LIST_HEADERS
+            )
+            
+            for full_msg in full_msgs:
+                msg_id = full_msg.id
+                subject, sender = full_msg.subject, full_msg.sender
                 
                 # Check if unread
-                is_unread = 'UNREAD' in full_msg.get('labelIds', [])
-                icon = "🔵" if is_unread else "⚪"
+                icon = "🔵" if full_msg.is_unread else "⚪"
                 
                 text += f"{icon} {escape_markdown(truncate_text(subject, 40))}\n"
                 text += f"   From: {escape_markdown(truncate_text(sender, 30))}\n\n"
@@ -358,22 +307,18 @@ class BotHandlers:
                     )
                 ])
             
-            keyboard.append([InlineKeyboardButton(f"🔄 {to_tiny_caps('Refresh')}", callback_data=f"inbox_time:{time_range}")])
-            keyboard.append([InlineKeyboardButton(f"🔙 {to_tiny_caps('Back to Inbox')}", callback_data="inbox")])
-            keyboard.append([InlineKeyboardButton(f"🏠 {to_tiny_caps('Main Menu')}", callback_data="start")])
+            keyboard.append([InlineKeyboardButton(label('🔄', 'Refresh'), callback_data=f"inbox_time:{time_range}")])
             
             await query.edit_message_text(
                 text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards.markup(keyboard, 'back_to_inbox', 'main_menu'),
                 parse_mode='MarkdownV2'
             )
             
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Error: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
     
@@ -391,62 +336,32 @@ class BotHandlers:
         account_id = int(account_id)
         
         try:
-            message = await gmail_service.get_message(account_id, message_id)
+            message = await gmail_service.get_parsed_message(account_id, message_id)
             
-            subject, sender, date = parse_email_headers(message)
-            body = get_message_body(message['payload'])
-            otp = extract_otp(body)
+            subject, sender, date = message.subject, message.sender, message.date
+            body = message.body(500)
+            otp = extract_message_otp(message, key=(account_id, message_id))
             
-            text = f"📧 *{to_tiny_caps('Message')}*\n`────────────────────────`\n\n"
-            text += f"*{to_tiny_caps('Subject')}:* {escape_markdown(subject)}\n"
-            text += f"*{to_tiny_caps('From')}:* {escape_markdown(sender)}\n"
-            text += f"*{to_tiny_caps('Date')}:* {escape_markdown(format_timestamp(date))}\n\n"
+            text = header('📧', 'Message')
+            text += f"{field('Subject')} {escape_markdown(subject)}\n"
+            text += f"{field('From')} {escape_markdown(sender)}\n"
+            text += f"{field('Date')} {escape_markdown(format_timestamp(date))}\n\n"
             
             if otp:
-                text += f"🔑 *{to_tiny_caps('OTP')}:* `{otp}`\n\n"
-            
-            text += f"*{to_tiny_caps('Preview')}:*\n{escape_markdown(truncate_text(body, 500))}\n"
+                text += f"🔑 {field('OTP')} `{otp}`\n\n"
             
-            # Action buttons
-            is_unread = 'UNREAD' in message.get('labelIds', [])
-            
-            keyboard = [
-                [
-                    InlineKeyboardButton(f"↩️ {to_tiny_caps('Reply')}", callback_data=f"email:reply:{account_id}:{message_id}"),
-                    InlineKeyboardButton(f"↪️ {to_tiny_caps('Forward')}", callback_data=f"email:forward:{account_id}:{message_id}")
-                ],
-                [
-                    InlineKeyboardButton(
-                        f"✅ {to_tiny_caps('Mark Read')}" if is_unread else f"📧 {to_tiny_caps('Mark Unread')}",
-                        callback_data=f"mark_read:{account_id}:{message_id}" if is_unread 
-                                    else f"mark_unread:{account_id}:{message_id}"
-                    ),
-                    InlineKeyboardButton(f"🗑️ {to_tiny_caps('Delete')}", callback_data=f"delete:{account_id}:{message_id}")
-                ],
-                [
-                    InlineKeyboardButton(f"📄 {to_tiny_caps('Full Email')}", callback_data=f"email:full:{account_id}:{message_id}:1"),
-                    InlineKeyboardButton(f"🚫 {to_tiny_caps('Unsubscribe')}", callback_data=f"email:unsub:{account_id}:{message_id}")
-                ],
-                [
-                    InlineKeyboardButton(f"⚠️ {to_tiny_caps('Spam')}", callback_data=f"spam:{account_id}:{message_id}"),
-                    InlineKeyboardButton(f"⭐ {to_tiny_caps('Star')}", callback_data=f"star:{account_id}:{message_id}")
-                ],
-                [InlineKeyboardButton(f"🔙 {to_tiny_caps('Back to Inbox')}", callback_data="inbox")],
-                [InlineKeyboardButton(f"🏠 {to_tiny_caps('Main Menu')}", callback_data="start")]
-            ]
+            text += f"{field('Preview')}\n{escape_markdown(truncate_text(body, 500))}\n"
             
             await query.edit_message_text(
                 text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards.message_actions(account_id, message_id, message.is_unread),
                 parse_mode='MarkdownV2'
             )
             
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Error: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="inbox")
-                ]]),
+                reply_markup=keyboards.back('inbox'),
                 parse_mode='MarkdownV2'
             )
     
@@ -499,9 +414,8 @@ class BotHandlers:
         ]
         
         await query.edit_message_text(
-            f"🗑️ *{to_tiny_caps('Delete Message')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Are you sure you want to move this message to trash?",
+            header('🗑️', 'Delete Message') +
+            "Are you sure you want to move this message to trash?",
             reply_markup=InlineKeyboardMarkup(keyboard),
             parse_mode='MarkdownV2'
         )
@@ -530,9 +444,8 @@ class BotHandlers:
             await query.answer()
         
         text = (
-            f"ℹ️ *{to_tiny_caps('AutoXMail Help')}*\n"
-            f"`────────────────────────`\n\n"
-            f"*{to_tiny_caps('Features')}:*\n"
+            header('ℹ️', 'AutoXMail Help') +
+            f"{field('Features')}\n"
             f"• Multi\\-account Gmail support\n"
             f"• Browse inbox, sent, labels\n"
             f"• Search messages\n"
@@ -540,30 +453,28 @@ class BotHandlers:
             f"• Delete \\& spam management\n"
             f"• Label management\n"
             f"• Push notifications\n\n"
-            f"*{to_tiny_caps('Commands')}:*\n"
+            f"{field('Commands')}\n"
             f"/start \\- Main menu\n"
             f"/help \\- This help message\n\n"
-            f"*{to_tiny_caps('Security')}:*\n"
+            f"{field('Security')}\n"
             f"• End\\-to\\-end encryption\n"
             f"• Per\\-user credential isolation\n"
             f"• Rate limiting\n"
             f"• Session timeout\n\n"
-            f"*{to_tiny_caps('Support')}:*\n"
+            f"{field('Support')}\n"
             f"GitHub: github\\.com/NanoToolz/AutoXMail\\_Bot"
         )
         
-        keyboard = [[InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")]]
-        
         if query:
             await query.edit_message_text(
                 text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards['help'],
                 parse_mode='MarkdownV2'
             )
         else:
             await update.message.reply_text(
                 text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards['help'],
                 parse_mode='MarkdownV2'
             )
     
@@ -584,50 +495,16 @@ class BotHandlers:
         promo_filter = "✅ Yes" if settings.get('exclude_promotions') else "❌ No"
         
         text = (
-            f"⚙️ *{to_tiny_caps('Settings')}*\n"
-            f"`────────────────────────`\n\n"
-            f"*{to_tiny_caps('Notifications')}:* {escape_markdown(notif_status)}\n"
-            f"*{to_tiny_caps('Filter Spam')}:* {escape_markdown(spam_filter)}\n"
-            f"*{to_tiny_caps('Filter Promotions')}:* {escape_markdown(promo_filter)}\n\n"
+            header('⚙️', 'Settings') +
+            f"{field('Notifications')} {escape_markdown(notif_status)}\n"
+            f"{field('Filter Spam')} {escape_markdown(spam_filter)}\n"
+            f"{field('Filter Promotions')} {escape_markdown(promo_filter)}\n\n"
             f"Configure your preferences below:"
         )
         
-        keyboard = [
-            [InlineKeyboardButton(
-                f"🔔 {to_tiny_caps('Toggle Notifications')}",
-                callback_data="toggle_notifications"
-            )],
-            [InlineKeyboardButton(
-                f"🚫 {to_tiny_caps('Toggle Spam Filter')}",
-                callback_data="toggle_spam_filter"
-            )],
-            [InlineKeyboardButton(
-                f"📢 {to_tiny_caps('Toggle Promo Filter')}",
-                callback_data="toggle_promo_filter"
-            )],
-            [InlineKeyboardButton(
-                f"🚫 {to_tiny_caps('Blocklist')}",
-                callback_data="blocklist"
-            )],
-            [InlineKeyboardButton(
-                f"⭐ {to_tiny_caps('VIP Senders')}",
-                callback_data="vip_senders"
-            )],
-            [InlineKeyboardButton(
-                f"🔒 {to_tiny_caps('Privacy')}",
-                callback_data="privacy_settings"
-            )],
-            [InlineKeyboardButton(
-                f"🤖 {to_tiny_caps('Bot Settings')}",
-                callback_data="bot_settings"
-            )],
-            [InlineKeyboardButton(f"🔙 {to_tiny_caps('Back to Menu')}", callback_data="start")],
-            [InlineKeyboardButton(f"🏠 {to_tiny_caps('Main Menu')}", callback_data="start")]
-        ]
-        
         await query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards['settings'],
             parse_mode='MarkdownV2'
         )
     
@@ -739,25 +616,15 @@ class BotHandlers:
         context.user_data['active_account_id'] = account_id
         
         # Show account menu
-        keyboard = [
-            [InlineKeyboardButton(f"📥 {to_tiny_caps('Inbox')}", callback_data=f"inbox")],
-            [InlineKeyboardButton(f"✉️ {to_tiny_caps('Compose')}", callback_data=f"compose")],
-            [InlineKeyboardButton(f"🔍 {to_tiny_caps('Search')}", callback_data=f"search")],
-            [InlineKeyboardButton(f"🏷️ {to_tiny_caps('Labels')}", callback_data=f"labels")],
-            [InlineKeyboardButton(f"📁 {to_tiny_caps('Folders')}", callback_data=f"folders")],
-            [InlineKeyboardButton(f"🔙 {to_tiny_caps('Back to Accounts')}", callback_data="accounts")]
-        ]
-        
         text = (
-            f"✅ *{to_tiny_caps('Account Selected')}*\n"
-            f"`────────────────────────`\n\n"
+            header('✅', 'Account Selected') +
             f"📧 {escape_markdown(account['email'])}\n\n"
             f"What would you like to do?"
         )
         
         await query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards['account'],
             parse_mode='MarkdownV2'
         )
 
@@ -774,27 +641,24 @@ class BotHandlers:
             pass
         
         # Send warning
-        keyboard = [[InlineKeyboardButton(f"🏠 {to_tiny_caps('Main Menu')}", callback_data="start")]]
-        
         text = (
-            f"⚠️ *{to_tiny_caps('Unknown Input')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Please use the buttons below\\."
+            header('⚠️', 'Unknown Input') +
+            "Please use the buttons below\\."
         )
         
         msg = await update.message.reply_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards['unknown'],
             parse_mode='MarkdownV2'
         )
         
         # Auto-delete warning after 5 seconds
-        asyncio.create_task(schedule_delete(
+        await schedule_delete(
             context.bot,
             update.effective_chat.id,
             msg.message_id,
             DELETE_WARNING
-        ))
+        )
 
 
 # Global handlers instance
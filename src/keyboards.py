@@ -0,0 +1,265 @@
+"""Prebuilt inline keyboards.
+
+python-telegram-bot freezes InlineKeyboardButton and InlineKeyboardMarkup
+after construction, so one instance can be shared by every reply. Static
+menus are built once when the registry is created; dynamic keyboards
+(account lists, message lists, per-message actions) are assembled from
+the same cached buttons and rows.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from render import to_tiny_caps
+
+# name -> (emoji, label, callback_data) for buttons with fixed callback data
+BUTTONS: Dict[str, Tuple[str, str, str]] = {
+    # Main menu
+    'accounts': ('📧', 'My Accounts', 'accounts'),
+    'add_account': ('➕', 'Add Account', 'add_account'),
+    'inbox': ('📬', 'Inbox', 'inbox'),
+    'compose': ('✉️', 'Compose', 'compose'),
+    'search': ('🔍', 'Search', 'search'),
+    'folders': ('📁', 'Folders', 'folders'),
+    'labels': ('🏷️', 'Labels', 'labels'),
+    'settings': ('⚙️', 'Settings', 'settings'),
+    'help': ('ℹ️', 'Help', 'help'),
+
+    # Navigation
+    'main_menu': ('🏠', 'Main Menu', 'start'),
+    'back_to_menu': ('🔙', 'Back to Menu', 'start'),
+    'back_to_inbox': ('🔙', 'Back to Inbox', 'inbox'),
+    'back_to_folders': ('🔙', 'Back to Folders', 'folders'),
+    'back_to_labels': ('🔙', 'Back to Labels', 'labels'),
+    'back_to_accounts': ('🔙', 'Back to Accounts', 'accounts'),
+
+    # Inbox time range
+    'inbox_1m': ('⚡', '1m', 'inbox_time:1m'),
+    'inbox_5m': ('🕐', '5m', 'inbox_time:5m'),
+    'inbox_30m': ('🕐', '30m', 'inbox_time:30m'),
+    'inbox_1h': ('📅', '1h', 'inbox_time:1h'),
+    'inbox_6h': ('📅', '6h', 'inbox_time:6h'),
+    'inbox_24h': ('📅', '24h', 'inbox_time:24h'),
+    'custom_search': ('🔍', 'Custom Search', 'search'),
+
+    # Account menu
+    'account_inbox': ('📥', 'Inbox', 'inbox'),
+    'account_compose': ('✉️', 'Compose', 'compose'),
+    'account_search': ('🔍', 'Search', 'search'),
+    'account_labels': ('🏷️', 'Labels', 'labels'),
+    'account_folders': ('📁', 'Folders', 'folders'),
+
+    # Settings
+    'toggle_notifications': ('🔔', 'Toggle Notifications', 'toggle_notifications'),
+    'toggle_spam_filter': ('🚫', 'Toggle Spam Filter', 'toggle_spam_filter'),
+    'toggle_promo_filter': ('📢', 'Toggle Promo Filter', 'toggle_promo_filter'),
+    'blocklist': ('🚫', 'Blocklist', 'blocklist'),
+    'vip_senders': ('⭐', 'VIP Senders', 'vip_senders'),
+    'privacy': ('🔒', 'Privacy', 'privacy_settings'),
+    'bot_settings': ('🤖', 'Bot Settings', 'bot_settings'),
+    'change_photo': ('🖼️', 'Change Profile Pic', 'bot_change_photo'),
+
+    # Labels
+    'create_label': ('➕', 'Create New Label', 'label_create'),
+    'labels_menu': ('🏷️', 'Back to Labels', 'labels'),
+}
+
+# name -> rows of button names; "back:<callback_data>" is a plain Back button
+MENUS: Dict[str, List[List[str]]] = {
+    'main': [
+        ['accounts', 'add_account'],
+        ['inbox', 'compose'],
+        ['search', 'folders'],
+        ['labels', 'settings'],
+        ['help'],
+    ],
+    'help': [['back:start']],
+    'unknown': [['main_menu']],
+    'no_accounts': [['add_account'], ['back:start']],
+    'inbox_range': [
+        ['inbox_1m', 'inbox_5m', 'inbox_30m'],
+        ['inbox_1h', 'inbox_6h', 'inbox_24h'],
+        ['custom_search'],
+        ['back:start'],
+    ],
+    'account': [
+        ['account_inbox'], ['account_compose'], ['account_search'],
+        ['account_labels'], ['account_folders'], ['back_to_accounts'],
+    ],
+    'settings': [
+        ['toggle_notifications'], ['toggle_spam_filter'], ['toggle_promo_filter'],
+        ['blocklist'], ['vip_senders'], ['privacy'], ['bot_settings'],
+        ['back_to_menu'], ['main_menu'],
+    ],
+    'bot_settings': [['change_photo'], ['back:settings']],
+    'labels_done': [['labels_menu']],
+}
+
+# Auto-delete timer choices: (label, seconds)
+TIMER_OPTIONS = [
+    ("❌ ᴏғғ", 0),
+    ("⚡ 30s", 30),
+    ("🕐 1ᴍ", 60),
+    ("🕐 5ᴍ", 300),
+    ("📅 30ᴍ", 1800),
+    ("📅 1ʜ", 3600),
+    ("📅 24ʜ", 86400),
+]
+
+# Dynamic keyboards kept per registry
+TIMER_MENU_CACHE_SIZE = 1024
+MESSAGE_ACTIONS_CACHE_SIZE = 256
+
+Row = Tuple[InlineKeyboardButton, ...]
+
+
+@lru_cache(maxsize=512)
+def label(emoji: str, text: str) -> str:
+    """Button text "<emoji> <Text in tiny caps>"."""
+    return f"{emoji} {to_tiny_caps(text)}"
+
+
+class KeyboardRegistry:
+    """Static menus and cached button fragments."""
+
+    def __init__(self):
+        self._buttons: Dict[str, InlineKeyboardButton] = {
+            name: InlineKeyboardButton(label(emoji, text), callback_data=data)
+            for name, (emoji, text, data) in BUTTONS.items()
+        }
+        self._rows: Dict[Tuple[str, ...], Tuple[Row, ...]] = {}
+        self._back: Dict[str, InlineKeyboardMarkup] = {}
+        self._timers: OrderedDict = OrderedDict()
+        self._actions: OrderedDict = OrderedDict()
+        self._menus: Dict[str, InlineKeyboardMarkup] = {
+            name: InlineKeyboardMarkup(tuple(tuple(self.button(item) for item in row) for row in rows))
+            for name, rows in MENUS.items()
+        }
+        # Global privacy timer menu, one variant per current selection
+        for _, secs in TIMER_OPTIONS:
+            self.timer_menu('privacy_timer', secs, 'settings')
+
+    def __getitem__(self, name: str) -> InlineKeyboardMarkup:
+        """Static menu by name (see MENUS)."""
+        return self._menus[name]
+
+    def button(self, name: str) -> InlineKeyboardButton:
+        """Registered button by name; "back:<callback_data>" for a Back button."""
+        button = self._buttons.get(name)
+        if button is None:
+            if not name.startswith('back:'):
+                raise KeyError(name)
+            button = InlineKeyboardButton(label('🔙', 'Back'), callback_data=name[5:])
+            self._buttons[name] = button
+        return button
+
+    def rows(self, *names: str) -> Tuple[Row, ...]:
+        """One-button rows for the given names, e.g. a navigation footer.
+
+        Returns:
+            Tuple of rows, ready for list.extend() on a dynamic keyboard
+        """
+        rows = self._rows.get(names)
+        if rows is None:
+            rows = tuple((self.button(name),) for name in names)
+            self._rows[names] = rows
+        return rows
+
+    def back(self, callback_data: str = 'start') -> InlineKeyboardMarkup:
+        """Single Back button returning to callback_data."""
+        markup = self._back.get(callback_data)
+        if markup is None:
+            markup = InlineKeyboardMarkup(self.rows(f'back:{callback_data}'))
+            self._back[callback_data] = markup
+        return markup
+
+    def markup(self, rows: Sequence[Sequence[InlineKeyboardButton]],
+               *footer: str) -> InlineKeyboardMarkup:
+        """Dynamic keyboard: rows followed by cached footer rows.
+
+        Args:
+            rows: Per-request rows (accounts, messages, labels)
+            footer: Registered button names, one per row
+
+        Returns:
+            Inline keyboard markup
+        """
+        return InlineKeyboardMarkup(tuple(rows) + self.rows(*footer))
+
+    def timer_menu(self, prefix: str, current: int, back: str) -> InlineKeyboardMarkup:
+        """Auto-delete timer picker, two choices per row, current one ticked.
+
+        Args:
+            prefix: Callback data prefix; each choice sends "<prefix>:<secs>"
+            current: Currently selected seconds
+            back: Callback data of the Back button
+
+        Returns:
+            Inline keyboard markup
+        """
+        key = (prefix, current, back)
+        markup = self._cached(self._timers, key)
+        if markup is None:
+            buttons = [
+                InlineKeyboardButton(f"✅ {text}" if secs == current else text,
+                                     callback_data=f"{prefix}:{secs}")
+                for text, secs in TIMER_OPTIONS
+            ]
+            rows = tuple(tuple(buttons[i:i + 2]) for i in range(0, len(buttons), 2))
+            markup = InlineKeyboardMarkup(rows + self.rows(f'back:{back}'))
+            self._store(self._timers, key, markup, TIMER_MENU_CACHE_SIZE)
+        return markup
+
+    def message_actions(self, account_id: int, message_id: str,
+                        is_unread: bool) -> InlineKeyboardMarkup:
+        """Action keyboard under a single message.
+
+        Cached per message: mark read/unread and a cancelled delete render
+        the same message again.
+        """
+        key = (account_id, message_id, is_unread)
+        markup = self._cached(self._actions, key)
+        if markup is None:
+            markup = self._build_message_actions(account_id, message_id, is_unread)
+            self._store(self._actions, key, markup, MESSAGE_ACTIONS_CACHE_SIZE)
+        return markup
+
+    def _build_message_actions(self, account_id: int, message_id: str,
+                               is_unread: bool) -> InlineKeyboardMarkup:
+        """Build the action keyboard of a message."""
+        ref = f"{account_id}:{message_id}"
+        if is_unread:
+            toggle = InlineKeyboardButton(label('✅', 'Mark Read'), callback_data=f"mark_read:{ref}")
+        else:
+            toggle = InlineKeyboardButton(label('📧', 'Mark Unread'), callback_data=f"mark_unread:{ref}")
+        return self.markup((
+            (InlineKeyboardButton(label('↩️', 'Reply'), callback_data=f"email:reply:{ref}"),
+             InlineKeyboardButton(label('↪️', 'Forward'), callback_data=f"email:forward:{ref}")),
+            (toggle,
+             InlineKeyboardButton(label('🗑️', 'Delete'), callback_data=f"delete:{ref}")),
+            (InlineKeyboardButton(label('📄', 'Full Email'), callback_data=f"email:full:{ref}:1"),
+             InlineKeyboardButton(label('🚫', 'Unsubscribe'), callback_data=f"email:unsub:{ref}")),
+            (InlineKeyboardButton(label('⚠️', 'Spam'), callback_data=f"spam:{ref}"),
+             InlineKeyboardButton(label('⭐', 'Star'), callback_data=f"star:{ref}")),
+        ), 'back_to_inbox', 'main_menu')
+
+    @staticmethod
+    def _cached(cache: OrderedDict, key: Hashable):
+        """Get a cached keyboard (marked most recently used) or None."""
+        markup = cache.get(key)
+        if markup is not None:
+            cache.move_to_end(key)
+        return markup
+
+    @staticmethod
+    def _store(cache: OrderedDict, key: Hashable, markup: InlineKeyboardMarkup, max_size: int):
+        """Cache a keyboard, evicting the least recently used one if full."""
+        cache[key] = markup
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+# Global instance
+keyboards = KeyboardRegistry()
@@ -2,10 +2,10 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from database import db
-from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown
-from utils import parse_email_headers, truncate_text
-import asyncio
+from gmail_service import gmail_service, LIST_HEADERS
+from render import to_tiny_caps, escape_markdown, header, app_header, field
+from keyboards import keyboards
+from utils import truncate_text
 from auto_delete import schedule_delete, DELETE_SUCCESS
 
 # States
@@ -26,9 +26,7 @@ class LabelsHandler:
         if not accounts:
             await query.edit_message_text(
                 f"❌ {escape_markdown('No accounts found. Add an account first!')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return
@@ -46,20 +44,14 @@ class LabelsHandler:
                 callback_data=f"labels_account:{acc['id']}"
             )])
         
-        keyboard.append([InlineKeyboardButton(
-            f"🔙 {to_tiny_caps('Back')}",
-            callback_data="start"
-        )])
-        
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Labels')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Select account:"
+            app_header('Labels') +
+            "Select account:"
         )
         
         await query.edit_message_text(
             text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboards.markup(keyboard, 'back:start'),
             parse_mode='MarkdownV2'
         )
     
@@ -92,14 +84,11 @@ class LabelsHandler:
             ]]
             
             keyboard = []
-            text = (
-                f"🏷️ *{to_tiny_caps('Labels')}*\n"
-                f"`────────────────────────`\n\n"
-            )
+            text = header('🏷️', 'Labels')
             
             # System labels
             if system_labels:
-                text += f"*{to_tiny_caps('System Labels')}:*\n"
+                text += f"{field('System Labels')}\n"
                 for label in system_labels:
                     name = label['name']
                     total = label.get('messagesTotal', 0)
@@ -115,7 +104,7 @@ class LabelsHandler:
             
             # User labels
             if user_labels:
-                text += f"*{to_tiny_caps('Custom Labels')}:*\n"
+                text += f"{field('Custom Labels')}\n"
                 for label in user_labels:
                     name = label['name']
                     total = label.get('messagesTotal', 0)
@@ -135,29 +124,18 @@ class LabelsHandler:
                 text += "\n"
             
             # Create new label button
-            keyboard.append([InlineKeyboardButton(
-                f"➕ {to_tiny_caps('Create New Label')}",
-                callback_data="label_create"
-            )])
-            keyboard.append([InlineKeyboardButton(
-                f"🔙 {to_tiny_caps('Back to Menu')}",
-                callback_data="start"
-            )])
-            keyboard.append([InlineKeyboardButton(
-                f"🏠 {to_tiny_caps('Main Menu')}",
-                callback_data="start"
-            )])
+            reply_markup = keyboards.markup(keyboard, 'create_label', 'back_to_menu', 'main_menu')
             
             if query:
                 await query.edit_message_text(
                     text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=reply_markup,
                     parse_mode='MarkdownV2'
                 )
             else:
                 await update.message.reply_text(
                     text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=reply_markup,
                     parse_mode='MarkdownV2'
                 )
             
@@ -166,9 +144,7 @@ class LabelsHandler:
             if query:
                 await query.edit_message_text(
                     error_text,
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                    ]]),
+                    reply_markup=keyboards.back('start'),
                     parse_mode='MarkdownV2'
                 )
             else:
@@ -190,55 +166,42 @@ class LabelsHandler:
             if not messages:
                 await query.edit_message_text(
                     f"📭 {escape_markdown('No emails with this label.')}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="labels")
-                    ]]),
+                    reply_markup=keyboards.back('labels'),
                     parse_mode='MarkdownV2'
                 )
                 return
             
             keyboard = []
-            text = (
-                f"🏷️ *{to_tiny_caps('Label Emails')}*\n"
-                f"`────────────────────────`\n\n"
+            text = header('🏷️', 'Label Emails')
+            
+            full_msgs = await gmail_service.get_parsed_messages_batch(
+                account_id, [msg['id'] for msg in messages[:10]],
+                format='metadata', headers=LIST_HEADERS
             )
             
-            for msg in messages[:10]:
-                full_msg = await gmail_service.get_message(account_id, msg['id'])
-                subject, sender, date = parse_email_headers(full_msg)
+            for full_msg in full_msgs:
+                subject, sender = full_msg.subject, full_msg.sender
                 
-                is_unread = 'UNREAD' in full_msg.get('labelIds', [])
-                icon = "🔵" if is_unread else "⚪"
+                icon = "🔵" if full_msg.is_unread else "⚪"
                 
                 text += f"{icon} {escape_markdown(truncate_text(subject, 40))}\n"
                 text += f"   From: {escape_markdown(truncate_text(sender, 30))}\n\n"
                 
                 keyboard.append([InlineKeyboardButton(
                     f"{icon} {truncate_text(subject, 35)}",
-                    callback_data=f"view_msg:{account_id}:{msg['id']}"
+                    callback_data=f"view_msg:{account_id}:{full_msg.id}"
                 )])
             
-            keyboard.append([InlineKeyboardButton(
-                f"🔙 {to_tiny_caps('Back to Labels')}",
-                callback_data="labels"
-            )])
-            keyboard.append([InlineKeyboardButton(
-                f"🏠 {to_tiny_caps('Main Menu')}",
-                callback_data="start"
-            )])
-            
             await query.edit_message_text(
                 text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboards.markup(keyboard, 'back_to_labels', 'main_menu'),
                 parse_mode='MarkdownV2'
             )
             
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Error: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="labels")
-                ]]),
+                reply_markup=keyboards.back('labels'),
                 parse_mode='MarkdownV2'
             )
     
@@ -263,10 +226,9 @@ class LabelsHandler:
         ]
         
         await query.edit_message_text(
-            f"🗑️ *{to_tiny_caps('Delete Label')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Are you sure you want to delete this label?\n\n"
-            f"⚠️ This action cannot be undone\\.",
+            header('🗑️', 'Delete Label') +
+            "Are you sure you want to delete this label?\n\n"
+            "⚠️ This action cannot be undone\\.",
             reply_markup=InlineKeyboardMarkup(keyboard),
             parse_mode='MarkdownV2'
         )
@@ -280,37 +242,31 @@ class LabelsHandler:
         account_id = int(account_id)
         
         try:
-            service = await gmail_service.get_service(account_id)
-            service.users().labels().delete(userId='me', id=label_id).execute()
+            await gmail_service.delete_label(account_id, label_id)
             
             text = (
-                f"✅ *{to_tiny_caps('Label Deleted')}*\n"
-                f"`────────────────────────`\n\n"
-                f"Label has been deleted successfully\\."
+                header('✅', 'Label Deleted') +
+                "Label has been deleted successfully\\."
             )
             
             msg = await query.edit_message_text(
                 text,
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🏷️ {to_tiny_caps('Back to Labels')}", callback_data="labels")
-                ]]),
+                reply_markup=keyboards['labels_done'],
                 parse_mode='MarkdownV2'
             )
             
             # Auto-delete success message
-            asyncio.create_task(schedule_delete(
+            await schedule_delete(
                 context.bot,
                 update.effective_chat.id,
                 msg.message_id,
                 DELETE_SUCCESS
-            ))
+            )
             
         except Exception as e:
             await query.edit_message_text(
                 f"❌ {escape_markdown(f'Failed to delete: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="labels")
-                ]]),
+                reply_markup=keyboards.back('labels'),
                 parse_mode='MarkdownV2'
             )
     
@@ -322,9 +278,8 @@ class LabelsHandler:
         context.user_data['waiting_for'] = 'label_name'
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Create Label')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Enter label name:"
+            app_header('Create Label') +
+            "Enter label name:"
         )
         
         keyboard = [[InlineKeyboardButton(
@@ -349,36 +304,26 @@ class LabelsHandler:
         try:
             await update.message.reply_text("⏳ Creating label...")
             
-            service = await gmail_service.get_service(account_id)
-            label_object = {
-                'name': label_name,
-                'labelListVisibility': 'labelShow',
-                'messageListVisibility': 'show'
-            }
-            
-            service.users().labels().create(userId='me', body=label_object).execute()
+            await gmail_service.create_label(account_id, label_name)
             
             text = (
-                f"✅ *{to_tiny_caps('Label Created')}*\n"
-                f"`────────────────────────`\n\n"
+                header('✅', 'Label Created') +
                 f"Label '{escape_markdown(label_name)}' created successfully\\."
             )
             
             msg = await update.message.reply_text(
                 text,
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🏷️ {to_tiny_caps('Back to Labels')}", callback_data="labels")
-                ]]),
+                reply_markup=keyboards['labels_done'],
                 parse_mode='MarkdownV2'
             )
             
             # Auto-delete success message
-            asyncio.create_task(schedule_delete(
+            await schedule_delete(
                 context.bot,
                 update.effective_chat.id,
                 msg.message_id,
                 DELETE_SUCCESS
-            ))
+            )
             
             context.user_data.pop('waiting_for', None)
             
@@ -7,7 +7,6 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 import asyncio
 import logging
-import aiosqlite
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -21,6 +20,11 @@ from telegram.ext import (
 import config
 from database import db
 from gmail_service import gmail_service
+from gmail_executor import gmail_executor
+from token_manager import credential_manager
+from send_scheduler import send_scheduler
+from broadcast import broadcast_manager
+from auto_delete import delete_scheduler
 from handlers import handlers
 from oauth_handler import oauth_handler
 from email_handlers import email_handlers, SELECT_FROM, ENTER_TO, ENTER_SUBJECT, ENTER_BODY, CONFIRM
@@ -29,7 +33,9 @@ from admin_handler import admin_handler
 from labels_handler import labels_handler
 from folders_handler import folders_handler
 from advanced_handlers import advanced_handlers
+import push_service
 from push_service import PushService
+import crypto
 
 # Setup logging
 logging.basicConfig(
@@ -47,6 +53,7 @@ async def post_init(application: Application):
     """Initialize database and set bot commands after bot starts."""
     logger.info("Initializing database...")
     await db.init_db()
+    await db.load_account_index()
     logger.info("Database initialized")
     
     # Set bot commands
@@ -84,13 +91,12 @@ async def post_init(application: Application):
     # Notify admin on startup
     try:
         from datetime import datetime
-        from formatter import to_tiny_caps, escape_markdown
+        from render import to_tiny_caps, header
         startup_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         await application.bot.send_message(
             chat_id=config.ADMIN_CHAT_ID,
             text=(
-                f"✅ *{to_tiny_caps('Bot Started Successfully')}*\n"
-                f"`────────────────────────`\n\n"
+                header('✅', 'Bot Started Successfully') +
                 f"🕐 {to_tiny_caps('Time')}: `{startup_time}`\n"
                 f"🤖 {to_tiny_caps('Status')}: {to_tiny_caps('Running')}\n"
                 f"📊 {to_tiny_caps('Ready to serve users')}"
@@ -104,13 +110,45 @@ async def post_init(application: Application):
     # Start webhook server if configured
     if config.WEBHOOK_URL:
         logger.info("Starting webhook server...")
-        push_service = PushService(application.bot)
-        asyncio.create_task(push_service.start_server())
+        push_service.push_service = PushService(application.bot)
+        asyncio.create_task(push_service.push_service.start_server())
         logger.info("Webhook server started")
     
     # Start push renewal background task
     asyncio.create_task(renew_push_subscriptions())
     logger.info("Push renewal task started")
+    
+    # Re-encrypt legacy (v1) account blobs in the background
+    asyncio.create_task(migrate_encryption())
+    
+    # Refresh OAuth tokens ahead of expiry
+    await credential_manager.start()
+    
+    # Reload pending auto-deletions and start the delete driver
+    await delete_scheduler.start(application.bot)
+    
+    # Resume broadcasts interrupted by a restart
+    await broadcast_manager.resume(application.bot)
+
+
+async def post_stop(application: Application):
+    """Stop push ingestion and drain queued notifications.
+    
+    Runs before the application shuts the bot down, so notifications
+    sent during the drain still go out and can schedule auto-deletes.
+    """
+    if push_service.push_service is not None:
+        await push_service.push_service.stop_server()
+
+
+async def post_shutdown(application: Application):
+    """Release background resources when the bot stops."""
+    await broadcast_manager.stop()
+    await delete_scheduler.stop()
+    await credential_manager.stop()
+    await gmail_service.close()
+    gmail_executor.shutdown()
+    await db.close()
 
 
 async def renew_push_subscriptions():
@@ -123,8 +161,7 @@ async def renew_push_subscriptions():
             logger.info("Renewing push subscriptions...")
             
             # Get all active accounts
-            async with aiosqlite.connect(db.db_path) as conn:
-                conn.row_factory = aiosqlite.Row
+            async with db.read() as conn:
                 cursor = await conn.execute(
                     "SELECT id, email, user_id FROM gmail_accounts WHERE is_active = 1"
                 )
@@ -141,13 +178,9 @@ async def renew_push_subscriptions():
                         topic_name = f"projects/{config.GCP_PROJECT_ID}/topics/gmail-push"
                         result = await gmail_service.setup_push(account_id, topic_name)
                         
-                        # Update history ID
-                        async with aiosqlite.connect(db.db_path) as conn:
-                            await conn.execute(
-                                "UPDATE gmail_accounts SET last_history_id = ? WHERE id = ?",
-                                (result['historyId'], account_id)
-                            )
-                            await conn.commit()
+                        # Seed history ID; an existing one is left to the
+                        # push sync so unprocessed changes are not skipped
+                        await db.init_history_id(account_id, result['historyId'])
                         
                         logger.info(f"Push renewed for {email}")
                     
@@ -163,6 +196,45 @@ async def renew_push_subscriptions():
             await asyncio.sleep(3600)  # Wait 1 hour before retry
 
 
+async def migrate_encryption():
+    """Re-encrypt legacy v1 credentials/tokens as v2 envelopes."""
+    try:
+        accounts = await db.get_encrypted_accounts()
+        migrated = 0
+        
+        for account in accounts:
+            if not (crypto.needs_migration(account['credentials_enc']) or
+                    crypto.needs_migration(account['token_enc'])):
+                continue
+            
+            try:
+                # PBKDF2 is CPU-bound, keep it off the event loop
+                credentials_enc = await asyncio.to_thread(
+                    crypto.migrate_blob, account['credentials_enc'],
+                    account['user_id'], crypto.PURPOSE_CREDENTIALS
+                )
+                token_enc = account['token_enc']
+                if token_enc:
+                    token_enc = await asyncio.to_thread(
+                        crypto.migrate_blob, token_enc,
+                        account['user_id'], crypto.PURPOSE_TOKEN
+                    )
+                # Skip rows that changed meanwhile (e.g. a token refresh);
+                # they were written as v2 already
+                if await db.update_encrypted_blobs(
+                        account['id'], account['credentials_enc'], account['token_enc'],
+                        credentials_enc, token_enc):
+                    migrated += 1
+            except Exception as e:
+                logger.error(f"Encryption migration failed for account {account['id']}: {e}")
+        
+        if migrated:
+            logger.info(f"Migrated {migrated} account(s) to v2 encryption")
+    
+    except Exception as e:
+        logger.error(f"Encryption migration error: {e}")
+
+
 async def error_handler(update: Update, context):
     """Handle errors."""
     logger.error(f"Update {update} caused error {context.error}")
@@ -173,12 +245,20 @@ async def error_handler(update: Update, context):
         )
 
 
-def main():
-    """Start the bot."""
-    logger.info("Starting AutoXMail Bot...")
-    
+def build_application() -> Application:
+    """Create the application and register all handlers."""
     # Create application
-    app = Application.builder().token(config.BOT_TOKEN).post_init(post_init).build()
+    app = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .base_url(config.TELEGRAM_API_BASE_URL)
+        .base_file_url(config.TELEGRAM_FILE_BASE_URL)
+        .rate_limiter(send_scheduler)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Command handlers
     app.add_handler(CommandHandler("start", handlers.start))
@@ -202,17 +282,6 @@ def main():
         oauth_handler.handle_credentials
     ))
     
-    # OAuth text handler (auth code) - with state check
-    async def oauth_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle OAuth auth code if in OAuth state."""
-        if context.user_data.get('state') == 'waiting_auth_code':
-            await oauth_handler.handle_auth_code(update, context)
-    
-    app.add_handler(MessageHandler(
-        filters.TEXT & ~filters.COMMAND,
-        oauth_text_handler
-    ), group=0)  # Group 0 = highest priority
-    
     # Compose email conversation handler
     compose_handler = ConversationHandler(
         entry_points=[CallbackQueryHandler(email_handlers.start_compose, pattern="^compose$")],
@@ -243,6 +312,17 @@ def main():
     )
     app.add_handler(search_conv_handler)
     
+    # OAuth text handler (auth code) - with state check
+    async def oauth_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle OAuth auth code if in OAuth state."""
+        if context.user_data.get('state') == 'waiting_auth_code':
+            await oauth_handler.handle_auth_code(update, context)
+    
+    app.add_handler(MessageHandler(
+        filters.TEXT & ~filters.COMMAND,
+        oauth_text_handler
+    ), group=0)  # After the conversations: only one handler per group runs
+    
     # Labels handlers
     app.add_handler(CallbackQueryHandler(labels_handler.show_labels, pattern="^labels$"))
     app.add_handler(CallbackQueryHandler(labels_handler.select_labels_account, pattern="^labels_account:"))
@@ -354,6 +434,15 @@ def main():
     # Error handler
     app.add_error_handler(error_handler)
     
+    return app
+
+
+def main():
+    """Start the bot."""
+    logger.info("Starting AutoXMail Bot...")
+    
+    app = build_application()
+    
     # Start bot
     logger.info("Bot started successfully!")
     logger.info(f"Admin chat: {config.ADMIN_CHAT_ID}")
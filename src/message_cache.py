@@ -0,0 +1,153 @@
+"""In-process LRU cache for Gmail message objects."""
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+from parsed_message import ParsedMessage
+
+# Fixed per-entry overhead (dict/list objects, key tuple, ids)
+ENTRY_OVERHEAD = 512
+
+
+def _estimate_size(message: Dict[str, Any]) -> int:
+    """Estimate memory held by a message object in bytes."""
+    size = ENTRY_OVERHEAD + len(message.get('snippet', ''))
+    stack = [message.get('payload') or {}]
+    while stack:
+        part = stack.pop()
+        for header in part.get('headers', []):
+            size += len(header.get('name', '')) + len(header.get('value', '')) + 100
+        size += len((part.get('body') or {}).get('data', ''))
+        stack.extend(part.get('parts', []))
+    return size
+
+
+def cache_format(format: str, headers: Optional[List[str]] = None) -> str:
+    """Build the format part of a cache key.
+
+    Metadata responses only contain the requested headers, so the header
+    whitelist is part of the key.
+    """
+    if format == 'metadata' and headers:
+        return f"metadata:{','.join(headers)}"
+    return format
+
+
+class MessageCache:
+    """LRU cache keyed by (account_id, message_id, format) with a byte budget.
+
+    Each entry keeps the raw API response and its ParsedMessage, so a
+    message is parsed once however often it is displayed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Tuple[int, str, str], Tuple[Dict[str, Any], int, ParsedMessage]] = OrderedDict()
+        self.formats: Dict[Tuple[int, str], set] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, account_id: int, message_id: str, format: str,
+            headers: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get cached message, or None on miss.
+
+        A cached 'full' message also satisfies 'metadata' requests.
+        """
+        fmt = cache_format(format, headers)
+        candidates = [fmt, 'full'] if format == 'metadata' else [fmt]
+
+        for candidate in candidates:
+            key = (account_id, message_id, candidate)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        self.misses += 1
+        return None
+
+    def put(self, account_id: int, message_id: str, format: str,
+            message: Dict[str, Any], headers: Optional[List[str]] = None) -> ParsedMessage:
+        """Store message, evicting least recently used entries over budget.
+
+        Returns:
+            Parsed message (also returned for messages too large to cache)
+        """
+        fmt = cache_format(format, headers)
+        key = (account_id, message_id, fmt)
+        size = _estimate_size(message)
+        parsed = ParsedMessage(message)
+
+        if size > self.max_bytes:
+            return parsed
+
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = (message, size, parsed)
+        self.formats.setdefault((account_id, message_id), set()).add(fmt)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+        return parsed
+
+    def parse(self, account_id: int, message: Dict[str, Any], format: str,
+              headers: Optional[List[str]] = None) -> ParsedMessage:
+        """Get the ParsedMessage of a message returned by get()/put().
+
+        Reuses the cached parse when the entry still holds this response;
+        does not count as a lookup.
+        """
+        fmt = cache_format(format, headers)
+        for candidate in ([fmt, 'full'] if format == 'metadata' else [fmt]):
+            entry = self.entries.get((account_id, message.get('id'), candidate))
+            if entry is not None and entry[0] is message:
+                return entry[2]
+        return ParsedMessage(message)
+
+    def set_labels(self, account_id: int, message_id: str, label_ids: List[str]):
+        """Replace labelIds on every cached copy of a message."""
+        for fmt in self.formats.get((account_id, message_id), ()):
+            message, _, parsed = self.entries[(account_id, message_id, fmt)]
+            message['labelIds'] = list(label_ids)
+            parsed.set_labels(label_ids)
+
+    def invalidate(self, account_id: int, message_id: str):
+        """Drop every cached copy of a message."""
+        for fmt in list(self.formats.get((account_id, message_id), ())):
+            self._remove((account_id, message_id, fmt))
+
+    def invalidate_account(self, account_id: int):
+        """Drop every cached message of an account."""
+        for key in [k for k in self.entries if k[0] == account_id]:
+            self._remove(key)
+
+    def _remove(self, key: Tuple[int, str, str]):
+        """Remove a single entry and its index record."""
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
+
+        account_id, message_id, fmt = key
+        formats = self.formats.get((account_id, message_id))
+        if formats is not None:
+            formats.discard(fmt)
+            if not formats:
+                del self.formats[(account_id, message_id)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'size_mb': self.size / 1024 / 1024,
+            'max_mb': self.max_bytes / 1024 / 1024,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,156 @@
+"""Gmail MIME payload walking and capped body decoding."""
+import re
+import codecs
+import base64
+from typing import Any, Dict, Optional
+
+CHARSET_REGEX = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+
+DEFAULT_CHARSET = 'utf-8'
+
+
+def _b64decode(data: str) -> bytes:
+    """Decode base64url data, tolerating missing padding."""
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _header(part: Dict[str, Any], name: str) -> str:
+    """Get a part header value (case-insensitive)."""
+    for header in part.get('headers') or ():
+        if header.get('name', '').lower() == name:
+            return header.get('value', '')
+    return ''
+
+
+def part_charset(part: Dict[str, Any]) -> str:
+    """Get the declared charset of a part (utf-8 if missing or unknown)."""
+    match = CHARSET_REGEX.search(_header(part, 'content-type'))
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return DEFAULT_CHARSET
+
+
+def is_attachment(part: Dict[str, Any]) -> bool:
+    """Check if a part is an attachment rather than message text."""
+    if part.get('filename'):
+        return True
+    return _header(part, 'content-disposition').lower().startswith('attachment')
+
+
+def find_body_part(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Find the part holding the message text.
+
+    Walks nested multiparts depth first and returns the first text/plain
+    part with inline data, falling back to the first text/html one.
+
+    Args:
+        payload: Message payload
+
+    Returns:
+        Body part or None
+    """
+    html = None
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get('parts')
+        if children:
+            stack.extend(reversed(children))
+            continue
+        if is_attachment(part) or not (part.get('body') or {}).get('data'):
+            continue
+
+        mime_type = part.get('mimeType', '')
+        if mime_type == 'text/plain':
+            return part
+        if mime_type == 'text/html' and html is None:
+            html = part
+    return html
+
+
+def decode_part(part: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+    """Decode a part's text, stopping once max_chars are available.
+
+    Base64 is decoded in quartet-aligned chunks through an incremental
+    decoder, so only the bytes needed for max_chars are ever decoded.
+
+    Args:
+        part: Body part with inline data
+        max_chars: Character cap (None for the whole part)
+
+    Returns:
+        Decoded text
+    """
+    data = part['body']['data']
+    charset = part_charset(part)
+
+    if max_chars is None:
+        return _b64decode(data).decode(charset, errors='ignore')
+
+    decoder = codecs.getincrementaldecoder(charset)(errors='ignore')
+    # Base64 characters per chunk: enough for max_chars single-byte chars
+    step = max(4, -(-max_chars // 3) * 4)
+    chunks = []
+    length = 0
+    pos = 0
+    while pos < len(data) and length < max_chars:
+        chunk = data[pos:pos + step]
+        pos += step
+        text = decoder.decode(_b64decode(chunk), final=pos >= len(data))
+        chunks.append(text)
+        length += len(text)
+
+    return ''.join(chunks)[:max_chars]
+
+
+class MimeBody:
+    """Lazily decoded body of one Gmail message.
+
+    The body part is located once; decoded text is kept per cap so the
+    same object can serve a short preview and a full view.
+    """
+
+    __slots__ = ('payload', '_part', '_located', '_texts')
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload or {}
+        self._part = None
+        self._located = False
+        self._texts: Dict[Optional[int], str] = {}
+
+    @property
+    def part(self) -> Optional[Dict[str, Any]]:
+        """Part holding the text (None if the message has none)."""
+        if not self._located:
+            self._part = find_body_part(self.payload)
+            self._located = True
+        return self._part
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type of the body part ('' if none)."""
+        return self.part.get('mimeType', '') if self.part else ''
+
+    def text(self, max_chars: Optional[int] = None) -> str:
+        """Get body text, decoding at most what max_chars needs.
+
+        Args:
+            max_chars: Character cap (None for the whole body)
+
+        Returns:
+            Body text ('' if the message has no text part)
+        """
+        if max_chars in self._texts:
+            return self._texts[max_chars]
+
+        # A longer decode already covers this cap
+        for cap, text in self._texts.items():
+            if cap is None or (max_chars is not None and cap >= max_chars):
+                return text[:max_chars]
+
+        text = decode_part(self.part, max_chars) if self.part else ''
+        self._texts[max_chars] = text
+        return text
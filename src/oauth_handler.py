@@ -5,10 +5,10 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from google_auth_oauthlib.flow import Flow
 from database import db
+from gmail_executor import gmail_executor
 from crypto import encrypt_credentials, encrypt_token, decrypt_token
-from formatter import to_tiny_caps, escape_markdown
+from render import to_tiny_caps, escape_markdown, header, field
 import config
-import asyncio
 from auto_delete import schedule_delete, DELETE_IMMEDIATE
 
 
@@ -50,8 +50,7 @@ class OAuthHandler:
             
             # Success message
             text = (
-                f"✅ *{to_tiny_caps('Account Added Successfully')}\\!*\n"
-                f"`────────────────────────`\n\n"
+                header('✅', 'Account Added Successfully!') +
                 f"📧 Email: {escape_markdown(email)}\n\n"
                 f"Your Gmail account is now connected\\.\n"
                 f"All credentials are encrypted and stored securely\\."
@@ -87,10 +86,9 @@ class OAuthHandler:
             ]
             
             await query.edit_message_text(
-                f"⚠️ *{to_tiny_caps('Limit Reached')}*\n"
-                f"`────────────────────────`\n\n"
-                f"Maximum 75 Gmail accounts allowed\\.\n\n"
-                f"Remove an existing account to add a new one\\.",
+                header('⚠️', 'Limit Reached') +
+                "Maximum 75 Gmail accounts allowed\\.\n\n"
+                "Remove an existing account to add a new one\\.",
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode='MarkdownV2'
             )
@@ -98,9 +96,8 @@ class OAuthHandler:
         
         # Instructions
         text = (
-            f"➕ *{to_tiny_caps('Add Gmail Account')}*\n"
-            f"`────────────────────────`\n\n"
-            f"*{to_tiny_caps('Step 1')}:* Upload your credentials\\.json file\n\n"
+            header('➕', 'Add Gmail Account') +
+            f"{field('Step 1')} Upload your credentials\\.json file\n\n"
             f"To get credentials\\.json:\n"
             f"1\\. Go to Google Cloud Console\n"
             f"2\\. Create OAuth 2\\.0 Client ID\n"
@@ -148,7 +145,7 @@ class OAuthHandler:
                 parse_mode='MarkdownV2'
             )
             # Auto-delete error message
-            asyncio.create_task(schedule_delete(context.bot, update.effective_chat.id, loading_msg.message_id, 5))
+            await schedule_delete(context.bot, update.effective_chat.id, loading_msg.message_id, 5)
             return
         
         try:
@@ -196,9 +193,8 @@ class OAuthHandler:
             
             # Send auth URL
             text = (
-                f"✅ *{to_tiny_caps('Credentials Received')}*\n"
-                f"`────────────────────────`\n\n"
-                f"*{to_tiny_caps('Step 2')}:* Authorize Gmail Access\n\n"
+                header('✅', 'Credentials Received') +
+                f"{field('Step 2')} Authorize Gmail Access\n\n"
                 f"1\\. Click the link below\n"
                 f"2\\. Sign in to your Gmail account\n"
                 f"3\\. Grant permissions\n"
@@ -229,7 +225,7 @@ class OAuthHandler:
                 parse_mode='MarkdownV2'
             )
             # Auto-delete error message
-            asyncio.create_task(schedule_delete(context.bot, update.effective_chat.id, loading_msg.message_id, 10))
+            await schedule_delete(context.bot, update.effective_chat.id, loading_msg.message_id, 10)
             context.user_data['state'] = None
     
     async def handle_auth_code(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -273,13 +269,15 @@ class OAuthHandler:
             credentials_json = flow_data['credentials_json']
             
             # Exchange code for token
-            flow.fetch_token(code=code)
+            await gmail_executor.run(None, flow.fetch_token, code=code)
             creds = flow.credentials
             
             # Get email address
-            from googleapiclient.discovery import build
-            service = build('gmail', 'v1', credentials=creds)
-            profile = service.users().getProfile(userId='me').execute()
+            from gmail_service import build_gmail_client
+            service = await gmail_executor.run(None, build_gmail_client, creds)
+            profile = await gmail_executor.run(
+                None, service.users().getProfile(userId='me').execute
+            )
             email = profile['emailAddress']
             
             # Extract API project email from credentials
@@ -297,7 +295,8 @@ class OAuthHandler:
                 'token_uri': creds.token_uri,
                 'client_id': creds.client_id,
                 'client_secret': creds.client_secret,
-                'scopes': creds.scopes
+                'scopes': creds.scopes,
+                'expiry': creds.expiry.isoformat() if creds.expiry else None
             }
             
             # Check if user is trying to add API project email
@@ -320,12 +319,11 @@ class OAuthHandler:
                 ]
                 
                 text = (
-                    f"⚠️ *{to_tiny_caps('Warning')}*\n"
-                    f"`────────────────────────`\n\n"
-                    f"You're trying to add the API project email\\.\n\n"
-                    f"This is usually not what you want\\. "
-                    f"Make sure you authorized the correct Gmail account\\.\n\n"
-                    f"Continue anyway?"
+                    header('⚠️', 'Warning') +
+                    "You're trying to add the API project email\\.\n\n"
+                    "This is usually not what you want\\. "
+                    "Make sure you authorized the correct Gmail account\\.\n\n"
+                    "Continue anyway?"
                 )
                 
                 await update.message.reply_text(
@@ -360,8 +358,7 @@ class OAuthHandler:
             
             # Success message
             text = (
-                f"✅ *{to_tiny_caps('Account Added Successfully')}\\!*\n"
-                f"`────────────────────────`\n\n"
+                header('✅', 'Account Added Successfully!') +
                 f"📧 Email: {escape_markdown(email)}\n\n"
                 f"Your Gmail account is now connected\\.\n"
                 f"All credentials are encrypted and stored securely\\."
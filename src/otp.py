@@ -0,0 +1,311 @@
+"""One-time password extraction."""
+import re
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+# Candidate codes: 4-8 digits (optionally split once by a space or dash, as in
+# "123 456" / "123-456") or 6-8 uppercase letters/digits with at least one
+# digit. An "X-" prefix ("G-123456") may precede the code. The pattern starts
+# by consuming one [A-Z0-9] character so the regex engine can skip straight
+# to those; capitalized words fail on the next character, and token
+# boundaries are then checked with lookbehinds.
+CANDIDATE_REGEX = re.compile(
+    r'[A-Z0-9](?=[A-Z0-9])'
+    r'(?:(?<![\w$€£¥₹.,/:-].)|(?<=(?<![\w$€£¥₹.,/:-])[A-Z]-.))'
+    r'(?:(?<=\d)(?:\d{2,3}[ -]\d{3,4}|\d{3,7})|(?:(?<=\d)|(?=[A-Z]*\d))[A-Z0-9]{5,7})'
+    r'(?![\w%/-]|[.,:]\d)'
+)
+
+# Keywords that mark a nearby code as an OTP, plus promotional words, matched
+# on lowercased text. Alternatives are factored by first letter and left
+# ungrouped so the regex engine can skip ahead to candidate positions; word
+# starts are checked in Python, which is cheaper than a lookbehind.
+KEYWORD_REGEX = re.compile(
+    r'o(?:tp|ne[- ]time)|p(?:asscode|in|romo)|co(?:de|nfirm|upon)|verif|authenticat|2fa'
+    r'|security|log ?in|sign[- ]?in|discount|voucher|checkout'
+)
+
+# The same words as literals; on long texts one str.find() pass per word is
+# cheaper than the regex stopping at every common letter
+KEYWORDS = (
+    'otp', 'one-time', 'one time', 'passcode', 'pin', 'promo', 'code', 'confirm',
+    'coupon', 'verif', 'authenticat', '2fa', 'security', 'login', 'log in',
+    'signin', 'sign in', 'sign-in', 'discount', 'voucher', 'checkout',
+)
+
+# Weak keywords also show up around order, case and phone numbers, so they
+# score lower and only count when close to the code
+WEAK_KEYWORDS = frozenset({
+    'pin', 'confirm', 'security', 'login', 'log in', 'signin', 'sign in', 'sign-in',
+})
+
+# Promotional words (coupon codes, discounts) veto a weakly scored code
+PROMO_KEYWORDS = frozenset({'promo', 'coupon', 'discount', 'voucher', 'checkout'})
+
+# Labels right before a number that make it a reference, not a code, as in
+# "Order 12345678", "Case 4839201" or "call us at 555-1234"
+CONTEXT_LABELS = (
+    'order', 'ref', 'reference', 'case', 'ticket', 'invoice', 'receipt', 'tracking',
+    'account', 'acct', 'ending', 'ending in', 'call', 'call us', 'call at', 'call on',
+    'call us at', 'call us on', 'phone', 'tel', 'fax', 'mobile', 'number', 'no',
+)
+CONTEXT_LOOKBACK = 20
+
+# Matched backwards: anchored at the candidate, over the reversed lowercased
+# text before it, which is much cheaper than searching for a trailing label
+CONTEXT_REGEX = re.compile(
+    r'[\s.:#]*(?:%s)(?![a-z0-9])' % '|'.join(label[::-1] for label in CONTEXT_LABELS)
+)
+
+# YYYYMMDD dates
+DATE_REGEX = re.compile(r'(?:19|20)\d\d(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])')
+
+# Characters between a keyword and a code that still count as "near"
+KEYWORD_WINDOW = 80
+
+# Extra margin so a code straddling a window edge is not cut short; texts
+# that a single window would cover are scanned whole
+WINDOW_MARGIN = 16
+WINDOWED_LENGTH = 2 * (KEYWORD_WINDOW + WINDOW_MARGIN)
+
+# Minimum score for a candidate to be reported
+MIN_SCORE = 3
+
+# Memoized results kept
+MEMO_SIZE = 2048
+
+
+class OTPEngine:
+    """Single-pass OTP extractor with keyword-proximity scoring.
+
+    Every candidate token is scored; a code is reported only if a keyword
+    such as "code" or "OTP" is close to it. Years, dates and numbers labelled
+    as orders, references, cases or phone numbers are penalized.
+    """
+
+    def __init__(self, memo_size: int = MEMO_SIZE):
+        self.memo_size = memo_size
+        self._memo: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def extract(self, text: str, key: Optional[Hashable] = None) -> Optional[str]:
+        """Extract the most likely OTP from text.
+
+        Args:
+            text: Message text
+            key: Optional memo key, e.g. (account_id, message_id)
+
+        Returns:
+            OTP code or None
+        """
+        if key is None:
+            return self._extract(text) if text else None
+        if self._memo_hit(key):
+            return self._memo[key]
+
+        otp = self._extract(text) if text else None
+        self._memo_put(key, otp)
+        return otp
+
+    def extract_message(self, message, key: Optional[Hashable] = None) -> Optional[str]:
+        """Extract the OTP of a parsed message.
+
+        Subject and snippet are tried first; the body is only decoded when
+        they mention a keyword but hold no code.
+
+        Args:
+            message: ParsedMessage
+            key: Optional memo key, e.g. (account_id, message_id)
+
+        Returns:
+            OTP code or None
+        """
+        if key is not None and self._memo_hit(key):
+            return self._memo[key]
+
+        head = f"{message.subject}\n{message.snippet}"
+        otp = self._extract(head)
+        if otp is None and self._find_keywords(head.lower())[0]:
+            otp = self._extract(message.body())
+
+        self._memo_put(key, otp)
+        return otp
+
+    def _memo_hit(self, key: Hashable) -> bool:
+        """Check the memo for key (counts hits and misses)."""
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def _memo_put(self, key: Optional[Hashable], otp: Optional[str]):
+        """Memoize a result (no-op without key)."""
+        if key is None:
+            return
+        self._memo[key] = otp
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def _extract(self, text: str) -> Optional[str]:
+        """Score candidates near keywords and return the best one."""
+        lower = text.lower()
+        keywords, promos = self._find_keywords(lower)
+        if not keywords:
+            return None
+
+        length = len(text)
+        if length > WINDOWED_LENGTH:
+            windows = self._windows(keywords, length)
+        else:
+            windows = ((0, length),)
+
+        # search() in a loop is cheaper than finditer() for the one or two
+        # candidates a message usually holds
+        search = CANDIDATE_REGEX.search
+        best = None
+        best_score = MIN_SCORE - 1
+        for window_start, window_end in windows:
+            match = search(text, window_start, window_end)
+            while match is not None:
+                start, end = match.span()
+
+                # Closer keywords score higher; weak keywords fall off faster
+                # and count one less. A keyword before the code adds one.
+                score = 0
+                before = False
+                for k, strong in keywords:
+                    if k < start:
+                        distance = start - k
+                        if distance > KEYWORD_WINDOW:
+                            continue
+                        before = True
+                    else:
+                        distance = k - end
+                        if distance > KEYWORD_WINDOW:
+                            break
+                    points = 4 - distance // 20 if strong else 3 - distance // 10
+                    if points > score:
+                        score = points
+
+                if score > 0:
+                    score += before + self._shape(match.group())
+                    # Labels are only checked for candidates that would win
+                    if score > best_score and not self._labelled(lower, start):
+                        best, best_score = match, score
+                match = search(text, end, window_end)
+
+        if best is None:
+            return None
+
+        # Promotional context near the winner (coupon codes, discounts)
+        if best_score - 4 < MIN_SCORE and (promos or '% off' in lower) and self._promotional(
+                lower, promos, best.start(), best.end()):
+            return None
+        return best.group().replace(' ', '').replace('-', '')
+
+    @staticmethod
+    def _find_keywords(lower: str) -> Tuple[list, list]:
+        """Keywords that start a word.
+
+        Any occurrence of a matched token is itself a match, so findall()
+        plus str.find() recovers the positions without match objects. Long
+        texts are searched word by word with str.find() instead.
+
+        Returns:
+            Sorted (position, is_strong) of OTP keywords, positions of
+            promotional words
+        """
+        keywords = []
+        promos = []
+        if len(lower) > WINDOWED_LENGTH:
+            find = lower.find
+            for word in KEYWORDS:
+                pos = find(word)
+                while pos != -1:
+                    if not pos or not lower[pos - 1].isalnum():
+                        if word in PROMO_KEYWORDS:
+                            promos.append(pos)
+                        else:
+                            keywords.append((pos, word not in WEAK_KEYWORDS))
+                    pos = find(word, pos + len(word))
+            keywords.sort()
+            promos.sort()
+            return keywords, promos
+
+        pos = 0
+        for word in KEYWORD_REGEX.findall(lower):
+            pos = lower.find(word, pos)
+            if not pos or not lower[pos - 1].isalnum():
+                if word in PROMO_KEYWORDS:
+                    promos.append(pos)
+                else:
+                    keywords.append((pos, word not in WEAK_KEYWORDS))
+            pos += len(word)
+        return keywords, promos
+
+    @staticmethod
+    def _labelled(lower: str, start: int) -> bool:
+        """Whether a reference label ("order", "case", ...) precedes start."""
+        if not start:
+            return False
+        stop = start - CONTEXT_LOOKBACK - 1
+        return CONTEXT_REGEX.match(lower[start - 1:stop if stop >= 0 else None:-1]) is not None
+
+    @staticmethod
+    def _promotional(lower: str, promos: list, start: int, end: int) -> bool:
+        """Whether promotional wording is near the code at start:end."""
+        low, high = start - KEYWORD_WINDOW, end + KEYWORD_WINDOW
+        return (any(low <= k < high for k in promos)
+                or lower.find('% off', max(0, low), high) != -1)
+
+    @staticmethod
+    def _windows(keywords: list, length: int) -> list:
+        """Merge the text ranges around keywords that candidates may occupy."""
+        reach = KEYWORD_WINDOW + WINDOW_MARGIN
+        first = keywords[0][0]
+        windows = []
+        start, end = max(0, first - reach), first + reach
+        for k, _ in keywords[1:]:
+            if k - reach <= end:
+                end = k + reach
+            else:
+                windows.append((start, min(end, length)))
+                start, end = k - reach, k + reach
+        windows.append((start, min(end, length)))
+        return windows
+
+    @staticmethod
+    def _shape(code: str) -> int:
+        """Score adjustment for the shape of a candidate code."""
+        if code.isdigit():
+            if len(code) == 6:
+                return 2
+            if len(code) == 4 and code[:2] in ('19', '20'):
+                return -3  # looks like a year
+            if len(code) == 8 and DATE_REGEX.match(code):
+                return -3  # looks like a date
+            return 0
+        if code[3] in ' -' or code[4] in ' -':
+            return 1  # split digits, "123 456"
+        return -1  # alphanumeric codes are rarer
+
+    def clear(self):
+        """Drop memoized results."""
+        self._memo.clear()
+
+
+# Global engine instance
+otp_engine = OTPEngine()
+
+
+def extract_otp(text: str, key: Optional[Hashable] = None) -> Optional[str]:
+    """Extract OTP from text (memoized when key is given)."""
+    return otp_engine.extract(text, key)
+
+
+def extract_message_otp(message, key: Optional[Hashable] = None) -> Optional[str]:
+    """Extract OTP from a ParsedMessage (memoized when key is given)."""
+    return otp_engine.extract_message(message, key)
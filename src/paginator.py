@@ -69,7 +69,7 @@ def create_pagination_keyboard(current_page: int, total_pages: int,
         List of button rows
     """
     from telegram import InlineKeyboardButton
-    from formatter import to_tiny_caps
+    from render import to_tiny_caps
     
     buttons = []
     nav_row = []
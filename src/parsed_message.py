@@ -0,0 +1,65 @@
+"""Compact parsed view of a Gmail API message."""
+import html
+from typing import Any, Dict, Iterable, Optional
+from mime import MimeBody
+
+# Body characters decoded when no cap is given (matches previous previews)
+DEFAULT_BODY_CHARS = 1000
+
+
+class ParsedMessage:
+    """Gmail message parsed once per API response.
+
+    Headers are indexed by lowercase name (first occurrence wins), labels
+    are a set and the body is only decoded when asked for.
+    """
+
+    __slots__ = ('id', 'thread_id', 'headers', 'snippet', 'labels',
+                 'internal_date', '_payload', '_body')
+
+    def __init__(self, message: Dict[str, Any]):
+        payload = message.get('payload') or {}
+
+        self.id = message.get('id')
+        self.thread_id = message.get('threadId')
+        self.snippet = html.unescape(message.get('snippet', ''))
+        self.labels = set(message.get('labelIds') or ())
+        self.internal_date = int(message.get('internalDate') or 0)
+
+        headers = {}
+        for header in payload.get('headers') or ():
+            headers.setdefault(header['name'].lower(), header['value'])
+        self.headers = headers
+
+        self._payload = payload
+        self._body = None
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a header value by case-insensitive name."""
+        return self.headers.get(name.lower(), default)
+
+    @property
+    def subject(self) -> str:
+        return self.headers.get('subject', 'No Subject')
+
+    @property
+    def sender(self) -> str:
+        return self.headers.get('from', 'Unknown')
+
+    @property
+    def date(self) -> str:
+        return self.headers.get('date', '')
+
+    @property
+    def is_unread(self) -> bool:
+        return 'UNREAD' in self.labels
+
+    def set_labels(self, label_ids: Iterable[str]):
+        """Replace the label set (after a modify call)."""
+        self.labels = set(label_ids)
+
+    def body(self, max_chars: Optional[int] = DEFAULT_BODY_CHARS) -> str:
+        """Get body text, decoding at most max_chars (None for all)."""
+        if self._body is None:
+            self._body = MimeBody(self._payload)
+        return self._body.text(max_chars)
@@ -1,15 +1,19 @@
 """Push notification service with webhook server."""
 import base64
 import json
+import time
 import asyncio
 import logging
-import aiosqlite
+from typing import Dict, Any, List
 from aiohttp import web
 from telegram import Bot
 from database import db
 from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown
-from utils import parse_email_headers, get_message_body, extract_otp
+from history_sync import history_sync
+from sender_matcher import sender_rules
+from send_scheduler import PRIORITY_URGENT, PRIORITY_NOTIFY
+from render import to_tiny_caps, escape_markdown, header, field
+from utils import extract_message_otp
 from auto_delete import schedule_delete
 import config
 
@@ -23,9 +27,29 @@ class PushService:
         self.bot = bot
         self.app = None
         self.runner = None
+        
+        # Ingestion queue: email address -> (lowest, highest) pending historyId
+        self.queue = asyncio.Queue(maxsize=config.PUSH_QUEUE_SIZE)
+        self.pending = {}
+        self.workers = []
+        
+        # Counters
+        self.received = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.in_progress = 0
+        self.max_depth = 0
+        self.total_lag = 0.0
     
     async def handle_push_notification(self, request):
-        """Handle Gmail Pub/Sub push notification."""
+        """Handle Gmail Pub/Sub push notification.
+        
+        Only validates and enqueues; workers do the Gmail/Telegram work so
+        Pub/Sub gets its 200 right away. A full queue answers 503 and lets
+        Pub/Sub redeliver later.
+        """
         try:
             data = await request.json()
             
@@ -48,160 +72,181 @@ class PushService:
             
             logger.info(f"Push notification for {email_address}, historyId: {history_id}")
             
-            # Find user and account in database
-            async with aiosqlite.connect(db.db_path) as conn:
-                conn.row_factory = aiosqlite.Row
-                cursor = await conn.execute(
-                    "SELECT ga.*, u.user_id FROM gmail_accounts ga "
-                    "JOIN users u ON ga.user_id = u.user_id "
-                    "WHERE ga.email = ? AND ga.is_active = 1",
-                    (email_address,)
-                )
-                account = await cursor.fetchone()
+            if not self.enqueue(email_address, int(history_id)):
+                return web.Response(status=503)
             
-            if not account:
-                logger.warning(f"No account found for {email_address}")
-                return web.Response(status=200)
-            
-            account_id = account['id']
-            user_id = account['user_id']
-            last_history_id = account.get('last_history_id', history_id)
+            return web.Response(status=200)
             
-            # Get new messages from history
+        except Exception as e:
+            logger.error(f"Push notification error: {e}")
+            return web.Response(status=500)
+    
+    def enqueue(self, email_address: str, history_id: int) -> bool:
+        """Queue a notification for the workers.
+        
+        Notifications for an account that is already queued are merged into
+        the pending entry (keeping the lowest and highest historyId).
+        
+        Args:
+            email_address: Gmail address from the notification
+            history_id: Notification historyId
+        
+        Returns:
+            False if the queue is full
+        """
+        self.received += 1
+        
+        if email_address in self.pending:
+            first, latest = self.pending[email_address]
+            self.pending[email_address] = (min(first, history_id), max(latest, history_id))
+            self.coalesced += 1
+            return True
+        
+        try:
+            self.queue.put_nowait((email_address, time.monotonic()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f"Push queue full, rejecting notification for {email_address}")
+            return False
+        
+        self.pending[email_address] = (history_id, history_id)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+    
+    async def _worker(self):
+        """Drain the push queue."""
+        while True:
+            email_address, queued_at = await self.queue.get()
+            history_ids = self.pending.pop(email_address, None)
+            self.in_progress += 1
             try:
-                new_message_ids = await gmail_service.get_history(account_id, last_history_id)
+                self.total_lag += time.monotonic() - queued_at
+                if history_ids is not None:
+                    first_history_id, history_id = history_ids
+                    await self.process_notification(email_address, history_id, first_history_id)
+                self.processed += 1
             except Exception as e:
-                logger.error(f"Failed to get history: {e}")
-                new_message_ids = []
-            
-            # Get notification settings
-            settings = await db.get_notification_settings(user_id)
-            push_mode = settings.get('push_mode', 'all')  # off, otp, vip, all
-            
-            # Get blocklist
-            async with aiosqlite.connect(db.db_path) as conn:
-                cursor = await conn.execute(
-                    "SELECT blocked_value FROM blocklist WHERE user_id = ?",
-                    (user_id,)
-                )
-                blocklist = [row[0] for row in await cursor.fetchall()]
-            
-            # Get VIP senders
-            async with aiosqlite.connect(db.db_path) as conn:
-                cursor = await conn.execute(
-                    "SELECT sender_value FROM vip_senders WHERE user_id = ?",
-                    (user_id,)
-                )
-                vip_senders = [row[0] for row in await cursor.fetchall()]
-            
-            # Process each new message
-            for msg_id in new_message_ids:
-                try:
-                    # Fetch message
-                    message = await gmail_service.get_message(account_id, msg_id)
-                    subject, sender, date = parse_email_headers(message)
-                    body = get_message_body(message['payload'])
-                    
-                    # Check blocklist
-                    is_blocked = any(
-                        blocked in sender for blocked in blocklist
-                    )
-                    if is_blocked:
-                        logger.info(f"Blocked sender: {sender}")
-                        continue
-                    
-                    # Check if VIP
-                    is_vip = any(
-                        vip in sender for vip in vip_senders
-                    )
-                    
-                    # Determine if should send notification
+                self.failed += 1
+                logger.error(f"Push processing error for {email_address}: {e}")
+            finally:
+                self.in_progress -= 1
+                self.queue.task_done()
+    
+    async def process_notification(self, email_address: str, history_id: int,
+                                   first_history_id: int = None):
+        """Fetch new messages for an account and send notifications.
+        
+        Args:
+            email_address: Gmail address from the notification
+            history_id: Notification historyId
+            first_history_id: Lowest historyId among coalesced notifications
+        """
+        accounts = db.account_index.lookup(email_address)
+        if not accounts:
+            logger.warning(f"No account found for {email_address}")
+            return
+        
+        # Serialized per mailbox; advances last_history_id once handled
+        for account in accounts:
+            await history_sync.sync(
+                account['id'], history_id,
+                lambda message_ids, account=account: self.notify_messages(account, message_ids),
+                first_history_id
+            )
+    
+    async def notify_messages(self, account: Dict[str, Any], message_ids: List[str]):
+        """Send notifications for new messages of an account.
+        
+        Args:
+            account: Account row (with user_id)
+            message_ids: New message IDs
+        """
+        account_id = account['id']
+        user_id = account['user_id']
+        
+        # Get notification settings
+        settings = db.account_index.get_user_settings(user_id)
+        push_mode = settings['push_mode']  # off, otp, vip, all
+        
+        # Compiled blocklist / VIP matchers
+        blocklist, vip_senders = await sender_rules.get(user_id)
+        
+        # Process each new message
+        for msg_id in message_ids:
+            try:
+                # Fetch message
+                message = await gmail_service.get_parsed_message(account_id, msg_id)
+                subject, sender = message.subject, message.sender
+                
+                # Check blocklist
+                if blocklist.matches(sender):
+                    logger.info(f"Blocked sender: {sender}")
+                    continue
+                
+                # Check if VIP
+                is_vip = vip_senders.matches(sender)
+                
+                # Extracted once per message (memoized for later views)
+                otp = extract_message_otp(message, key=(account_id, msg_id))
+                
+                # Determine if should send notification
+                should_send = False
+                
+                if is_vip:
+                    # VIP always sends
+                    should_send = True
+                elif push_mode == 'off':
                     should_send = False
-                    
-                    if is_vip:
-                        # VIP always sends
-                        should_send = True
-                    elif push_mode == 'off':
-                        should_send = False
-                    elif push_mode == 'otp':
-                        # Only send if OTP detected
-                        otp = extract_otp(body)
-                        should_send = bool(otp)
-                    elif push_mode == 'vip':
-                        # Only VIP (already handled above)
-                        should_send = False
-                    elif push_mode == 'all':
-                        should_send = True
-                    
-                    if not should_send:
-                        continue
-                    
-                    # Format notification
-                    otp = extract_otp(body)
-                    
-                    text = (
-                        f"📧 *{to_tiny_caps('New Email')}*\n"
-                        f"`────────────────────────`\n\n"
-                        f"*{to_tiny_caps('From')}:* {escape_markdown(sender[:50])}\n"
-                        f"*{to_tiny_caps('Subject')}:* {escape_markdown(subject[:50])}\n"
-                    )
-                    
-                    if otp:
-                        text += f"\n🔑 *{to_tiny_caps('OTP')}:* `{otp}`\n"
-                    
-                    text += f"\n*{to_tiny_caps('Preview')}:*\n{escape_markdown(body[:200])}"
-                    
-                    # Send to Telegram
-                    msg = await self.bot.send_message(
-                        chat_id=user_id,
-                        text=text,
-                        parse_mode='MarkdownV2'
-                    )
-                    
-                    # Get auto-delete timer
-                    # Check account-specific first
-                    account_timer = account.get('auto_delete_secs', 0)
-                    
-                    if account_timer > 0:
-                        delete_delay = account_timer
-                    else:
-                        # Use global privacy settings
-                        async with aiosqlite.connect(db.db_path) as conn:
-                            cursor = await conn.execute(
-                                "SELECT global_auto_delete_secs FROM privacy_settings WHERE user_id = ?",
-                                (user_id,)
-                            )
-                            row = await cursor.fetchone()
-                            delete_delay = row[0] if row else 0
-                    
-                    # Schedule auto-delete
-                    if delete_delay > 0:
-                        asyncio.create_task(schedule_delete(
-                            self.bot,
-                            user_id,
-                            msg.message_id,
-                            delete_delay
-                        ))
-                    
-                    logger.info(f"Sent push notification to user {user_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process message {msg_id}: {e}")
+                elif push_mode == 'otp':
+                    # Only send if OTP detected
+                    should_send = bool(otp)
+                elif push_mode == 'vip':
+                    # Only VIP (already handled above)
+                    should_send = False
+                elif push_mode == 'all':
+                    should_send = True
+                
+                if not should_send:
                     continue
-            
-            # Update last history ID
-            async with aiosqlite.connect(db.db_path) as conn:
-                await conn.execute(
-                    "UPDATE gmail_accounts SET last_history_id = ? WHERE id = ?",
-                    (history_id, account_id)
+                
+                # Format notification
+                text = (
+                    header('📧', 'New Email') +
+                    f"{field('From')} {escape_markdown(sender[:50])}\n"
+                    f"{field('Subject')} {escape_markdown(subject[:50])}\n"
                 )
-                await conn.commit()
-            
-            return web.Response(status=200)
-            
-        except Exception as e:
-            logger.error(f"Push notification error: {e}")
-            return web.Response(status=500)
+                
+                if otp:
+                    text += f"\n🔑 {field('OTP')} `{otp}`\n"
+                
+                text += f"\n{field('Preview')}\n{escape_markdown(message.snippet[:200])}"
+                
+                # Send to Telegram (OTP/VIP ahead of everything else)
+                msg = await self.bot.send_message(
+                    chat_id=user_id,
+                    text=text,
+                    parse_mode='MarkdownV2',
+                    rate_limit_args=PRIORITY_URGENT if (otp or is_vip) else PRIORITY_NOTIFY
+                )
+                
+                # Get auto-delete timer
+                # Account-specific first, then global privacy settings
+                delete_delay = account['auto_delete_secs'] or settings['global_auto_delete_secs']
+                
+                # Schedule auto-delete
+                if delete_delay > 0:
+                    await schedule_delete(
+                        self.bot,
+                        user_id,
+                        msg.message_id,
+                        delete_delay
+                    )
+                
+                logger.info(f"Sent push notification to user {user_id}")
+                
+            except Exception as e:
+                logger.error(f"Failed to process message {msg_id}: {e}")
+                continue
     
     async def handle_oauth_callback(self, request):
         """Handle OAuth2 callback."""
@@ -254,6 +299,12 @@ class PushService:
         self.app.router.add_get('/oauth/callback', self.handle_oauth_callback)
         self.app.router.add_get('/health', self.handle_health)
         
+        # Start workers
+        self.workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(config.PUSH_WORKERS)
+        ]
+        
         # Start server
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
@@ -264,10 +315,39 @@ class PushService:
         logger.info(f"Webhook server started on {host}:{port}")
     
     async def stop_server(self):
-        """Stop webhook server."""
+        """Stop webhook server, then drain queued notifications."""
         if self.runner:
             await self.runner.cleanup()
             logger.info("Webhook server stopped")
+        
+        if self.workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=config.PUSH_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Push queue drain timed out, {self.queue.qsize()} notification(s) dropped")
+            
+            for worker in self.workers:
+                worker.cancel()
+            await asyncio.gather(*self.workers, return_exceptions=True)
+            self.workers = []
+            logger.info("Push workers stopped")
+    
+    def stats(self):
+        """Get ingestion queue counters."""
+        done = self.processed + self.failed
+        return {
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.queue.maxsize,
+            'workers': len(self.workers),
+            'in_progress': self.in_progress,
+            'received': self.received,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'processed': self.processed,
+            'failed': self.failed,
+            'avg_lag_ms': (self.total_lag / done * 1000) if done else 0.0,
+        }
 
 
 # Global instance (initialized in main.py)
@@ -0,0 +1,105 @@
+"""MarkdownV2 / tiny caps text rendering on precomputed tables.
+
+Tiny caps is a 1:1 character mapping, so it is a single str.translate
+pass. MarkdownV2 escaping maps one character to two, which str.translate
+handles one code point at a time; a replace pass per special character
+that actually occurs in the text is faster on both short and long input.
+"""
+from functools import lru_cache
+
+# Tiny caps mapping
+TINY_CAPS = {
+    'a': 'ᴀ', 'b': 'ʙ', 'c': 'ᴄ', 'd': 'ᴅ', 'e': 'ᴇ', 'f': 'ғ', 'g': 'ɢ', 'h': 'ʜ',
+    'i': 'ɪ', 'j': 'ᴊ', 'k': 'ᴋ', 'l': 'ʟ', 'm': 'ᴍ', 'n': 'ɴ', 'o': 'ᴏ', 'p': 'ᴘ',
+    'q': 'ǫ', 'r': 'ʀ', 's': 's', 't': 'ᴛ', 'u': 'ᴜ', 'v': 'ᴠ', 'w': 'ᴡ', 'x': 'x',
+    'y': 'ʏ', 'z': 'ᴢ',
+    'A': 'ᴀ', 'B': 'ʙ', 'C': 'ᴄ', 'D': 'ᴅ', 'E': 'ᴇ', 'F': 'ғ', 'G': 'ɢ', 'H': 'ʜ',
+    'I': 'ɪ', 'J': 'ᴊ', 'K': 'ᴋ', 'L': 'ʟ', 'M': 'ᴍ', 'N': 'ɴ', 'O': 'ᴏ', 'P': 'ᴘ',
+    'Q': 'ǫ', 'R': 'ʀ', 'S': 's', 'T': 'ᴛ', 'U': 'ᴜ', 'V': 'ᴠ', 'W': 'ᴡ', 'X': 'x',
+    'Y': 'ʏ', 'Z': 'ᴢ'
+}
+
+# Characters MarkdownV2 requires escaping outside entities
+MARKDOWN_SPECIAL = '_*[]()~`>#+-=|{}.!'
+
+TINY_CAPS_TABLE = str.maketrans(TINY_CAPS)
+MARKDOWN_ESCAPES = tuple((char, f'\\{char}') for char in MARKDOWN_SPECIAL)
+
+# Labels longer than this are rendered without memoizing (dynamic text)
+LABEL_CACHE_MAX_LENGTH = 64
+
+DIVIDER = '`────────────────────────`'
+
+
+def escape_markdown(text: str) -> str:
+    """Escape special characters for MarkdownV2.
+
+    Only characters present in the text cost a replace pass.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Escaped text safe for MarkdownV2
+    """
+    for char, escaped in MARKDOWN_ESCAPES:
+        if char in text:
+            text = text.replace(char, escaped)
+    return text
+
+
+@lru_cache(maxsize=2048)
+def _tiny_label(text: str) -> str:
+    return text.translate(TINY_CAPS_TABLE)
+
+
+def to_tiny_caps(text: str) -> str:
+    """Convert text to tiny caps.
+
+    Short strings (button labels, field names) are memoized, so static
+    labels are converted once per process.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Text in tiny caps
+    """
+    if len(text) <= LABEL_CACHE_MAX_LENGTH:
+        return _tiny_label(text)
+    return text.translate(TINY_CAPS_TABLE)
+
+
+@lru_cache(maxsize=256)
+def header(emoji: str, title: str) -> str:
+    """Screen header: "<emoji> *Title*", divider and a blank line.
+
+    Args:
+        emoji: Leading emoji ('' for none)
+        title: Plain title (tiny-capsed and escaped here)
+
+    Returns:
+        MarkdownV2 header block
+    """
+    prefix = f"{emoji} " if emoji else ''
+    return f"{prefix}*{escape_markdown(to_tiny_caps(title))}*\n{DIVIDER}\n\n"
+
+
+@lru_cache(maxsize=256)
+def app_header(subtitle: str) -> str:
+    """Screen header in the "*AutoXMail* · *Subtitle*" style.
+
+    Args:
+        subtitle: Plain subtitle (tiny-capsed and escaped here)
+
+    Returns:
+        MarkdownV2 header block
+    """
+    return f"*{to_tiny_caps('AutoXMail')}* · *{escape_markdown(to_tiny_caps(subtitle))}*\n{DIVIDER}\n\n"
+
+
+@lru_cache(maxsize=256)
+def field(name: str) -> str:
+    """Bold field label, e.g. "*Subject:*" in tiny caps."""
+    return f"*{to_tiny_caps(name)}:*"
+
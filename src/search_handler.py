@@ -2,9 +2,10 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from database import db
-from gmail_service import gmail_service
-from formatter import to_tiny_caps, escape_markdown
-from utils import parse_email_headers, truncate_text
+from gmail_service import gmail_service, LIST_HEADERS
+from render import to_tiny_caps, escape_markdown, header, app_header, field
+from keyboards import keyboards
+from utils import truncate_text
 
 # Search flow states
 SELECT_ACCOUNT, ENTER_QUERY = range(2)
@@ -24,9 +25,7 @@ class SearchHandler:
         if not accounts:
             await query.edit_message_text(
                 f"❌ {escape_markdown('No accounts found. Add an account first!')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return ConversationHandler.END
@@ -50,9 +49,8 @@ class SearchHandler:
         )])
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Search Emails')}*\n"
-            f"`────────────────────────`\n\n"
-            f"Select account to search:"
+            app_header('Search Emails') +
+            "Select account to search:"
         )
         
         await query.edit_message_text(
@@ -79,10 +77,9 @@ class SearchHandler:
         query = update.callback_query if update.callback_query else None
         
         text = (
-            f"*{to_tiny_caps('AutoXMail')}* · *{to_tiny_caps('Search Emails')}*\n"
-            f"`────────────────────────`\n\n"
+            app_header('Search Emails') +
             f"Enter search query:\n\n"
-            f"*{to_tiny_caps('Examples')}:*\n"
+            f"{field('Examples')}\n"
             f"• `from:user@example\\.com`\n"
             f"• `subject:invoice`\n"
             f"• `has:attachment`\n"
@@ -153,18 +150,20 @@ class SearchHandler:
             # Fetch message details
             keyboard = []
             text = (
-                f"🔍 *{to_tiny_caps('Search Results')}*\n"
-                f"`────────────────────────`\n\n"
+                header('🔍', 'Search Results') +
                 f"Found {len(message_ids)} results:\n\n"
             )
             
-            for msg_id_obj in message_ids[:10]:
-                msg_id = msg_id_obj['id']
-                full_msg = await gmail_service.get_message(account_id, msg_id)
-                subject, sender, date = parse_email_headers(full_msg)
+            full_msgs = await gmail_service.get_parsed_messages_batch(
+                account_id, [msg_id_obj['id'] for msg_id_obj in message_ids[:10]],
+                format='metadata', headers=LIST_HEADERS
+            )
+            
+            for full_msg in full_msgs:
+                msg_id = full_msg.id
+                subject, sender = full_msg.subject, full_msg.sender
                 
-                is_unread = 'UNREAD' in full_msg.get('labelIds', [])
-                icon = "🔵" if is_unread else "⚪"
+                icon = "🔵" if full_msg.is_unread else "⚪"
                 
                 text += f"{icon} {escape_markdown(truncate_text(subject, 40))}\n"
                 text += f"   From: {escape_markdown(truncate_text(sender, 30))}\n\n"
@@ -193,9 +192,7 @@ class SearchHandler:
         except Exception as e:
             await update.message.reply_text(
                 f"❌ {escape_markdown(f'Search failed: {str(e)}')}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton(f"🔙 {to_tiny_caps('Back')}", callback_data="start")
-                ]]),
+                reply_markup=keyboards.back('start'),
                 parse_mode='MarkdownV2'
             )
             return ConversationHandler.END
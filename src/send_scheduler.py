@@ -0,0 +1,289 @@
+"""Outbound Telegram request scheduler (rate limiter for the bot)."""
+import time
+import heapq
+import asyncio
+import logging
+from itertools import count
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+import config
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, passed as ``rate_limit_args=`` on bot calls.
+# Lower is sent first. Must be non-zero (PTB drops falsy rate_limit_args).
+PRIORITY_URGENT = 1  # OTP / VIP notifications
+PRIORITY_INTERACTIVE = 2  # replies to user actions (default)
+PRIORITY_NOTIFY = 3  # regular push notifications
+PRIORITY_BULK = 4  # broadcasts
+
+PRIORITY_NAMES = {
+    PRIORITY_URGENT: 'urgent',
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_NOTIFY: 'notify',
+    PRIORITY_BULK: 'bulk',
+}
+
+# Endpoints that count against the per-chat message limit
+SEND_PREFIXES = ('send', 'forward', 'copy')
+
+# Chat buckets kept before idle ones are pruned
+MAX_CHAT_BUCKETS = 1024
+
+
+class TokenBucket:
+    """Token bucket with an optional flood-wait pause."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Consume one token."""
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Block the bucket for a flood wait."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def is_idle(self) -> bool:
+        """Check if the bucket is full and unused."""
+        return (not self.lock.locked() and self.wait_time() == 0
+                and self.tokens >= self.capacity)
+
+
+class SendScheduler(BaseRateLimiter[int]):
+    """Central scheduler for every Bot API request.
+
+    Requests that target a chat wait out that chat's flood pause, take a
+    token from its bucket (send endpoints only) and then wait in a priority
+    queue for a token from the global bucket, so OTP/VIP notifications
+    overtake queued broadcasts.
+    RetryAfter pauses the affected chat (or everything, for requests without
+    a chat) and the request is retried.
+    """
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None,
+                 chat_burst: float = None, group_rate: float = None,
+                 max_retries: int = None):
+        self.global_rate = global_rate or config.TG_GLOBAL_RATE
+        self.chat_rate = chat_rate or config.TG_CHAT_RATE
+        self.chat_burst = chat_burst or config.TG_CHAT_BURST
+        self.group_rate = group_rate or config.TG_GROUP_RATE_PER_MIN / 60
+        self.max_retries = config.TG_MAX_RETRIES if max_retries is None else max_retries
+
+        self._global = None
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        self._heap = []
+        self._seq = count()
+        self._wakeup = None
+        self._dispatcher = None
+
+        # Counters
+        self.queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def initialize(self) -> None:
+        """Start the dispatcher."""
+        self._ensure_started()
+
+    async def shutdown(self) -> None:
+        """Stop the dispatcher and cancel waiting requests.
+
+        Queued requests are cancelled rather than released, so nothing is
+        sent past shutdown without a token.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            future.cancel()
+
+    def _ensure_started(self):
+        """Create loop-bound state on first use."""
+        if self._global is None:
+            self._global = TokenBucket(self.global_rate, self.global_rate)
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _get_chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        """Get per-chat bucket (groups/channels get the slower group rate)."""
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                for key in [k for k, b in self._chats.items() if b.is_idle()]:
+                    del self._chats[key]
+
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            bucket = TokenBucket(rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _acquire_chat(self, bucket: TokenBucket):
+        """Wait for a per-chat token (FIFO per chat)."""
+        async with bucket.lock:
+            while True:
+                wait = bucket.wait_time()
+                if wait <= 0:
+                    bucket.take()
+                    return
+                await asyncio.sleep(wait)
+
+    async def _wait_unpaused(self, bucket: TokenBucket):
+        """Wait until a bucket's flood-wait pause is over."""
+        while True:
+            paused_for = bucket.paused_until - time.monotonic()
+            if paused_for <= 0:
+                return
+            await asyncio.sleep(paused_for)
+
+    async def _acquire_global(self, priority: int):
+        """Wait in the priority queue for a global token."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self.queued[priority] += 1
+        self._wakeup.set()
+        try:
+            await future
+        finally:
+            self.queued[priority] -= 1
+
+    async def _dispatch(self):
+        """Hand out global tokens, highest priority first."""
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            wait = self._global.wait_time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue
+            self._global.take()
+            future.set_result(None)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """Throttle a Bot API request.
+
+        Args:
+            callback: Coroutine function doing the request
+            args: Positional arguments for callback
+            kwargs: Keyword arguments for callback
+            endpoint: Bot API method name
+            data: Request parameters
+            rate_limit_args: Priority class (PRIORITY_*), default interactive
+
+        Returns:
+            Bot API result
+        """
+        self._ensure_started()
+        priority = rate_limit_args if rate_limit_args in PRIORITY_NAMES else PRIORITY_INTERACTIVE
+
+        chat_id = data.get('chat_id')
+        if chat_id is None:
+            # Not tied to a chat (callback answers, getMe, ...): only honor
+            # a global flood wait.
+            bucket = None
+        else:
+            try:
+                chat_id = int(chat_id)
+            except (TypeError, ValueError):
+                pass
+            bucket = self._get_chat_bucket(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.monotonic()
+
+            if bucket is not None:
+                if endpoint.startswith(SEND_PREFIXES):
+                    await self._acquire_chat(bucket)
+                else:
+                    # Edits, deletes and callback answers take no chat
+                    # token but still honor the chat's flood wait
+                    await self._wait_unpaused(bucket)
+                await self._acquire_global(priority)
+            else:
+                await self._wait_unpaused(self._global)
+
+            wait = time.monotonic() - queued_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as exc:
+                self.flood_waits += 1
+                retry_after = float(exc.retry_after) + 0.1
+                logger.warning(f"Flood wait {retry_after:.1f}s on {endpoint} (chat {chat_id})")
+
+                if bucket is not None:
+                    bucket.pause(retry_after)
+                else:
+                    self._global.pause(retry_after)
+
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise
+            except Exception:
+                self.failed += 1
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Get scheduler counters."""
+        done = self.sent + self.failed
+        return {
+            'queued': {PRIORITY_NAMES[p]: n for p, n in self.queued.items()},
+            'queue_depth': sum(self.queued.values()),
+            'chats': len(self._chats),
+            'sent': self.sent,
+            'failed': self.failed,
+            'flood_waits': self.flood_waits,
+            'avg_wait_ms': (self.total_wait / done * 1000) if done else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+# Global scheduler instance (installed as the bot's rate limiter in main.py)
+send_scheduler = SendScheduler()
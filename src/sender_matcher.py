@@ -0,0 +1,157 @@
+"""Compiled per-user blocklist / VIP sender matching."""
+import re
+import logging
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+from database import db
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_REGEX = re.compile(r'<([^<>]+)>')
+
+
+def extract_address(sender: str) -> str:
+    """Get the lowercased email address from a From header."""
+    match = ADDRESS_REGEX.search(sender)
+    return (match.group(1) if match else sender).strip().lower()
+
+
+class PatternAutomaton:
+    """Aho-Corasick automaton answering "does text contain any pattern"."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [False]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        """Insert a pattern into the trie."""
+        state = 0
+        for char in pattern:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(False)
+                self.goto[state][char] = nxt
+            state = nxt
+        self.output[state] = True
+
+    def _build(self):
+        """Compute failure links (breadth first)."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] or self.output[self.fail[nxt]]
+
+    def search(self, text: str) -> bool:
+        """Check if any pattern occurs in text."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
+
+
+class SenderMatcher:
+    """Match a sender against one user's rule list.
+
+    Rules are "user@example.com" (exact address), "@example.com" (domain)
+    or, for older free-form entries, a substring of the From header.
+    """
+
+    def __init__(self, rules: Iterable[str]):
+        self.addresses = set()
+        self.domains = set()
+        substrings = []
+
+        for rule in rules:
+            rule = (rule or '').strip().lower()
+            if not rule:
+                continue
+            if rule.startswith('@') and rule.count('@') == 1:
+                self.domains.add(rule[1:])
+            elif rule.count('@') == 1 and ' ' not in rule:
+                self.addresses.add(rule)
+            else:
+                substrings.append(rule)
+
+        self.automaton = PatternAutomaton(substrings) if substrings else None
+
+    def matches(self, sender: str) -> bool:
+        """Check if a From header matches any rule."""
+        address = extract_address(sender)
+        if address in self.addresses:
+            return True
+        if self.domains and address.rpartition('@')[2] in self.domains:
+            return True
+        if self.automaton is not None:
+            return self.automaton.search(sender.lower())
+        return False
+
+    def __bool__(self):
+        return bool(self.addresses or self.domains or self.automaton)
+
+
+class SenderRules:
+    """Per-user compiled blocklist and VIP matchers.
+
+    Built from SQLite on first use and rebuilt by the handlers that change
+    the rules.
+    """
+
+    def __init__(self):
+        self._matchers: Dict[int, Tuple[SenderMatcher, SenderMatcher]] = {}
+
+    async def get(self, user_id: int) -> Tuple[SenderMatcher, SenderMatcher]:
+        """Get (blocklist, vip) matchers for a user."""
+        matchers = self._matchers.get(user_id)
+        if matchers is None:
+            matchers = await self.reload(user_id)
+        return matchers
+
+    async def reload(self, user_id: int) -> Tuple[SenderMatcher, SenderMatcher]:
+        """Rebuild a user's matchers from the database."""
+        async with db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT blocked_value FROM blocklist WHERE user_id = ?",
+                (user_id,)
+            )
+            blocklist = [row[0] for row in await cursor.fetchall()]
+
+            cursor = await conn.execute(
+                "SELECT sender_value FROM vip_senders WHERE user_id = ?",
+                (user_id,)
+            )
+            vip_senders = [row[0] for row in await cursor.fetchall()]
+
+        matchers = (SenderMatcher(blocklist), SenderMatcher(vip_senders))
+        self._matchers[user_id] = matchers
+        return matchers
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop compiled matchers (all users if user_id is None)."""
+        if user_id is None:
+            self._matchers.clear()
+        else:
+            self._matchers.pop(user_id, None)
+
+
+# Global rules instance
+sender_rules = SenderRules()
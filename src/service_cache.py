@@ -0,0 +1,69 @@
+"""LRU/TTL cache for per-account Gmail API clients."""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ServiceCache:
+    """Bounded cache of built Gmail service objects.
+
+    Each service holds its own HTTP client, so the number kept resident is
+    capped; the least recently used one is evicted first and entries older
+    than ttl seconds are rebuilt on next use.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[int, Tuple[Any, float]] = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, account_id: int) -> bool:
+        return account_id in self.entries
+
+    def get(self, account_id: int) -> Optional[Any]:
+        """Get a cached service, or None on miss or expiry."""
+        entry = self.entries.get(account_id)
+        if entry is not None:
+            service, built_at = entry
+            if time.monotonic() - built_at < self.ttl:
+                self.entries.move_to_end(account_id)
+                self.hits += 1
+                return service
+            del self.entries[account_id]
+            self.expirations += 1
+
+        self.misses += 1
+        return None
+
+    def put(self, account_id: int, service: Any):
+        """Store a freshly built service, evicting the least recently used."""
+        self.builds += 1
+        self.entries[account_id] = (service, time.monotonic())
+        self.entries.move_to_end(account_id)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, account_id: int):
+        """Drop an account's service."""
+        self.entries.pop(account_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        return {
+            'resident': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'builds': self.builds,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
@@ -0,0 +1,199 @@
+"""OAuth credential manager with background token refresh."""
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Any, List
+from google.oauth2.credentials import Credentials
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from crypto import decrypt_token, encrypt_token
+from database import db
+from gmail_executor import gmail_executor
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _token_info(creds: Credentials) -> Dict[str, Any]:
+    """Serialize credentials the way they are stored in token_enc."""
+    return {
+        'token': creds.token,
+        'refresh_token': creds.refresh_token,
+        'token_uri': creds.token_uri,
+        'client_id': creds.client_id,
+        'client_secret': creds.client_secret,
+        'scopes': creds.scopes,
+        'expiry': creds.expiry.isoformat() if creds.expiry else None,
+    }
+
+
+def _load_credentials(token_enc: bytes, user_id: int) -> Credentials:
+    """Decrypt a stored token into Credentials."""
+    token_info = json.loads(decrypt_token(token_enc, user_id))
+    expiry = token_info.get('expiry')
+    return Credentials(
+        token=token_info['token'],
+        refresh_token=token_info.get('refresh_token'),
+        token_uri=token_info['token_uri'],
+        client_id=token_info['client_id'],
+        client_secret=token_info['client_secret'],
+        scopes=token_info['scopes'],
+        # google-auth compares against naive UTC
+        expiry=datetime.fromisoformat(expiry) if expiry else None
+    )
+
+
+def _refresh_token(creds: Credentials, user_id: int) -> bytes:
+    """Refresh credentials in place and encrypt the new token."""
+    creds.refresh(Request())
+    return encrypt_token(json.dumps(_token_info(creds)), user_id)
+
+
+class CredentialManager:
+    """Own the Credentials of every loaded account and keep them fresh.
+
+    A driver task refreshes tokens TOKEN_REFRESH_MARGIN seconds before they
+    expire. Refreshes run on the Gmail executor, are persisted with
+    ``db.update_token`` and concurrent refreshes of one account share a
+    single request. Listeners are told about each refresh so cached API
+    clients can be swapped.
+    """
+
+    def __init__(self):
+        self.credentials: Dict[int, Credentials] = {}
+        self.user_ids: Dict[int, int] = {}
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._listeners: List[Callable[[int, Credentials], Awaitable[None]]] = []
+        self._driver = None
+
+        # Counters
+        self.refreshes = 0
+        self.failures = 0
+        self.collapsed = 0
+
+    def add_listener(self, listener: Callable[[int, Credentials], Awaitable[None]]):
+        """Register a coroutine called as listener(account_id, creds) after a refresh."""
+        self._listeners.append(listener)
+
+    async def get(self, account_id: int) -> Credentials:
+        """Get valid credentials for an account.
+
+        Args:
+            account_id: Gmail account ID
+
+        Returns:
+            Credentials (refreshed first if expired)
+        """
+        creds = self.credentials.get(account_id) or await self._load(account_id)
+        if creds.expired and creds.refresh_token:
+            await self.refresh(account_id)
+        return creds
+
+    async def _load(self, account_id: int) -> Credentials:
+        """Load an account's credentials from the database."""
+        account = await db.get_gmail_account(account_id)
+        if not account:
+            raise ValueError("Account not found")
+
+        # Legacy (v1) tokens derive their key with PBKDF2
+        creds = await asyncio.to_thread(
+            _load_credentials, account['token_enc'], account['user_id']
+        )
+        self.credentials[account_id] = creds
+        self.user_ids[account_id] = account['user_id']
+        return creds
+
+    async def refresh(self, account_id: int) -> Credentials:
+        """Refresh an account's token (single flight per account).
+
+        Raises:
+            RefreshError: If the refresh token was rejected
+        """
+        task = self._inflight.get(account_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(account_id))
+            self._inflight[account_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(account_id, None))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    async def _refresh(self, account_id: int) -> Credentials:
+        """Refresh, persist and announce new credentials."""
+        creds = self.credentials.get(account_id) or await self._load(account_id)
+
+        try:
+            # Refreshed in place, so clients holding creds see the new token;
+            # encrypting it (PBKDF2 for a cold key) stays off the event loop too
+            token_enc = await gmail_executor.run(
+                account_id, _refresh_token, creds, self.user_ids[account_id]
+            )
+        except RefreshError:
+            self.failures += 1
+            raise
+
+        self.refreshes += 1
+        await db.update_token(account_id, token_enc)
+
+        for listener in self._listeners:
+            try:
+                await listener(account_id, creds)
+            except Exception as e:
+                logger.error(f"Token refresh listener failed for account {account_id}: {e}")
+
+        return creds
+
+    def forget(self, account_id: int):
+        """Drop an account's credentials (e.g. after removal)."""
+        self.credentials.pop(account_id, None)
+        self.user_ids.pop(account_id, None)
+
+    async def start(self):
+        """Start the background refresh driver."""
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+
+    async def stop(self):
+        """Stop the driver and wait for in-flight refreshes."""
+        if self._driver is not None:
+            self._driver.cancel()
+            await asyncio.gather(self._driver, return_exceptions=True)
+            self._driver = None
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    async def _drive(self):
+        """Refresh tokens that expire within the margin."""
+        margin = timedelta(seconds=config.TOKEN_REFRESH_MARGIN)
+        while True:
+            await asyncio.sleep(config.TOKEN_REFRESH_INTERVAL)
+
+            deadline = datetime.utcnow() + margin
+            due = [
+                account_id for account_id, creds in list(self.credentials.items())
+                if creds.expiry and creds.refresh_token and creds.expiry <= deadline
+            ]
+            results = await asyncio.gather(
+                *(self.refresh(account_id) for account_id in due),
+                return_exceptions=True
+            )
+            for account_id, result in zip(due, results):
+                if isinstance(result, RefreshError):
+                    # Revoked or invalid grant: stop retrying until next use
+                    self.forget(account_id)
+                if isinstance(result, Exception):
+                    logger.error(f"Background token refresh failed for account {account_id}: {result}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get manager counters."""
+        return {
+            'accounts': len(self.credentials),
+            'inflight': len(self._inflight),
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'collapsed': self.collapsed,
+        }
+
+
+# Global credential manager
+credential_manager = CredentialManager()
@@ -1,58 +1,25 @@
 """Utility functions."""
 import re
-import base64
-from typing import Optional, Tuple
+from typing import Optional
 from datetime import datetime
+from otp import otp_engine
+from render import escape_markdown
 
+# escape_markdown lives in render and is re-exported for existing callers
+__all__ = [
+    'escape_markdown', 'extract_otp', 'extract_message_otp', 'format_size',
+    'truncate_text', 'format_timestamp', 'split_message', 'validate_email',
+]
 
-def parse_email_headers(message: dict) -> Tuple[str, str, str]:
-    """Extract subject, sender, date from message."""
-    headers = message['payload']['headers']
-    
-    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-    sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
-    date = next((h['value'] for h in headers if h['name'] == 'Date'), '')
-    
-    return subject, sender, date
 
+def extract_otp(text: str, key=None) -> Optional[str]:
+    """Extract OTP from text (see otp.OTPEngine)."""
+    return otp_engine.extract(text, key)
 
-def get_message_body(payload: dict) -> str:
-    """Extract message body from payload."""
-    body = ""
-    
-    if 'parts' in payload:
-        for part in payload['parts']:
-            if part['mimeType'] == 'text/plain':
-                if 'data' in part['body']:
-                    body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-                    break
-            elif part['mimeType'] == 'text/html' and not body:
-                if 'data' in part['body']:
-                    body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', errors='ignore')
-    else:
-        if 'body' in payload and 'data' in payload['body']:
-            body = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8', errors='ignore')
-    
-    return body[:1000]  # Limit to 1000 chars
 
-
-def extract_otp(text: str) -> Optional[str]:
-    """Extract OTP from text."""
-    patterns = [
-        r'\b(\d{6})\b',  # 6-digit
-        r'\b(\d{4})\b',  # 4-digit
-        r'\b(\d{8})\b',  # 8-digit
-        r'code[:\s]+(\d+)',
-        r'OTP[:\s]+(\d+)',
-        r'verification code[:\s]+(\d+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    
-    return None
+def extract_message_otp(message, key=None) -> Optional[str]:
+    """Extract OTP from a ParsedMessage, decoding the body only if needed."""
+    return otp_engine.extract_message(message, key)
 
 
 def format_size(size_bytes: int) -> str:
@@ -71,14 +38,6 @@ def truncate_text(text: str, max_length: int = 100) -> str:
     return text[:max_length-3] + "..."
 
 
-def escape_markdown(text: str) -> str:
-    """Escape markdown special characters."""
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-    for char in special_chars:
-        text = text.replace(char, f'\\{char}')
-    return text
-
-
 def format_timestamp(timestamp: str) -> str:
     """Format email timestamp to readable format."""
     try: